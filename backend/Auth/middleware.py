@@ -0,0 +1,63 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import MiddlewareNotUsed
+
+from .tokens import get_token_user
+
+
+class TokenAuthenticationMiddleware:
+    """
+    Authenticates requests carrying an "Authorization: Bearer <token>"
+    header with a token from Auth.tokens, when settings.AUTH_TOKEN_ENABLED
+    is on. request.user is replaced before anything reads the session, so
+    such requests never load the session row. An invalid token leaves the
+    request anonymous. Requests without the header keep session auth.
+
+    Must come after django.contrib.auth.middleware.AuthenticationMiddleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "AUTH_TOKEN_ENABLED", False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        # Under ASGI, serve async views without a detour through a thread
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        token = self.bearer_token(request)
+        if token is not None:
+            self.set_user(request, get_token_user(token))
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        token = self.bearer_token(request)
+        if token is not None:
+            # A cache miss reads the user from the database
+            self.set_user(request, await sync_to_async(get_token_user)(token))
+        return await self.get_response(request)
+
+    @staticmethod
+    def bearer_token(request):
+        header = request.headers.get("Authorization", "")
+        if header.startswith("Bearer "):
+            return header[len("Bearer "):].strip()
+        return None
+
+    @staticmethod
+    def set_user(request, user):
+        user = user or AnonymousUser()
+
+        async def auser():
+            return user
+
+        request.user = user
+        request.auser = auser
@@ -34,6 +34,9 @@ class User(AbstractUser):
     email = models.EmailField(unique=True)
     name = models.CharField(max_length=255)
     phone = models.CharField(max_length=10, unique=True, null=True, blank=True)
+
+    # Part of every API token issued to the user; incrementing it revokes them all
+    token_version = models.PositiveIntegerField(default=1)
     
     # Remove username field since we're using email
     username = None
@@ -1,3 +1,92 @@
-from django.test import TestCase
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
-# Create your tests here.
+from .models import User
+from .tokens import clear_user_cache, issue_token
+
+
+@override_settings(AUTH_TOKEN_ENABLED=True)
+class TokenAuthTests(TestCase):
+    def setUp(self):
+        clear_user_cache()
+        self.user = User.objects.create_user(email="user@example.com", password="secret", name="User")
+
+    def login(self):
+        response = self.client.post(
+            "/api/auth/login/", {"email": "user@example.com", "password": "secret"}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        # Later requests authenticate with the token alone
+        self.client.cookies.clear()
+        return response.json()["token"]
+
+    def get(self, path, token):
+        return self.client.get(path, headers={"Authorization": f"Bearer {token}"})
+
+    def test_task_reads_cost_no_auth_queries(self):
+        token = self.login()
+        self.assertEqual(self.get("/api/tasks/", token).status_code, 200)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.get("/api/tasks/", token)
+
+        self.assertEqual(response.status_code, 200)
+        tables = " ".join(q["sql"] for q in ctx.captured_queries)
+        self.assertNotIn('"django_session"', tables)
+        self.assertNotIn('"Auth_user"', tables)
+
+    def test_logout_revokes_tokens(self):
+        token = self.login()
+        self.assertEqual(self.get("/api/auth/me/", token).status_code, 200)
+
+        self.client.post("/api/auth/logout/", headers={"Authorization": f"Bearer {token}"})
+
+        self.assertEqual(self.get("/api/auth/me/", token).status_code, 401)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.token_version, 2)
+
+    def test_invalid_and_inactive_tokens_are_rejected(self):
+        token = issue_token(self.user)
+        self.assertEqual(self.get("/api/auth/me/", token[:-2] + "xx").status_code, 401)
+
+        User.objects.filter(id=self.user.id).update(is_active=False)
+        self.assertEqual(self.get("/api/auth/me/", token).status_code, 401)
+
+    def test_token_issued_by_another_process_reloads_the_user(self):
+        old_token = issue_token(self.user)
+        self.assertEqual(self.get("/api/auth/me/", old_token).status_code, 200)
+
+        # Logout and login handled by another process: the cached user here is stale
+        User.objects.filter(id=self.user.id).update(token_version=2)
+        self.user.refresh_from_db()
+        new_token = issue_token(self.user)
+
+        self.assertEqual(self.get("/api/auth/me/", new_token).status_code, 200)
+        self.assertEqual(self.get("/api/auth/me/", old_token).status_code, 401)
+
+    def test_session_request_to_me_gets_a_new_token(self):
+        self.client.force_login(self.user)
+        token = self.client.get("/api/auth/me/").json()["token"]
+
+        self.client.cookies.clear()
+        response = self.get("/api/auth/me/", token)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("token", response.json())
+
+    async def test_async_views_accept_tokens(self):
+        token = await sync_to_async(issue_token)(self.user)
+
+        response = await self.async_client.get("/api/async/tasks/", headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, 200)
+
+        response = await self.async_client.get("/api/async/tasks/", headers={"Authorization": f"Bearer {token}xx"})
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(AUTH_TOKEN_ENABLED=False)
+    def test_login_without_token_mode(self):
+        response = self.client.post(
+            "/api/auth/login/", {"email": "user@example.com", "password": "secret"}, content_type="application/json"
+        )
+        self.assertNotIn("token", response.json())
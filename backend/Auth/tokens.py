@@ -0,0 +1,102 @@
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import F
+
+from .models import User
+
+TOKEN_SALT = "Auth.tokens"
+
+# Seconds an issued token stays valid
+DEFAULT_TOKEN_MAX_AGE = 7 * 24 * 60 * 60
+
+# Seconds a user loaded for a token is reused without querying the database
+DEFAULT_TOKEN_USER_CACHE_TTL = 30
+
+# {user_id: (user, expires_at)}, per process
+_user_cache = {}
+_lock = threading.Lock()
+
+
+def issue_token(user):
+    """
+    Returns a signed, timestamped token naming the user and their current
+    token_version. It is verified without any database or session lookup.
+    """
+    return signing.dumps([user.id, user.token_version], salt=TOKEN_SALT, compress=True)
+
+
+def read_token(token):
+    """Returns (user_id, token_version) from a valid token, else None."""
+    max_age = getattr(settings, "AUTH_TOKEN_MAX_AGE", DEFAULT_TOKEN_MAX_AGE)
+    try:
+        user_id, version = signing.loads(token, salt=TOKEN_SALT, max_age=max_age)
+        return int(user_id), int(version)
+    except (signing.BadSignature, ValueError, TypeError):
+        return None
+
+
+def get_token_user(token):
+    """
+    Returns the active user a token was issued to, or None if the token is
+    invalid, expired or revoked.
+
+    Users are kept in a short-lived in-process cache, so most requests cost
+    no query at all. A revocation from another process is therefore seen
+    within AUTH_TOKEN_USER_CACHE_TTL seconds, or as soon as a newer token of
+    the same user arrives; in this process it is immediate.
+    """
+    payload = read_token(token)
+    if payload is None:
+        return None
+    user_id, version = payload
+
+    with _lock:
+        entry = _user_cache.get(user_id)
+    if entry is None or entry[1] <= time.monotonic():
+        user = _load_user(user_id)
+    else:
+        user = entry[0]
+        if version > user.token_version:
+            # Issued after the cached copy was loaded, e.g. a logout and new
+            # login in another process; the cached copy is out of date.
+            user = _load_user(user_id)
+    if user is None:
+        return None
+
+    if user.token_version != version:
+        return None
+    # Each request gets its own copy, so a view changing it cannot affect others
+    return copy.copy(user)
+
+
+def _load_user(user_id):
+    """Reads an active user from the database into the cache. Returns None if there is none."""
+    user = User.objects.filter(id=user_id, is_active=True).first()
+    if user is None:
+        forget_user(user_id)
+        return None
+    ttl = getattr(settings, "AUTH_TOKEN_USER_CACHE_TTL", DEFAULT_TOKEN_USER_CACHE_TTL)
+    with _lock:
+        _user_cache[user_id] = (user, time.monotonic() + ttl)
+    return user
+
+
+def revoke_tokens(user):
+    """Invalidates every token issued to the user so far."""
+    User.objects.filter(id=user.id).update(token_version=F("token_version") + 1)
+    forget_user(user.id)
+
+
+def forget_user(user_id):
+    """Drops the cached copy of a user, e.g. after their profile changed."""
+    with _lock:
+        _user_cache.pop(user_id, None)
+
+
+def clear_user_cache():
+    with _lock:
+        _user_cache.clear()
@@ -1,5 +1,6 @@
 from django.shortcuts import render
 
+from django.conf import settings
 from django.contrib.auth import authenticate, login, logout
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
@@ -7,6 +8,7 @@ import json
 
 
 from .models import User
+from .tokens import forget_user, issue_token, revoke_tokens
 
 
 @csrf_exempt
@@ -103,7 +105,7 @@ def login_user(request):
             return JsonResponse({"error": "Invalid email or password"}, status=400)
 
         login(request, user)
-        return JsonResponse({
+        response = {
             "message": "Login successful",
             "user": {
                 "id": user.id,
@@ -111,13 +113,20 @@ def login_user(request):
                 "name": user.name,
                 "phone": user.phone or ""
             }
-        })
+        }
+        if getattr(settings, "AUTH_TOKEN_ENABLED", False):
+            # Sent as "Authorization: Bearer <token>" to skip the session lookup
+            response["token"] = issue_token(user)
+        return JsonResponse(response)
     except Exception as e:
         return JsonResponse({"error": f"Login failed: {str(e)}"}, status=500)
 
 
 @csrf_exempt
 def logout_user(request):
+    # Revokes the user's API tokens as well as the session
+    if request.user.is_authenticated:
+        revoke_tokens(request.user)
     logout(request)
     return JsonResponse({"message": "Logged out successfully"})
 
@@ -129,7 +138,7 @@ def get_current_user(request):
         return JsonResponse({"error": "Not authenticated"}, status=401)
     
     user = request.user
-    return JsonResponse({
+    response = {
         "user": {
             "id": user.id,
             "email": user.email,
@@ -137,7 +146,12 @@ def get_current_user(request):
             "phone": user.phone,
             "date_joined": user.date_joined.isoformat() if hasattr(user, 'date_joined') else None
         }
-    })
+    }
+    if getattr(settings, "AUTH_TOKEN_ENABLED", False) and "Authorization" not in request.headers:
+        # The client keeps its token in memory only, so after a page reload
+        # it is signed in by the session alone; hand it a new token
+        response["token"] = issue_token(user)
+    return JsonResponse(response)
 
 
 @csrf_exempt
@@ -161,6 +175,8 @@ def update_user_profile(request):
         user.phone = phone or ""
     
     user.save()
+    # Token requests must not keep serving the old profile from the cache
+    forget_user(user.id)
     
     return JsonResponse({
         "message": "Profile updated successfully",
@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 from pathlib import Path
 import os
 
+import django
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -47,9 +49,13 @@ MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    # Only active when TASK_TIMING_ENABLED is set (see below)
+    'tasks.middleware.RequestTimingMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Only active when AUTH_TOKEN_ENABLED is set (see below)
+    'Auth.middleware.TokenAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -85,6 +91,36 @@ DATABASES = {
     }
 }
 
+# "default" keeps SQLite's stock behaviour. "production" applies the PRAGMAs
+# in tasks/db.py to each new connection (WAL, busy_timeout, synchronous=NORMAL,
+# mmap), keeps connections open between requests and starts write
+# transactions with BEGIN IMMEDIATE, so concurrent writers queue on the
+# busy timeout instead of failing with "database is locked".
+DATABASE_PROFILE = os.getenv('DATABASE_PROFILE', 'default')
+
+if DATABASE_PROFILE == 'production':
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.getenv('DB_CONN_MAX_AGE', '600'))
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+    if django.VERSION >= (5, 1):
+        DATABASES['default']['OPTIONS'] = {'transaction_mode': 'IMMEDIATE'}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Cached task lists are keyed by the per-user version stored in the database
+# (tasks.TaskListState), so a per-process local memory cache never serves
+# stale lists; a shared backend only saves each process rebuilding them.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'smart-task-analyzer',
+    }
+}
+
+# Seconds a serialized task list response stays cached (0 disables it)
+TASK_LIST_CACHE_TIMEOUT = int(os.getenv('TASK_LIST_CACHE_TIMEOUT', '300'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -144,6 +180,9 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Lets the frontend read the pagination cursor returned by the task list endpoints
+CORS_EXPOSE_HEADERS = ["X-Next-Cursor", "ETag", "Server-Timing"]
+
 CORS_ALLOW_ALL_ORIGINS = True  # For development only
 
 # Session Settings
@@ -169,3 +208,39 @@ DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL')
 TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
 TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
 TWILIO_FROM_NUMBER = os.getenv('TWILIO_FROM_NUMBER')
+# Dotted path of the SMS backend; tasks.sms.LocMemBackend keeps messages in memory
+SMS_BACKEND = os.getenv('SMS_BACKEND', 'tasks.sms.TwilioBackend')
+
+# DUE-DATE REMINDERS
+# "per_task" queues one email and one SMS per task due tomorrow; "digest"
+# sends each user one email and one SMS a day listing all of those tasks,
+# via the send_reminder_digests command.
+NOTIFICATION_MODE = os.getenv('NOTIFICATION_MODE', 'per_task')
+
+
+# TASK DEPENDENCY CYCLE DETECTION
+# "incremental" only searches around the edges changed by an edit and falls
+# back to a full pass when the search visits more than TASK_CYCLE_SEARCH_LIMIT
+# tasks or walks more than TASK_CYCLE_SEARCH_DEPTH dependency levels (one
+# query each); "full" recomputes every cycle for the user on each edit.
+TASK_CYCLE_DETECTION = os.getenv('TASK_CYCLE_DETECTION', 'incremental')
+TASK_CYCLE_SEARCH_LIMIT = int(os.getenv('TASK_CYCLE_SEARCH_LIMIT', '5000'))
+TASK_CYCLE_SEARCH_DEPTH = int(os.getenv('TASK_CYCLE_SEARCH_DEPTH', '16'))
+
+
+# TASK API INSTRUMENTATION
+# When enabled, every /api/tasks/ response carries a Server-Timing header
+# (query count, database, serialization and notification time) and the
+# numbers are collected into per-process histograms that staff users can
+# read from /api/tasks/metrics/.
+TASK_TIMING_ENABLED = os.getenv('TASK_TIMING_ENABLED', 'False').lower() in ('1', 'true', 'yes')
+
+
+# STATELESS TOKEN AUTH
+# When enabled, login also returns a signed token. Requests sending it as
+# "Authorization: Bearer <token>" skip the session lookup, and the user is
+# served from a short-lived per-process cache. Logging out revokes all of
+# the user's tokens by incrementing User.token_version.
+AUTH_TOKEN_ENABLED = os.getenv('AUTH_TOKEN_ENABLED', 'False').lower() in ('1', 'true', 'yes')
+AUTH_TOKEN_MAX_AGE = int(os.getenv('AUTH_TOKEN_MAX_AGE', str(7 * 24 * 60 * 60)))
+AUTH_TOKEN_USER_CACHE_TTL = int(os.getenv('AUTH_TOKEN_USER_CACHE_TTL', '30'))
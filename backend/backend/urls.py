@@ -21,4 +21,5 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('Auth.urls')),
     path("api/tasks/", include("tasks.urls")),
+    path("api/async/tasks/", include("tasks.async_urls")),
 ]
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class TasksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tasks'
+
+    def ready(self):
+        from .db import configure_connection
+
+        # Tunes every new database connection for the configured profile
+        connection_created.connect(configure_connection, dispatch_uid="tasks.configure_connection")
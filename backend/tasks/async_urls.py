@@ -0,0 +1,24 @@
+from django.urls import path
+from .async_views import tasks_view, bulk_create_tasks, bulk_set_completed, bulk_delete_tasks, update_task, delete_task, toggle_completed, completed_tasks, circular_tasks, pending_tasks, high_priority_tasks, tasks_by_date, tasks_with_dependencies, tasks_without_dependencies, plan_tasks, export_tasks
+
+# Async versions of the endpoints in urls.py with the same paths and
+# responses; mounted under /api/async/tasks/
+urlpatterns = [
+    path("", tasks_view, name="async-list-create-tasks"),
+    path("bulk/", bulk_create_tasks, name="async-bulk-create-tasks"),
+    path("bulk/complete/", bulk_set_completed, name="async-bulk-set-completed"),
+    path("bulk/delete/", bulk_delete_tasks, name="async-bulk-delete-tasks"),
+    path("update/<int:task_id>/", update_task, name="async-update-task"),
+    path("delete/<int:task_id>/", delete_task, name="async-delete-task"),
+    path("toggle/<int:task_id>/", toggle_completed, name="async-toggle-completed"),
+    path("completed/", completed_tasks, name="async-completed-tasks"),
+    path("circular/", circular_tasks, name="async-circular-tasks"),
+
+    path("pending/", pending_tasks, name="async-pending-tasks"),
+    path("high-priority/", high_priority_tasks, name="async-high-priority-tasks"),
+    path("by-date/", tasks_by_date, name="async-tasks-by-date"),
+    path("with-dependencies/", tasks_with_dependencies, name="async-tasks-with-dependencies"),
+    path("without-dependencies/", tasks_without_dependencies, name="async-tasks-without-dependencies"),
+    path("plan/", plan_tasks, name="async-plan-tasks"),
+    path("export/", export_tasks, name="async-export-tasks"),
+]
@@ -0,0 +1,443 @@
+"""
+Async versions of the task endpoints, served under /api/async/tasks/.
+
+Under an ASGI server these run on the event loop and only hand individual
+database calls to a worker thread, instead of holding a thread for the
+whole request like the sync views do. Reads use the async ORM directly.
+Django's async ORM has no transactions, so writes that span several
+statements (create, update, delete, toggle, bulk import and delete) run
+as one sync_to_async call to the same helpers the sync views use, as does
+the execution plan, which reads the whole dependency graph. The export
+streams from an async generator.
+
+Only the staff-only timing metrics endpoint has no async version.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from .bulk import BulkImportError, TaskDeletionError, clean_bulk_ids, delete_tasks, import_tasks
+from .cache import bump_list_version, cached_task_list
+from .export import DEFAULT_EXPORT_CHUNK_SIZE, EXPORT_FORMATS, aexport_lines
+from .models import Task
+from .pagination import BY_DUE_DATE, BY_PRIORITY, NEWEST_FIRST, PaginationError, page_queryset, split_page
+from .scoring import refresh_stale_scores
+from .serializers import aserialize_tasks, serialize_task
+from .utils import check_and_send_due_notifications, enqueue_due_notifications
+from .validation import TaskValidationError, TaskVersionConflict, clean_dependency_ids, clean_task_data
+from .views import build_plan, create_task, has_dependencies, save_task_update, set_completed, version_conflict_response
+
+
+# -----------------------------------
+# Helper: Paginated list response
+# -----------------------------------
+async def task_list_response(request, user, tasks, ordering, serializer=aserialize_tasks):
+    """Async form of views.task_list_response."""
+    # Scores depend on today's date, so bring them up to date before they
+    # are filtered, sorted or returned
+    await sync_to_async(refresh_stale_scores)(user)
+
+    try:
+        queryset, limit = page_queryset(request, tasks, ordering)
+    except PaginationError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    # Fetch one extra row to learn whether another page exists
+    page, next_cursor = split_page([task async for task in queryset[:limit + 1]], limit, ordering)
+
+    response = JsonResponse(await serializer(page), safe=False)
+    if next_cursor:
+        response["X-Next-Cursor"] = next_cursor
+    return response
+
+
+async def get_authenticated_user(request):
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+
+# -----------------------------------
+# Add or List tasks
+# -----------------------------------
+@csrf_exempt
+@cached_task_list
+async def tasks_view(request):
+    user = await get_authenticated_user(request)
+    if user is None:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+
+    # ---------------------- GET (List Tasks) ----------------------
+    if request.method == "GET":
+        try:
+            # Queue reminders for tasks due tomorrow; the dispatch_notifications
+            # worker sends them outside the request.
+            await sync_to_async(enqueue_due_notifications)(user)
+
+            return await task_list_response(request, user, Task.objects.filter(user=user), NEWEST_FIRST)
+        except Exception as e:
+            return JsonResponse({"error": f"Failed to retrieve tasks: {str(e)}"}, status=500)
+
+    # ---------------------- POST (Create Task) ----------------------
+    if request.method == "POST":
+        try:
+            data = json.loads(request.body.decode("utf-8"))
+        except json.JSONDecodeError:
+            return JsonResponse({"error": "Invalid JSON data"}, status=400)
+
+        try:
+            cleaned = clean_task_data(data)
+            dependency_ids = await sync_to_async(clean_dependency_ids)(user, cleaned["dependencies"])
+        except TaskValidationError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        # Task number must be unique per user
+        if await Task.objects.filter(user=user, number=cleaned["number"]).aexists():
+            return JsonResponse({"error": "Task number already exists for this user"}, status=400)
+
+        try:
+            task = await sync_to_async(create_task)(user, cleaned, dependency_ids)
+        except Exception as e:
+            return JsonResponse({"error": f"Failed to create task: {str(e)}"}, status=400)
+
+        # Only queues the reminders; nothing here waits on SMTP or Twilio
+        await sync_to_async(check_and_send_due_notifications)(task)
+
+        # Cached list responses no longer match
+        await sync_to_async(bump_list_version)(user.id)
+
+        return JsonResponse({
+            "message": "Task created successfully",
+            "id": task.id,
+            "task": serialize_task(task, sorted(dependency_ids)),
+        }, status=201)
+
+    return JsonResponse({"error": "Method not allowed"}, status=405)
+
+
+@csrf_exempt
+async def bulk_create_tasks(request):
+    user = await get_authenticated_user(request)
+    if user is None:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+
+    if request.method != "POST":
+        return JsonResponse({"error": "POST method required"}, status=400)
+
+    try:
+        data = json.loads(request.body.decode("utf-8"))
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON data"}, status=400)
+
+    # Accept either a bare list or {"tasks": [...]}
+    items = data.get("tasks") if isinstance(data, dict) else data
+
+    try:
+        tasks = await sync_to_async(import_tasks)(user, items)
+    except BulkImportError as e:
+        return JsonResponse({"error": str(e), "errors": e.errors}, status=400)
+
+    return JsonResponse({
+        "message": f"{len(tasks)} tasks created successfully",
+        "created": len(tasks),
+        "tasks": await aserialize_tasks(tasks),
+    }, status=201)
+
+
+@csrf_exempt
+async def update_task(request, task_id):
+    user = await get_authenticated_user(request)
+    if user is None:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+
+    if request.method != "PUT" and request.method != "PATCH":
+        return JsonResponse({"error": "PUT or PATCH method required"}, status=400)
+
+    try:
+        task = await Task.objects.aget(id=task_id, user=user)
+    except Task.DoesNotExist:
+        return JsonResponse({"error": "Task not found"}, status=404)
+    except Exception as e:
+        return JsonResponse({"error": f"Failed to retrieve task: {str(e)}"}, status=500)
+
+    try:
+        data = json.loads(request.body.decode("utf-8"))
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON data"}, status=400)
+
+    # Parse and validate everything before writing anything (all fields are optional)
+    try:
+        cleaned = clean_task_data(data, partial=True)
+        dependency_ids = None
+        if "dependencies" in cleaned:
+            dependency_ids = await sync_to_async(clean_dependency_ids)(user, cleaned.pop("dependencies"), task_id=task.id)
+    except TaskValidationError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    # Clients send the version they edited; a stale one means another edit came first
+    expected_version = cleaned.pop("version", task.version)
+    if expected_version != task.version:
+        return await sync_to_async(version_conflict_response)(task)
+
+    # Task number must be unique per user
+    if "number" in cleaned and await Task.objects.filter(user=user, number=cleaned["number"]).exclude(id=task.id).aexists():
+        return JsonResponse({"error": "Task number already exists for this user"}, status=400)
+
+    try:
+        await sync_to_async(save_task_update)(user, task, cleaned, dependency_ids)
+    except TaskVersionConflict:
+        return await sync_to_async(version_conflict_response)(await Task.objects.aget(id=task.id))
+    except IntegrityError:
+        return JsonResponse({"error": "Task number already exists for this user"}, status=400)
+    except Exception as e:
+        return JsonResponse({"error": f"Failed to update task: {str(e)}"}, status=400)
+
+    # Only queues the reminders; nothing here waits on SMTP or Twilio
+    await sync_to_async(check_and_send_due_notifications)(task)
+
+    # Cached list responses no longer match
+    await sync_to_async(bump_list_version)(user.id)
+
+    return JsonResponse({
+        "message": "Task updated successfully",
+        "task": (await aserialize_tasks([task]))[0],
+    })
+
+
+@csrf_exempt
+async def delete_task(request, task_id):
+    user = await get_authenticated_user(request)
+    if user is None:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+
+    if request.method != "DELETE":
+        return JsonResponse({"error": "DELETE method required"}, status=400)
+
+    try:
+        task = await Task.objects.aget(id=task_id, user=user)
+    except Task.DoesNotExist:
+        return JsonResponse({"error": "Task not found"}, status=404)
+    except Exception as e:
+        return JsonResponse({"error": f"Failed to retrieve task: {str(e)}"}, status=500)
+
+    try:
+        await sync_to_async(delete_tasks)(user, [task.id])
+        return JsonResponse({"message": "Task deleted successfully"})
+    except TaskDeletionError as e:
+        # Other tasks depend on this one
+        return JsonResponse({"error": str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({"error": f"Failed to delete task: {str(e)}"}, status=500)
+
+
+@csrf_exempt
+async def bulk_delete_tasks(request):
+    user = await get_authenticated_user(request)
+    if user is None:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+
+    if request.method != "POST" and request.method != "DELETE":
+        return JsonResponse({"error": "POST or DELETE method required"}, status=400)
+
+    try:
+        data = json.loads(request.body.decode("utf-8"))
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON data"}, status=400)
+
+    try:
+        ids = clean_bulk_ids(data, "deleted")
+    except TaskValidationError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    cascade = data.get("cascade", False)
+    if not isinstance(cascade, bool):
+        return JsonResponse({"error": "Cascade must be true or false"}, status=400)
+
+    try:
+        deleted = await sync_to_async(delete_tasks)(user, ids, cascade=cascade)
+        return JsonResponse({
+            "message": f"{len(deleted)} tasks deleted successfully",
+            "deleted": sorted(deleted),
+        })
+    except TaskDeletionError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({"error": f"Failed to delete tasks: {str(e)}"}, status=500)
+
+
+@csrf_exempt
+async def toggle_completed(request, task_id):
+    user = await get_authenticated_user(request)
+    if user is None:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+
+    if request.method != "POST":
+        return JsonResponse({"error": "POST method required"}, status=400)
+
+    # An explicit {"completed": true/false} sets the flag instead of flipping it
+    target = None
+    if request.content_type == "application/json" and request.body:
+        try:
+            data = json.loads(request.body.decode("utf-8"))
+        except json.JSONDecodeError:
+            return JsonResponse({"error": "Invalid JSON data"}, status=400)
+        target = data.get("completed") if isinstance(data, dict) else None
+        if target is not None and not isinstance(target, bool):
+            return JsonResponse({"error": "Completed must be true or false"}, status=400)
+
+    try:
+        # The UPDATE and the read of its result share one transaction, so a
+        # concurrent toggle cannot slip in between
+        completed = await sync_to_async(set_completed)(user, task_id, target)
+        if completed is None:
+            return JsonResponse({"error": "Task not found"}, status=404)
+
+        await sync_to_async(bump_list_version)(user.id)
+
+        return JsonResponse({
+            "completed": completed,
+            "message": f"Task marked as {'completed' if completed else 'incomplete'}"
+        })
+    except Exception as e:
+        return JsonResponse({"error": f"Failed to update task: {str(e)}"}, status=500)
+
+
+@csrf_exempt
+async def bulk_set_completed(request):
+    user = await get_authenticated_user(request)
+    if user is None:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+
+    if request.method != "POST":
+        return JsonResponse({"error": "POST method required"}, status=400)
+
+    try:
+        data = json.loads(request.body.decode("utf-8"))
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON data"}, status=400)
+
+    try:
+        ids = clean_bulk_ids(data, "updated")
+    except TaskValidationError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    completed = data.get("completed", True)
+    if not isinstance(completed, bool):
+        return JsonResponse({"error": "Completed must be true or false"}, status=400)
+
+    try:
+        # One statement, so the async ORM needs no transaction here
+        updated = await Task.objects.filter(user=user, id__in=ids).exclude(completed=completed).aupdate(completed=completed)
+        if updated:
+            await sync_to_async(bump_list_version)(user.id)
+
+        return JsonResponse({
+            "updated": updated,
+            "completed": completed,
+            "message": f"{updated} tasks marked as {'completed' if completed else 'incomplete'}",
+        })
+    except Exception as e:
+        return JsonResponse({"error": f"Failed to update tasks: {str(e)}"}, status=500)
+
+
+@csrf_exempt
+@cached_task_list
+async def plan_tasks(request):
+    user = await get_authenticated_user(request)
+    if user is None:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+
+    if request.method != "GET":
+        return JsonResponse({"error": "GET method required"}, status=400)
+
+    try:
+        top_k = int(request.GET.get("top", 10))
+        if top_k < 1 or top_k > 100:
+            return JsonResponse({"error": "Top must be between 1 and 100"}, status=400)
+    except (ValueError, TypeError):
+        return JsonResponse({"error": "Top must be a valid integer"}, status=400)
+
+    try:
+        return JsonResponse(await sync_to_async(build_plan)(user, top_k))
+    except Exception as e:
+        return JsonResponse({"error": f"Failed to plan tasks: {str(e)}"}, status=500)
+
+
+@csrf_exempt
+async def export_tasks(request):
+    user = await get_authenticated_user(request)
+    if user is None:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+
+    if request.method != "GET":
+        return JsonResponse({"error": "GET method required"}, status=400)
+
+    export_format = request.GET.get("format", "ndjson")
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({"error": f"Format must be one of: {', '.join(EXPORT_FORMATS)}"}, status=400)
+
+    # Rescored a chunk at a time as well, so stale scores never load every task
+    await sync_to_async(refresh_stale_scores)(user, chunk_size=DEFAULT_EXPORT_CHUNK_SIZE)
+
+    # Streamed chunk by chunk, so the full export is never held in memory
+    content_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    response = StreamingHttpResponse(aexport_lines(user, export_format), content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="tasks.{export_format}"'
+    return response
+
+
+# -----------------------------------
+# Filtered lists
+# -----------------------------------
+def list_view(filter_tasks, ordering, description, serializer=aserialize_tasks):
+    """
+    Builds an async GET list view for the tasks selected by
+    filter_tasks(request, queryset), in the same shape as the sync lists.
+    """
+    @csrf_exempt
+    @cached_task_list
+    async def view(request):
+        user = await get_authenticated_user(request)
+        if user is None:
+            return JsonResponse({"error": "Authentication required"}, status=401)
+
+        if request.method != "GET":
+            return JsonResponse({"error": "GET method required"}, status=400)
+
+        try:
+            tasks = filter_tasks(request, Task.objects.filter(user=user))
+            return await task_list_response(request, user, tasks, ordering, serializer)
+        except Exception as e:
+            return JsonResponse({"error": f"Failed to retrieve {description}: {str(e)}"}, status=500)
+
+    return view
+
+
+def high_priority_filter(request, tasks):
+    try:
+        threshold = float(request.GET.get("min", 5.0))
+    except (ValueError, TypeError):
+        threshold = 5.0
+    # Only pending tasks have their scores kept current for today
+    return tasks.filter(completed=False, priorityScore__gte=threshold)
+
+
+async def serialize_without_dependencies(page):
+    # Nothing to look up: these tasks have no dependencies by definition
+    return [serialize_task(t, []) for t in page]
+
+
+completed_tasks = list_view(lambda request, tasks: tasks.filter(completed=True), NEWEST_FIRST, "completed tasks")
+pending_tasks = list_view(lambda request, tasks: tasks.filter(completed=False), NEWEST_FIRST, "pending tasks")
+circular_tasks = list_view(lambda request, tasks: tasks.filter(circularTask=True), NEWEST_FIRST, "circular tasks")
+high_priority_tasks = list_view(high_priority_filter, BY_PRIORITY, "high priority tasks")
+tasks_by_date = list_view(lambda request, tasks: tasks, BY_DUE_DATE, "tasks by date")
+tasks_with_dependencies = list_view(
+    lambda request, tasks: tasks.filter(has_dependencies()), NEWEST_FIRST, "tasks with dependencies",
+)
+tasks_without_dependencies = list_view(
+    lambda request, tasks: tasks.filter(~has_dependencies()), NEWEST_FIRST, "tasks without dependencies",
+    serializer=serialize_without_dependencies,
+)
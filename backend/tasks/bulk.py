@@ -0,0 +1,259 @@
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.db import IntegrityError, transaction
+
+from .cache import bump_list_version
+from .graph import load_dependency_graph, refresh_circular_flags
+from .models import Task
+from .scoring import batch_scores
+from .utils import enqueue_notifications
+from .validation import TaskValidationError, clean_task_data
+
+# Largest batch accepted by one bulk import request
+MAX_BULK_TASKS = 5000
+
+# Rows per INSERT statement, well under SQLite's bound-parameter limit
+BULK_INSERT_BATCH_SIZE = 500
+
+
+class BulkImportError(ValueError):
+    """
+    Raised when a bulk import is rejected. `errors` lists the problems as
+    {"index", "number", "error"} dicts, one per invalid item.
+    """
+
+    def __init__(self, errors):
+        super().__init__(errors[0]["error"] if len(errors) == 1 else f"{len(errors)} tasks are invalid")
+        self.errors = errors
+
+
+class TaskDeletionError(ValueError):
+    """Raised with a user-facing message when a set of tasks cannot be deleted."""
+
+
+def import_tasks(user, items):
+    """
+    Creates a batch of tasks for the user, all or nothing.
+
+    Each item takes the same fields as a single task create. `dependencies`
+    holds ids of existing tasks, as for a single create, and
+    `dependency_numbers` holds task numbers, which may refer to other tasks
+    in the same batch as well as existing ones.
+
+    The whole batch is validated in memory against a single query of the
+    user's existing tasks. If any item is invalid, BulkImportError is raised
+    with every problem found and nothing is written. Otherwise the tasks and
+    their dependency rows are inserted in bulk, cycles are found in one pass
+    over the user's graph, and the created tasks are returned in input order.
+    """
+    if not isinstance(items, list):
+        raise BulkImportError([{"index": None, "number": None, "error": "Tasks must be a list"}])
+    if not items:
+        raise BulkImportError([{"index": None, "number": None, "error": "No tasks provided"}])
+    if len(items) > MAX_BULK_TASKS:
+        raise BulkImportError([{
+            "index": None,
+            "number": None,
+            "error": f"At most {MAX_BULK_TASKS} tasks can be imported at once",
+        }])
+
+    # number -> id of every task the user already has
+    existing = dict(Task.objects.filter(user=user).values_list("number", "id"))
+    existing_ids = set(existing.values())
+
+    errors = []
+    cleaned_items = []
+    batch_numbers = {}
+    for index, data in enumerate(items):
+        number = data.get("number") if isinstance(data, dict) else None
+        try:
+            cleaned = clean_task_data(data)
+            number = cleaned["number"]
+            cleaned["dependencies"] = _clean_ids(cleaned["dependencies"], "Dependency")
+            cleaned["dependency_numbers"] = _clean_ids(data.get("dependency_numbers") or [], "Dependency number")
+
+            if number in existing:
+                raise TaskValidationError("Task number already exists for this user")
+            if number in batch_numbers:
+                raise TaskValidationError(f"Task number {number} appears more than once in the batch")
+            batch_numbers[number] = index
+        except TaskValidationError as e:
+            errors.append({"index": index, "number": number, "error": str(e)})
+            continue
+        cleaned_items.append((index, cleaned))
+
+    # Dependencies can only be checked once every number in the batch is known
+    for index, cleaned in cleaned_items:
+        number = cleaned["number"]
+        for dep_id in cleaned["dependencies"]:
+            if dep_id not in existing_ids:
+                errors.append({"index": index, "number": number, "error": f"Dependency {dep_id} does not exist or is invalid"})
+                break
+        for dep_number in cleaned["dependency_numbers"]:
+            if dep_number == number:
+                errors.append({"index": index, "number": number, "error": "A task cannot depend on itself"})
+                break
+            if dep_number not in batch_numbers and dep_number not in existing:
+                errors.append({"index": index, "number": number, "error": f"Dependency number {dep_number} does not exist"})
+                break
+
+    if errors:
+        errors.sort(key=lambda error: error["index"])
+        raise BulkImportError(errors)
+
+    today = date.today()
+    priority_scores, smart_scores = batch_scores(
+        [cleaned["due_date"] for _, cleaned in cleaned_items],
+        [cleaned["importance"] for _, cleaned in cleaned_items],
+        [cleaned["estimated_hours"] for _, cleaned in cleaned_items],
+        today,
+    )
+    tasks = [
+        Task(
+            user=user,
+            number=cleaned["number"],
+            title=cleaned["title"],
+            due_date=cleaned["due_date"],
+            estimated_hours=cleaned["estimated_hours"],
+            importance=cleaned["importance"],
+            priorityScore=priority,
+            smartPriorityScore=smart,
+            scores_as_of=today,
+        )
+        for (_, cleaned), priority, smart in zip(cleaned_items, priority_scores, smart_scores)
+    ]
+
+    try:
+        with transaction.atomic():
+            Task.objects.bulk_create(tasks, batch_size=BULK_INSERT_BATCH_SIZE)
+            if any(task.id is None for task in tasks):
+                # Backends that cannot return ids from a bulk insert
+                ids = dict(
+                    Task.objects.filter(user=user, number__in=batch_numbers).values_list("number", "id")
+                )
+                for task in tasks:
+                    task.id = ids[task.number]
+
+            number_to_id = dict(existing)
+            number_to_id.update((task.number, task.id) for task in tasks)
+
+            Through = Task.dependencies.through
+            edges = {
+                (task.id, dep_id)
+                for task, (_, cleaned) in zip(tasks, cleaned_items)
+                for dep_id in [*cleaned["dependencies"], *(number_to_id[n] for n in cleaned["dependency_numbers"])]
+            }
+            Through.objects.bulk_create(
+                [Through(from_task_id=from_id, to_task_id=to_id) for from_id, to_id in edges],
+                batch_size=BULK_INSERT_BATCH_SIZE,
+            )
+
+            # One SCC pass covers every cycle the new edges may have closed
+            cyclic = refresh_circular_flags(user) if edges else set()
+            for task in tasks:
+                task.circularTask = task.id in cyclic
+
+            tomorrow = today + timedelta(days=1)
+            enqueue_notifications([task for task in tasks if task.due_date == tomorrow])
+
+            # Cached list responses no longer match
+            bump_list_version(user.id)
+    except IntegrityError:
+        # A concurrent request created one of the numbers first
+        raise BulkImportError([{"index": None, "number": None, "error": "Task number already exists for this user"}])
+
+    return tasks
+
+
+def delete_tasks(user, task_ids, cascade=False):
+    """
+    Deletes a set of the user's tasks in one transaction and returns the
+    ids deleted.
+
+    A task may only be deleted if every task depending on it is deleted as
+    well. Without `cascade` this is checked with one reverse-dependency
+    query for the whole set, and TaskDeletionError names the tasks that are
+    still needed. With `cascade` everything that depends on the set,
+    directly or indirectly, is deleted too.
+
+    Deleting a task on a cycle always deletes the rest of the cycle, which
+    depends on it, so the circularTask flags of the remaining tasks stay
+    correct.
+    """
+    task_ids = set(task_ids)
+    with transaction.atomic():
+        found = set(Task.objects.filter(user=user, id__in=task_ids).values_list("id", flat=True))
+        missing = task_ids - found
+        if missing:
+            raise TaskDeletionError(f"Task {min(missing)} not found")
+
+        if cascade:
+            # Walk the reverse edges of the whole graph, loaded in one query
+            dependents = defaultdict(list)
+            for from_id, dep_ids in load_dependency_graph(user).items():
+                for to_id in dep_ids:
+                    dependents[to_id].append(from_id)
+
+            stack = list(task_ids)
+            while stack:
+                for dependent_id in dependents[stack.pop()]:
+                    if dependent_id not in task_ids:
+                        task_ids.add(dependent_id)
+                        stack.append(dependent_id)
+        else:
+            blockers = (
+                Task.dependencies.through.objects
+                .filter(to_task_id__in=task_ids)
+                .exclude(from_task_id__in=task_ids)
+                .order_by("to_task__number", "from_task__number")
+                .values_list("to_task__number", "from_task__number")
+            )
+            required_by = defaultdict(list)
+            for number, dependent_number in blockers:
+                required_by[number].append(str(dependent_number))
+            if required_by:
+                raise TaskDeletionError(" ".join(
+                    f"Cannot delete task #{number}. Other tasks depend on it: {', '.join(dependent_numbers)}"
+                    for number, dependent_numbers in required_by.items()
+                ))
+
+        Task.objects.filter(user=user, id__in=task_ids).delete()
+
+        # Cached list responses no longer match
+        bump_list_version(user.id)
+
+    return task_ids
+
+
+def clean_bulk_ids(data, verb):
+    """
+    Returns the set of task ids in a bulk request body such as
+    {"ids": [...], ...}. `verb` ends the too-many message ("deleted").
+    Raises TaskValidationError.
+    """
+    if not isinstance(data, dict):
+        raise TaskValidationError("Invalid JSON data")
+
+    ids = data.get("ids")
+    if not isinstance(ids, list) or not ids:
+        raise TaskValidationError("Ids must be a non-empty list")
+    if len(ids) > MAX_BULK_TASKS:
+        raise TaskValidationError(f"At most {MAX_BULK_TASKS} tasks can be {verb} at once")
+    # JSON numbers only: int() would also take "7", 7.5 and true
+    if any(isinstance(task_id, bool) or not isinstance(task_id, int) for task_id in ids):
+        raise TaskValidationError("Ids must be integers")
+    return set(ids)
+
+
+def _clean_ids(values, label):
+    """Converts a list of ids or numbers to ints, rejecting anything else."""
+    if not isinstance(values, list):
+        raise TaskValidationError(f"{label}s must be a list")
+    cleaned = []
+    for value in values:
+        try:
+            cleaned.append(int(value))
+        except (ValueError, TypeError):
+            raise TaskValidationError(f"{label} {value} does not exist or is invalid")
+    return cleaned
@@ -0,0 +1,156 @@
+import hashlib
+from datetime import date, datetime, time
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import TaskListState
+
+# Seconds a serialized list response stays cached; 0 disables the cache
+DEFAULT_TASK_LIST_CACHE_TIMEOUT = 300
+
+
+def get_list_state(user_id):
+    """
+    Returns (version, updated_at) for the user's task lists, read from the
+    TaskListState row. Users that never wrote a task are at (0, None).
+    """
+    state = TaskListState.objects.filter(user_id=user_id).values_list("version", "updated_at").first()
+    return state or (0, None)
+
+
+async def aget_list_state(user_id):
+    """Async form of get_list_state."""
+    state = await TaskListState.objects.filter(user_id=user_id).values_list("version", "updated_at").afirst()
+    return state or (0, None)
+
+
+def bump_list_version(user_id):
+    """
+    Records a change to the user's tasks. This invalidates every cached list
+    response of the user and changes the ETag of every list, in all processes.
+    """
+    updated = TaskListState.objects.filter(user_id=user_id).update(
+        version=F("version") + 1,
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        state, created = TaskListState.objects.get_or_create(user_id=user_id, defaults={"version": 1})
+        if not created:
+            # Another request created the row in the meantime
+            bump_list_version(user_id)
+
+
+def _list_validators(request, user_id, version, updated_at):
+    """Returns (etag, last_modified, cache key) of a list response."""
+    today = date.today()
+    path_hash = hashlib.md5(request.get_full_path().encode("utf-8")).hexdigest()
+
+    etag = quote_etag(f"{user_id}-{version}-{today.isoformat()}-{path_hash}")
+    # Scores were recomputed at the start of the day at the latest
+    last_modified = datetime.combine(today, time.min).timestamp()
+    if updated_at is not None:
+        last_modified = max(last_modified, updated_at.timestamp())
+
+    key = f"tasks:list:{user_id}:{version}:{today.isoformat()}:{path_hash}"
+    return etag, int(last_modified), key
+
+
+def _not_modified(request, etag, last_modified):
+    """304 response if the request's validators still match, else None."""
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        not_modified["ETag"] = etag
+        not_modified["Last-Modified"] = http_date(last_modified)
+    return not_modified
+
+
+def _to_cache_entry(response):
+    return {
+        "content": response.content,
+        "next_cursor": response.get("X-Next-Cursor"),
+    }
+
+
+def _from_cache_entry(cached, etag, last_modified):
+    response = HttpResponse(cached["content"], content_type="application/json")
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    if cached["next_cursor"]:
+        response["X-Next-Cursor"] = cached["next_cursor"]
+    return response
+
+
+def cached_task_list(view_func):
+    """
+    Conditional GET and response caching for a task list view.
+
+    The ETag and Last-Modified headers come from the user's TaskListState
+    row, so a poll whose If-None-Match / If-Modified-Since still matches is
+    answered with 304 Not Modified without touching the task table. Scores
+    change with the date, so the day is part of both headers.
+
+    Otherwise the JSON body is cached per user, list version, day and full
+    path (so each page of a paginated list is cached separately).
+
+    Works for both sync and async views.
+    """
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            user = await request.auser()
+            if request.method != "GET" or not user.is_authenticated:
+                return await view_func(request, *args, **kwargs)
+
+            version, updated_at = await aget_list_state(user.id)
+            etag, last_modified, key = _list_validators(request, user.id, version, updated_at)
+
+            not_modified = _not_modified(request, etag, last_modified)
+            if not_modified is not None:
+                return not_modified
+
+            timeout = getattr(settings, "TASK_LIST_CACHE_TIMEOUT", DEFAULT_TASK_LIST_CACHE_TIMEOUT)
+            cached = await cache.aget(key) if timeout else None
+            if cached is None:
+                response = await view_func(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                cached = _to_cache_entry(response)
+                if timeout:
+                    await cache.aset(key, cached, timeout)
+            return _from_cache_entry(cached, etag, last_modified)
+
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method != "GET" or not request.user.is_authenticated:
+            return view_func(request, *args, **kwargs)
+
+        user_id = request.user.id
+        version, updated_at = get_list_state(user_id)
+        etag, last_modified, key = _list_validators(request, user_id, version, updated_at)
+
+        not_modified = _not_modified(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        timeout = getattr(settings, "TASK_LIST_CACHE_TIMEOUT", DEFAULT_TASK_LIST_CACHE_TIMEOUT)
+        cached = cache.get(key) if timeout else None
+        if cached is None:
+            response = view_func(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            cached = _to_cache_entry(response)
+            if timeout:
+                cache.set(key, cached, timeout)
+        return _from_cache_entry(cached, etag, last_modified)
+
+    return wrapper
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# PRAGMAs applied to each new SQLite connection, per settings.DATABASE_PROFILE.
+# "production" lets readers and the writer work at the same time (WAL),
+# makes a blocked writer wait instead of failing at once, and only syncs
+# to disk at checkpoints, which is still safe against application crashes.
+SQLITE_PROFILES = {
+    "default": {},
+    "production": {
+        "journal_mode": "WAL",
+        "busy_timeout": 5000,
+        "synchronous": "NORMAL",
+        "mmap_size": 128 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+}
+
+
+def sqlite_pragmas(profile):
+    try:
+        return SQLITE_PROFILES[profile]
+    except KeyError:
+        raise ImproperlyConfigured(
+            f"Unknown DATABASE_PROFILE {profile!r}; choose one of: {', '.join(SQLITE_PROFILES)}"
+        )
+
+
+def apply_sqlite_pragmas(cursor, pragmas):
+    """Runs PRAGMA name = value for each item. Works on Django and raw sqlite3 cursors."""
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def configure_connection(sender, connection, **kwargs):
+    """connection_created handler applying the database profile's PRAGMAs."""
+    if connection.vendor != "sqlite":
+        return
+    pragmas = sqlite_pragmas(getattr(settings, "DATABASE_PROFILE", "default"))
+    if pragmas:
+        with connection.cursor() as cursor:
+            apply_sqlite_pragmas(cursor, pragmas)
@@ -0,0 +1,106 @@
+import csv
+import io
+import json
+from itertools import islice
+
+from .models import Task
+from .serializers import aload_dependency_ids, load_dependency_ids, serialize_task
+
+# Tasks fetched from the database and serialized per batch
+DEFAULT_EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = ("ndjson", "csv")
+
+CSV_COLUMNS = [
+    "id",
+    "number",
+    "title",
+    "due_date",
+    "estimated_hours",
+    "importance",
+    "dependencies",
+    "priorityScore",
+    "smartPriorityScore",
+    "completed",
+    "circularTask",
+    "version",
+]
+
+
+def iter_task_dicts(user, chunk_size=DEFAULT_EXPORT_CHUNK_SIZE):
+    """
+    Yields every task of the user in the shape of serialize_task, ordered
+    by id. Tasks are streamed from the database `chunk_size` at a time and
+    the dependencies of each chunk are loaded with one query, so memory use
+    does not depend on how many tasks the user has.
+    """
+    tasks = Task.objects.filter(user=user).order_by("id").iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(tasks, chunk_size))
+        if not chunk:
+            return
+        dependency_ids = load_dependency_ids(chunk)
+        for task in chunk:
+            yield serialize_task(task, dependency_ids.get(task.id, []))
+
+
+async def aiter_task_chunks(user, chunk_size=DEFAULT_EXPORT_CHUNK_SIZE):
+    """
+    Async form of iter_task_dicts that yields one list of task dicts per
+    chunk. Each chunk is its own keyset query on id, so no database cursor
+    stays open between chunks.
+    """
+    tasks = Task.objects.filter(user=user).order_by("id")
+    last_id = 0
+    while True:
+        chunk = [task async for task in tasks.filter(id__gt=last_id)[:chunk_size]]
+        if not chunk:
+            return
+        dependency_ids = await aload_dependency_ids(chunk)
+        yield [serialize_task(task, dependency_ids.get(task.id, [])) for task in chunk]
+        last_id = chunk[-1].id
+
+
+def ndjson_lines(tasks):
+    """Encodes task dicts as newline-delimited JSON, one line per task."""
+    for task in tasks:
+        yield json.dumps(task) + "\n"
+
+
+def csv_lines(tasks, header=True):
+    """Encodes task dicts as CSV lines, header first. Dependencies are space separated."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+
+    if header:
+        writer.writerow(CSV_COLUMNS)
+        yield flush()
+    for task in tasks:
+        row = dict(task, dependencies=" ".join(str(dep_id) for dep_id in task["dependencies"]))
+        writer.writerow([row[column] for column in CSV_COLUMNS])
+        yield flush()
+
+
+def export_lines(user, export_format="ndjson", chunk_size=DEFAULT_EXPORT_CHUNK_SIZE):
+    """Returns a generator of the user's tasks encoded in `export_format`."""
+    encode = csv_lines if export_format == "csv" else ndjson_lines
+    return encode(iter_task_dicts(user, chunk_size))
+
+
+async def aexport_lines(user, export_format="ndjson", chunk_size=DEFAULT_EXPORT_CHUNK_SIZE):
+    """Async form of export_lines, for the async export view."""
+    if export_format == "csv":
+        # Just the header row
+        for line in csv_lines([]):
+            yield line
+
+    async for chunk in aiter_task_chunks(user, chunk_size):
+        lines = csv_lines(chunk, header=False) if export_format == "csv" else ndjson_lines(chunk)
+        for line in lines:
+            yield line
@@ -0,0 +1,329 @@
+import heapq
+from collections import defaultdict
+
+from django.conf import settings
+
+from .models import Task
+
+# Keeps `id__in` lists well under SQLite's bound-parameter limit
+UPDATE_CHUNK_SIZE = 500
+
+# "incremental" only searches around edited edges; "full" re-runs the SCC pass
+DEFAULT_CYCLE_DETECTION = "incremental"
+
+# Tasks the incremental search may visit before falling back to a full pass
+DEFAULT_CYCLE_SEARCH_LIMIT = 5000
+
+# Dependency levels (one query each) the incremental search may walk before
+# falling back to a full pass. Deep chains are cheaper to recompute in one
+# go than to walk a query at a time.
+DEFAULT_CYCLE_SEARCH_DEPTH = 16
+
+
+def load_dependency_graph(user):
+    """
+    Returns the user's dependency graph as {task_id: [dependency ids]},
+    loaded from the through-table in a single query.
+    """
+    edges = Task.dependencies.through.objects.filter(from_task__user=user)
+
+    graph = defaultdict(list)
+    for from_id, to_id in edges.values_list("from_task_id", "to_task_id"):
+        graph[from_id].append(to_id)
+    return graph
+
+
+def strongly_connected_components(graph):
+    """
+    Tarjan's algorithm, written iteratively so long dependency chains cannot
+    hit Python's recursion limit. Returns a list of components (lists of ids).
+    """
+    index = {}
+    lowlink = {}
+    stack = []
+    on_stack = set()
+    components = []
+    counter = 0
+
+    for root in list(graph):
+        if root in index:
+            continue
+
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        # Each frame is a node plus an iterator over the edges still to visit
+        work = [(root, iter(graph.get(root, ())))]
+
+        while work:
+            node, neighbours = work[-1]
+
+            for dep in neighbours:
+                if dep not in index:
+                    index[dep] = lowlink[dep] = counter
+                    counter += 1
+                    stack.append(dep)
+                    on_stack.add(dep)
+                    work.append((dep, iter(graph.get(dep, ()))))
+                    break
+                if dep in on_stack:
+                    lowlink[node] = min(lowlink[node], index[dep])
+            else:
+                # All edges of `node` visited
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+
+    return components
+
+
+def cyclic_task_ids(graph):
+    """Returns the ids of every task that sits on a dependency cycle."""
+    cyclic = set()
+    for component in strongly_connected_components(graph):
+        if len(component) > 1:
+            cyclic.update(component)
+        elif component[0] in graph.get(component[0], ()):
+            # A task that depends on itself
+            cyclic.add(component[0])
+    return cyclic
+
+
+def set_circular_flags(user, cyclic):
+    """Bulk-updates circularTask so exactly the ids in `cyclic` are flagged."""
+    flagged = set(Task.objects.filter(user=user, circularTask=True).values_list("id", flat=True))
+
+    _update_in_chunks(user, cyclic - flagged, True)
+    _update_in_chunks(user, flagged - cyclic, False)
+
+
+def refresh_circular_flags(user):
+    """
+    Recomputes circularTask for all of the user's tasks: one query for the
+    edges, one SCC pass, then bulk updates for the flags that changed.
+    Returns the set of task ids on a cycle.
+    """
+    cyclic = cyclic_task_ids(load_dependency_graph(user))
+    set_circular_flags(user, cyclic)
+    return cyclic
+
+
+def set_dependencies(task, dependency_ids):
+    """
+    Makes `dependency_ids` the task's dependencies by applying only the
+    difference: one query for the current edges, one bulk insert for the
+    missing ones and one delete for the extra ones. Call it inside a
+    transaction. Returns (added, removed) id sets for update_circular_flags.
+    """
+    through = Task.dependencies.through
+    old_ids = set(through.objects.filter(from_task_id=task.id).values_list("to_task_id", flat=True))
+    added = set(dependency_ids) - old_ids
+    removed = old_ids - set(dependency_ids)
+
+    if added:
+        through.objects.bulk_create([through(from_task_id=task.id, to_task_id=dep_id) for dep_id in added])
+    if removed:
+        through.objects.filter(from_task_id=task.id, to_task_id__in=removed).delete()
+    return added, removed
+
+
+def update_circular_flags(user, task, added=(), removed=()):
+    """
+    Maintains circularTask after `task`'s dependency edges changed, without
+    recomputing the whole graph. `added` and `removed` are the dependency ids
+    that were added to or removed from `task`; the edges must already be
+    saved. `task.circularTask` must still hold the value from before the edit.
+    Returns whether `task` is on a cycle afterwards.
+    """
+    if getattr(settings, "TASK_CYCLE_DETECTION", DEFAULT_CYCLE_DETECTION) == "full":
+        return task.id in refresh_circular_flags(user)
+
+    circular = task.circularTask
+
+    # An edge can only lie on a cycle if its source does, so removals from a
+    # task that was not circular cannot break anything.
+    if removed and circular:
+        circular = task.id in _recheck_component(user, task.id)
+
+    if added:
+        cycle = _find_new_cycle(user, task.id, added)
+        if cycle is None:
+            # Search exceeded its budget
+            return task.id in refresh_circular_flags(user)
+        if cycle:
+            _update_in_chunks(user, cycle, True)
+            circular = True
+
+    return circular
+
+
+def plan_execution(tasks, graph, top_k=10):
+    """
+    Orders pending tasks so every task comes after its pending dependencies,
+    picking the highest smartPriorityScore among the unblocked tasks at each
+    step (Kahn's algorithm over a heap).
+
+    `tasks` are the pending tasks and `graph` is load_dependency_graph()'s
+    result; edges to tasks outside `tasks` (i.e. completed ones) count as
+    satisfied. Returns a dict with:
+      order    - tasks in execution order
+      ready    - the top_k tasks that can be started right now
+      circular - tasks on a dependency cycle, which can never be ordered
+      blocked  - tasks that wait on a circular task
+    Runs in O((tasks + edges) + tasks * log(tasks)).
+    """
+    by_id = {task.id: task for task in tasks}
+
+    pending_deps = {}
+    dependents = defaultdict(list)
+    for task_id in by_id:
+        deps = [dep for dep in graph.get(task_id, ()) if dep in by_id]
+        pending_deps[task_id] = len(deps)
+        for dep in deps:
+            dependents[dep].append(task_id)
+
+    def priority(task_id):
+        task = by_id[task_id]
+        return (-task.smartPriorityScore, task.due_date, task_id)
+
+    heap = [priority(task_id) for task_id, count in pending_deps.items() if count == 0]
+    ready = [by_id[key[2]] for key in heapq.nsmallest(top_k, heap)]
+    heapq.heapify(heap)
+
+    order = []
+    while heap:
+        task_id = heapq.heappop(heap)[2]
+        order.append(by_id[task_id])
+        for dependent in dependents[task_id]:
+            pending_deps[dependent] -= 1
+            if pending_deps[dependent] == 0:
+                heapq.heappush(heap, priority(dependent))
+
+    # Whatever was never released is on a cycle or waits on one
+    unordered = {task_id for task_id, count in pending_deps.items() if count}
+    subgraph = {
+        task_id: [dep for dep in graph.get(task_id, ()) if dep in unordered]
+        for task_id in unordered
+    }
+    cyclic = cyclic_task_ids(subgraph)
+
+    return {
+        "order": order,
+        "ready": ready,
+        "circular": [by_id[task_id] for task_id in sorted(cyclic)],
+        "blocked": [by_id[task_id] for task_id in sorted(unordered - cyclic)],
+    }
+
+
+def _find_new_cycle(user, source_id, added):
+    """
+    Looks for cycles closed by new edges source -> added. Returns the set of
+    task ids on them (empty if none), or None if the bounded search gave up.
+    """
+    through = Task.dependencies.through
+
+    # Nothing depends on the source, so no path can lead back to it
+    if not through.objects.filter(to_task_id=source_id).exists():
+        return set()
+
+    limit = getattr(settings, "TASK_CYCLE_SEARCH_LIMIT", DEFAULT_CYCLE_SEARCH_LIMIT)
+    depth = getattr(settings, "TASK_CYCLE_SEARCH_DEPTH", DEFAULT_CYCLE_SEARCH_DEPTH)
+
+    # Forward search from the new dependencies, one query per level. The
+    # edges leaving every reached task are kept for the backward pass.
+    reachable = set(added)
+    frontier = set(added)
+    dependents = defaultdict(set)
+    for _ in range(depth):
+        if not frontier:
+            break
+        edges = list(_edges(frontier))
+        for from_id, to_id in edges:
+            dependents[to_id].add(from_id)
+        frontier = {to_id for _, to_id in edges} - reachable
+        reachable |= frontier
+        if len(reachable) > limit:
+            return None
+    else:
+        if frontier:
+            # Still going after `depth` levels
+            return None
+
+    if source_id not in reachable:
+        return set()
+
+    # Tasks on a new cycle are reachable from the new dependencies and can
+    # reach the source. Every edge leaving a reachable task was loaded above,
+    # so the dependents are walked backwards from the source in memory.
+    on_cycle = {source_id}
+    frontier = [source_id]
+    while frontier:
+        node = frontier.pop()
+        for from_id in dependents[node]:
+            if from_id in reachable and from_id not in on_cycle:
+                on_cycle.add(from_id)
+                frontier.append(from_id)
+    return on_cycle
+
+
+def _recheck_component(user, task_id):
+    """
+    Re-runs the SCC pass on the circular tasks connected to `task_id` after
+    one of its edges was removed. Removing edges can only break cycles, so
+    only tasks that were already flagged need to be examined.
+    Returns the ids in that component still on a cycle.
+    """
+    edges = Task.dependencies.through.objects.filter(
+        from_task__user=user,
+        from_task__circularTask=True,
+        to_task__circularTask=True,
+    )
+
+    graph = defaultdict(list)
+    neighbours = defaultdict(set)
+    for from_id, to_id in edges.values_list("from_task_id", "to_task_id"):
+        graph[from_id].append(to_id)
+        neighbours[from_id].add(to_id)
+        neighbours[to_id].add(from_id)
+
+    # The weakly connected part of the flagged subgraph holding the task
+    component = {task_id}
+    frontier = [task_id]
+    while frontier:
+        node = frontier.pop()
+        for other in neighbours[node] - component:
+            component.add(other)
+            frontier.append(other)
+
+    subgraph = {node: [dep for dep in graph.get(node, ()) if dep in component] for node in component}
+    cyclic = cyclic_task_ids(subgraph)
+    _update_in_chunks(user, component - cyclic, False)
+    return cyclic
+
+
+def _edges(task_ids):
+    """Yields the (from_id, to_id) edges leaving the given tasks."""
+    through = Task.dependencies.through
+    task_ids = list(task_ids)
+    for start in range(0, len(task_ids), UPDATE_CHUNK_SIZE):
+        chunk = task_ids[start:start + UPDATE_CHUNK_SIZE]
+        yield from through.objects.filter(from_task_id__in=chunk).values_list("from_task_id", "to_task_id")
+
+
+def _update_in_chunks(user, task_ids, circular):
+    task_ids = list(task_ids)
+    for start in range(0, len(task_ids), UPDATE_CHUNK_SIZE):
+        chunk = task_ids[start:start + UPDATE_CHUNK_SIZE]
+        Task.objects.filter(user=user, id__in=chunk).update(circularTask=circular)
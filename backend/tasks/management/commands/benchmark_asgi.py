@@ -0,0 +1,111 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+
+from Auth.models import User
+from tasks.bulk import import_tasks
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares throughput of the same task list workload served three ways, "
+        "in process: WSGI with a thread per request, ASGI running the sync views, "
+        "and ASGI running the async views under /api/async/tasks/. A benchmark "
+        "user is created for the run and deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=400, help="Requests per mode.")
+        parser.add_argument("--concurrency", type=int, default=20, help="Requests in flight at once.")
+        parser.add_argument("--tasks", type=int, default=200, help="Tasks owned by the benchmark user.")
+        parser.add_argument("--path", default="", help='List path under the task API, e.g. "" or "pending/".')
+        parser.add_argument("--cache", action="store_true", help="Keep the list response cache on (off by default, so every request builds its list).")
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(email="asgi-benchmark@example.com", password=None, name="Benchmark")
+        try:
+            import_tasks(user, [
+                {
+                    "number": n,
+                    "title": f"Benchmark task {n}",
+                    "due_date": f"2030-01-{1 + n % 28:02d}",
+                    "estimated_hours": 1 + n % 8,
+                    "importance": 1 + n % 10,
+                    "dependency_numbers": [n - 1] if n > 1 and n % 5 else [],
+                }
+                for n in range(1, options["tasks"] + 1)
+            ])
+
+            overrides = {"ALLOWED_HOSTS": ["testserver"]}
+            if not options["cache"]:
+                overrides["TASK_LIST_CACHE_TIMEOUT"] = 0
+
+            with override_settings(**overrides):
+                results = [
+                    ("wsgi (sync views)", self.run_wsgi(user, f"/api/tasks/{options['path']}", options)),
+                    ("asgi (sync views)", self.run_asgi(user, f"/api/tasks/{options['path']}", options)),
+                    ("asgi (async views)", self.run_asgi(user, f"/api/async/tasks/{options['path']}", options)),
+                ]
+        finally:
+            user.delete()
+
+        for name, (elapsed, latencies) in results:
+            self.stdout.write(
+                f"{name:20} {options['requests'] / elapsed:8.1f} req/s   "
+                f"p50 {statistics.median(latencies) * 1000:7.1f} ms   "
+                f"p95 {statistics.quantiles(latencies, n=20)[-1] * 1000:7.1f} ms"
+            )
+
+    def run_wsgi(self, user, path, options):
+        def worker(count):
+            client = Client()
+            client.force_login(user)
+            latencies = []
+            try:
+                for _ in range(count):
+                    start = time.perf_counter()
+                    response = client.get(path)
+                    latencies.append(time.perf_counter() - start)
+                    assert response.status_code == 200, response.status_code
+            finally:
+                close_old_connections()
+                connection.close()
+            return latencies
+
+        counts = self.split(options["requests"], options["concurrency"])
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(counts)) as pool:
+            latencies = [latency for result in pool.map(worker, counts) for latency in result]
+        return time.perf_counter() - start, latencies
+
+    def run_asgi(self, user, path, options):
+        async def worker(client, count):
+            latencies = []
+            for _ in range(count):
+                start = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200, response.status_code
+            return latencies
+
+        async def main():
+            client = AsyncClient()
+            await client.aforce_login(user)
+            counts = self.split(options["requests"], options["concurrency"])
+            start = time.perf_counter()
+            results = await asyncio.gather(*(worker(client, count) for count in counts))
+            return time.perf_counter() - start, [latency for result in results for latency in result]
+
+        return asyncio.run(main())
+
+    @staticmethod
+    def split(total, parts):
+        """Spreads `total` requests over `parts` workers."""
+        parts = max(1, min(parts, total))
+        return [total // parts + (1 if i < total % parts else 0) for i in range(parts)]
@@ -0,0 +1,151 @@
+import random
+import statistics
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from Auth.models import User
+from tasks.graph import refresh_circular_flags, update_circular_flags
+from tasks.models import Task
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares incremental cycle maintenance with a full SCC recomputation "
+        "on a generated dependency graph. Everything runs in a transaction that "
+        "is rolled back, so no data is left behind."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, default=10000, help="Number of tasks to generate.")
+        parser.add_argument("--project-size", type=int, default=50, help="Tasks per project; dependencies mostly stay inside a project.")
+        parser.add_argument("--edits", type=int, default=200, help="Number of dependency edits to time.")
+        parser.add_argument("--chain", type=int, default=4000, help="Length of a single dependency chain whose closing edge is also timed (0 to skip).")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+
+        with transaction.atomic():
+            user = User.objects.create_user(email="cycle-benchmark@example.com", password=None, name="Benchmark")
+            task_ids = self.build_graph(user, options["tasks"], options["project_size"], rng)
+            refresh_circular_flags(user)
+
+            incremental, full = [], []
+            mismatches = 0
+            for _ in range(options["edits"]):
+                task, added, removed = self.random_edit(user, task_ids, options["project_size"], rng)
+
+                start = time.perf_counter()
+                update_circular_flags(user, task, added=added, removed=removed)
+                incremental.append(time.perf_counter() - start)
+                flagged = set(Task.objects.filter(user=user, circularTask=True).values_list("id", flat=True))
+
+                start = time.perf_counter()
+                cyclic = refresh_circular_flags(user)
+                full.append(time.perf_counter() - start)
+
+                if cyclic != flagged:
+                    mismatches += 1
+
+            if options["chain"]:
+                chain = self.time_chain(user, options["tasks"], options["chain"])
+
+            transaction.set_rollback(True)
+
+        self.report("incremental", incremental)
+        self.report("full", full)
+        self.stdout.write(f"speedup (mean): {statistics.mean(full) / statistics.mean(incremental):.1f}x")
+        if mismatches:
+            self.stderr.write(f"{mismatches} edits left different flags than the full pass")
+        if options["chain"]:
+            (incremental_time, queries), full_time = chain
+            self.stdout.write(
+                f"closing a {options['chain']}-task chain: incremental {incremental_time * 1000:.2f} ms "
+                f"({queries} queries), full {full_time * 1000:.2f} ms"
+            )
+
+    def build_graph(self, user, count, project_size, rng):
+        Task.objects.bulk_create(
+            Task(user=user, number=n, title=f"Task {n}", due_date=date.today(), estimated_hours=1, importance=5)
+            for n in range(1, count + 1)
+        )
+        task_ids = list(Task.objects.filter(user=user).order_by("number").values_list("id", flat=True))
+
+        through = Task.dependencies.through
+        edges = set()
+        for position, task_id in enumerate(task_ids):
+            project_start = position - position % project_size
+            if position == project_start:
+                continue
+            for _ in range(rng.randint(1, 2)):
+                edges.add((task_id, task_ids[rng.randrange(project_start, position)]))
+            # An occasional backwards edge closes a cycle inside the project
+            if rng.random() < 0.01:
+                edges.add((task_ids[rng.randrange(project_start, position)], task_id))
+
+        through.objects.bulk_create(
+            [through(from_task_id=from_id, to_task_id=to_id) for from_id, to_id in edges],
+            batch_size=1000,
+        )
+        return task_ids
+
+    def time_chain(self, user, offset, length):
+        """
+        Builds one chain of `length` tasks, then times the edge that closes it
+        into a cycle with incremental maintenance and with a full pass.
+        Returns ((incremental seconds, incremental queries), full seconds).
+        """
+        Task.objects.bulk_create(
+            Task(user=user, number=offset + n, title=f"Chain {n}", due_date=date.today(), estimated_hours=1, importance=5)
+            for n in range(1, length + 1)
+        )
+        chain_ids = list(
+            Task.objects.filter(user=user, number__gt=offset).order_by("number").values_list("id", flat=True)
+        )
+        through = Task.dependencies.through
+        through.objects.bulk_create(
+            [through(from_task_id=from_id, to_task_id=to_id) for from_id, to_id in zip(chain_ids, chain_ids[1:])],
+            batch_size=1000,
+        )
+
+        last = Task.objects.get(id=chain_ids[-1])
+        last.dependencies.add(chain_ids[0])
+
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            update_circular_flags(user, last, added={chain_ids[0]})
+            incremental = time.perf_counter() - start
+
+        start = time.perf_counter()
+        refresh_circular_flags(user)
+        full = time.perf_counter() - start
+        return (incremental, len(ctx.captured_queries)), full
+
+    def random_edit(self, user, task_ids, project_size, rng):
+        """Adds or removes one dependency of a random task, as update_task would."""
+        position = rng.randrange(len(task_ids))
+        task = Task.objects.get(id=task_ids[position])
+        current = list(task.dependencies.values_list("id", flat=True))
+
+        if current and rng.random() < 0.5:
+            dep_id = rng.choice(current)
+            task.dependencies.remove(dep_id)
+            return task, set(), {dep_id}
+
+        project_start = position - position % project_size
+        project = task_ids[project_start:project_start + project_size]
+        dep_id = rng.choice([t for t in project if t != task.id and t not in current])
+        task.dependencies.add(dep_id)
+        return task, {dep_id}, set()
+
+    def report(self, label, timings):
+        timings = sorted(timings)
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        self.stdout.write(
+            f"{label:>11}: mean {statistics.mean(timings) * 1000:.2f} ms, "
+            f"median {statistics.median(timings) * 1000:.2f} ms, p95 {p95 * 1000:.2f} ms"
+        )
@@ -0,0 +1,79 @@
+import contextlib
+import io
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from Auth.models import User
+from tasks.models import NotificationOutbox, Task
+from tasks.tests_support import FakeSMTPServer
+from tasks.utils import dispatch_pending_notifications, enqueue_notifications, send_email_notification
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures email reminder throughput offline against an in-process fake "
+        "SMTP server: one connection per message versus the dispatch worker, "
+        "which reuses one connection per batch. Everything runs in a transaction "
+        "that is rolled back, so no data is left behind."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=200, help="Reminder emails sent per mode.")
+        parser.add_argument("--batch-size", type=int, default=100, help="Reminders per dispatch batch.")
+        parser.add_argument(
+            "--latency", type=float, default=0.005,
+            help="Seconds the fake server waits before each reply, standing in for the network round trip.",
+        )
+
+    def handle(self, *args, **options):
+        server = FakeSMTPServer(latency=options["latency"]).start()
+        try:
+            with override_settings(NOTIFICATION_MODE="per_task", **server.settings()), transaction.atomic():
+                tasks = self.create_tasks(options["messages"])
+
+                per_message = self.measure(server, lambda: [send_email_notification(task) for task in tasks])
+
+                enqueue_notifications(tasks)
+                # Only the email side is compared; SMS goes to the in-memory backend
+                NotificationOutbox.objects.filter(channel=NotificationOutbox.CHANNEL_SMS).delete()
+                batched = self.measure(server, lambda: self.drain(options["batch_size"]))
+
+                transaction.set_rollback(True)
+        finally:
+            server.stop()
+
+        for label, (elapsed, connections, messages) in (("per message", per_message), ("batched", batched)):
+            self.stdout.write(
+                f"{label:>11}: {messages} emails in {elapsed:.2f}s, {messages / elapsed:.1f} msg/s, "
+                f"{connections} SMTP connections"
+            )
+        self.stdout.write(f"speedup: {per_message[0] / batched[0]:.1f}x")
+
+    def create_tasks(self, count):
+        user = User.objects.create_user(
+            email="notification-benchmark@example.com", password=None, name="Benchmark", phone="9999999999",
+        )
+        tomorrow = date.today() + timedelta(days=1)
+        Task.objects.bulk_create(
+            Task(user=user, number=n, title=f"Task {n}", due_date=tomorrow, estimated_hours=1, importance=5)
+            for n in range(1, count + 1)
+        )
+        return list(Task.objects.filter(user=user).select_related("user").order_by("number"))
+
+    def drain(self, batch_size):
+        while sum(dispatch_pending_notifications(batch_size=batch_size).values()):
+            pass
+
+    def measure(self, server, send):
+        """Runs send() and returns (seconds, SMTP connections, emails received) for it."""
+        connections, messages = server.connections, len(server.messages)
+        start = time.perf_counter()
+        # The senders print a line per message
+        with contextlib.redirect_stdout(io.StringIO()):
+            send()
+        elapsed = time.perf_counter() - start
+        return elapsed, server.connections - connections, len(server.messages) - messages
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tasks.utils import DEFAULT_RETRY_DELAY_SECONDS, dispatch_pending_notifications
+
+
+class Command(BaseCommand):
+    help = (
+        "Sends the due-date reminders queued in the notification outbox. Several "
+        "workers can run at once; each claims its own batch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100, help="Reminders sent per batch.")
+        parser.add_argument("--max-attempts", type=int, default=5, help="Attempts before a reminder is marked failed.")
+        parser.add_argument(
+            "--retry-delay", type=float, default=DEFAULT_RETRY_DELAY_SECONDS,
+            help="Seconds before a failed reminder is retried; doubles with every attempt.",
+        )
+        parser.add_argument("--loop", action="store_true", help="Keep polling the outbox instead of exiting when it is empty.")
+        parser.add_argument("--interval", type=float, default=30.0, help="Seconds to wait between polls in --loop mode.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+
+        while True:
+            counts = dispatch_pending_notifications(
+                batch_size=batch_size,
+                max_attempts=options["max_attempts"],
+                retry_delay=options["retry_delay"],
+            )
+            processed = sum(counts.values())
+            if processed:
+                self.stdout.write(
+                    f"Sent {counts['sent']}, retrying {counts['retrying']}, "
+                    f"failed {counts['failed']}, skipped {counts['skipped']}."
+                )
+
+            # A full batch means more work may be waiting; otherwise the outbox is
+            # drained. Failed reminders are not due again until their backoff ends.
+            if processed == batch_size:
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,45 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Auth.models import User
+from tasks.export import DEFAULT_EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_lines
+from tasks.scoring import refresh_stale_scores
+
+
+class Command(BaseCommand):
+    help = (
+        "Exports every user's tasks to one file per user, as NDJSON or CSV. "
+        "Tasks are streamed in chunks, so memory use stays flat however many tasks a user has."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output-dir", default=".", help="Directory the export files are written to.")
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson", help="File format.")
+        parser.add_argument("--user", action="append", dest="emails", metavar="EMAIL", help="Only export this user. Can be repeated.")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_EXPORT_CHUNK_SIZE, help="Tasks read from the database at a time.")
+
+    def handle(self, *args, **options):
+        output_dir = options["output_dir"]
+        if not os.path.isdir(output_dir):
+            raise CommandError(f"{output_dir} is not a directory")
+
+        users = User.objects.filter(tasks__isnull=False).distinct().order_by("id")
+        if options["emails"]:
+            users = User.objects.filter(email__in=options["emails"]).order_by("id")
+            missing = set(options["emails"]) - {user.email for user in users}
+            if missing:
+                raise CommandError(f"Unknown user: {', '.join(sorted(missing))}")
+
+        for user in users:
+            # Rescored a chunk at a time as well, so memory stays flat
+            refresh_stale_scores(user, chunk_size=options["chunk_size"])
+            path = os.path.join(output_dir, f"tasks-{user.id}.{options['format']}")
+            count = 0
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                for line in export_lines(user, options["format"], options["chunk_size"]):
+                    f.write(line)
+                    count += 1
+            if options["format"] == "csv":
+                count -= 1  # header line
+            self.stdout.write(f"Exported {count} tasks for {user.email} to {path}")
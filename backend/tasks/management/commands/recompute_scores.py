@@ -0,0 +1,38 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.models import Task
+from tasks.scoring import rescore_stale
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes priorityScore and smartPriorityScore for every incomplete task. "
+        "Tasks already scored for the target date are skipped, so an interrupted "
+        "run can simply be started again and continues where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--as-of", help="Date to score for (YYYY-MM-DD). Defaults to today.")
+        parser.add_argument("--chunk-size", type=int, default=10000, help="Tasks read and written per transaction.")
+
+    def handle(self, *args, **options):
+        try:
+            as_of = date.fromisoformat(options["as_of"]) if options["as_of"] else date.today()
+        except ValueError:
+            raise CommandError("--as-of must be a date in YYYY-MM-DD format")
+
+        total = 0
+        started = time.perf_counter()
+        for count in rescore_stale(Task.objects.filter(completed=False), as_of, options["chunk_size"]):
+            total += count
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"{total} tasks rescored ({total / elapsed:.0f} rows/sec)")
+
+        elapsed = time.perf_counter() - started
+        rate = total / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Rescored {total} tasks as of {as_of} in {elapsed:.1f}s ({rate:.0f} rows/sec)."
+        ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.utils import digest_mode, send_due_digests
+
+
+class Command(BaseCommand):
+    help = (
+        "Sends every user one email and one SMS listing their tasks due tomorrow. "
+        "Meant to run once a day when NOTIFICATION_MODE is \"digest\"; running it "
+        "again the same day only retries digests that were not sent."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--max-attempts", type=int, default=5, help="Attempts before a digest is marked failed.")
+
+    def handle(self, *args, **options):
+        if not digest_mode():
+            # Per-task reminders are already queued for the same tasks
+            raise CommandError('Digests are only sent when NOTIFICATION_MODE is "digest".')
+
+        counts = send_due_digests(max_attempts=options["max_attempts"])
+        self.stdout.write(
+            f"Sent {counts['sent']}, retrying {counts['retrying']}, "
+            f"failed {counts['failed']}, skipped {counts['skipped']}."
+        )
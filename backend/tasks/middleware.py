@@ -0,0 +1,90 @@
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import timing
+
+DEFAULT_TIMING_PATH_PREFIXES = ("/api/tasks/", "/api/async/tasks/")
+
+
+class RequestTimingMiddleware:
+    """
+    Measures each task API request when settings.TASK_TIMING_ENABLED is on:
+    the number of SQL queries, the time spent in the database, in
+    serialization and in the due-date notification check, and the total.
+
+    The numbers are sent back in a Server-Timing header and added to the
+    per-route histograms in tasks.timing, which staff users can read from
+    /api/tasks/metrics/. The histograms live in this process only.
+
+    A streamed response (the export) is produced after this middleware
+    returns, so only the work done before streaming starts is measured.
+
+    Under ASGI the async views run their queries through sync_to_async, on
+    the worker thread that owns the request's database connections, so the
+    query hooks are installed and removed on that thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "TASK_TIMING_ENABLED", False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.path_prefixes = tuple(getattr(settings, "TASK_TIMING_PATH_PREFIXES", DEFAULT_TIMING_PATH_PREFIXES))
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not request.path.startswith(self.path_prefixes):
+            return self.get_response(request)
+
+        timings, token = timing.start_request()
+        started = time.perf_counter()
+        try:
+            with self.record_queries(timings):
+                response = self.get_response(request)
+        finally:
+            timing.end_request(token)
+        return self.finish(request, response, timings, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        if not request.path.startswith(self.path_prefixes):
+            return await self.get_response(request)
+
+        timings, token = timing.start_request()
+        started = time.perf_counter()
+        try:
+            hooks = await sync_to_async(self.record_queries)(timings)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(hooks.close)()
+        finally:
+            timing.end_request(token)
+        return self.finish(request, response, timings, time.perf_counter() - started)
+
+    @staticmethod
+    def record_queries(timings):
+        """ExitStack that counts and times the queries of this thread's connections."""
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timings.record_query))
+        return stack
+
+    @staticmethod
+    def finish(request, response, timings, total):
+        response["Server-Timing"] = timings.server_timing(total)
+
+        match = request.resolver_match
+        route = match.view_name if match else "unresolved"
+        timing.record(route, timings, total)
+        return response
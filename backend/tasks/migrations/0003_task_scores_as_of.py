@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_notificationoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='scores_as_of',
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
@@ -27,13 +27,141 @@ class Task(models.Model):
 
     priorityScore = models.FloatField(default=0.0)
     smartPriorityScore = models.FloatField(default=0.0)
+    # Day the scores above were computed for; they go stale as the date moves
+    scores_as_of = models.DateField(null=True, blank=True)
 
     completed = models.BooleanField(default=False)
     circularTask = models.BooleanField(default=False)
 
+    # Incremented by every edit, so an edit based on an older copy of the
+    # task can be detected and rejected
+    version = models.PositiveIntegerField(default=1)
+
     class Meta:
         # UNIQUE per user
         unique_together = ("user", "number")
+        # One index per access path of the task endpoints. The list endpoints
+        # filter on the leading columns and keyset-paginate on the rest.
+        # Boolean filters are rendered as bare column tests (WHERE NOT
+        # "completed"), which only partial indexes can serve, so those paths
+        # use partial indexes with the same condition.
+        indexes = [
+            # by-date/
+            models.Index(fields=["user", "due_date", "id"], name="tasks_user_due_idx"),
+            # high-priority/
+            models.Index(fields=["user", "priorityScore", "id"], name="tasks_user_priority_idx"),
+            # pending/ and the daily score refresh
+            models.Index(fields=["user", "id"], condition=models.Q(completed=False), name="tasks_pending_idx"),
+            # completed/
+            models.Index(fields=["user", "id"], condition=models.Q(completed=True), name="tasks_completed_idx"),
+            # Due-tomorrow reminders
+            models.Index(fields=["user", "due_date"], condition=models.Q(completed=False), name="tasks_pending_due_idx"),
+            # recompute_scores walks pending tasks in id order
+            models.Index(fields=["id"], condition=models.Q(completed=False), name="tasks_pending_id_idx"),
+            # circular/; few tasks are circular, so the partial index stays small
+            models.Index(fields=["user", "id"], condition=models.Q(circularTask=True), name="tasks_circular_idx"),
+        ]
 
     def __str__(self):
         return f"User {self.user} • Task {self.number}: {self.title}"
+
+
+class NotificationOutbox(models.Model):
+    """
+    Persistent queue of due-date reminders.
+
+    Rows are written by tasks/utils.py while serving requests and drained by
+    the `dispatch_notifications` management command. The unique constraint on
+    (task, channel, due_date) is what stops a reminder from being queued twice,
+    and claiming rows before sending stops two workers from sending it twice.
+    """
+
+    CHANNEL_EMAIL = "email"
+    CHANNEL_SMS = "sms"
+    CHANNEL_CHOICES = [
+        (CHANNEL_EMAIL, "Email"),
+        (CHANNEL_SMS, "SMS"),
+    ]
+
+    STATUS_PENDING = "pending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+    STATUS_SKIPPED = "skipped"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_SENT, "Sent"),
+        (STATUS_FAILED, "Failed"),
+        (STATUS_SKIPPED, "Skipped"),
+    ]
+
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="notifications")
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    due_date = models.DateField()
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+
+    # A pending reminder is not picked up before this time. Set while a
+    # worker holds the row (its lease) and after a failed attempt (backoff).
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    # Random token of the dispatch batch that last claimed the row
+    claimed_by = models.CharField(max_length=32, blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        # One reminder per task, channel and due date
+        unique_together = ("task", "channel", "due_date")
+        indexes = [
+            models.Index(fields=["status", "id"], name="tasks_outbox_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.channel} reminder for task {self.task_id} due {self.due_date} ({self.status})"
+
+
+class ReminderDigest(models.Model):
+    """
+    Delivery record of a user's daily reminder digest, used when
+    settings.NOTIFICATION_MODE is "digest". Rows are written and sent by the
+    `send_reminder_digests` command; the unique constraint on (user, channel,
+    due_date) is what stops a digest from being sent twice on the same day.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="reminder_digests")
+    channel = models.CharField(max_length=10, choices=NotificationOutbox.CHANNEL_CHOICES)
+    due_date = models.DateField()
+    task_count = models.PositiveIntegerField(default=0)
+
+    status = models.CharField(
+        max_length=10, choices=NotificationOutbox.STATUS_CHOICES, default=NotificationOutbox.STATUS_PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        # One digest per user, channel and due date
+        unique_together = ("user", "channel", "due_date")
+
+    def __str__(self):
+        return f"{self.channel} digest for user {self.user_id} due {self.due_date} ({self.status})"
+
+
+class TaskListState(models.Model):
+    """
+    Per-user change counter for the task lists. Every write to a user's tasks
+    bumps `version`, so list endpoints can build ETag/Last-Modified headers
+    and cache keys from this single row without reading the task table.
+    """
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="task_list_state")
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Task list of user {self.user_id} at version {self.version}"
@@ -0,0 +1,139 @@
+import base64
+import json
+import math
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import DateField, FloatField, IntegerField, Q
+
+from .models import Task
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Sort orders used by the list endpoints, as (field, descending) pairs.
+# Each one ends on a unique column so every row has a distinct position.
+NEWEST_FIRST = (("id", True),)
+BY_DUE_DATE = (("due_date", False), ("id", False))
+BY_PRIORITY = (("priorityScore", True), ("id", True))
+
+
+class PaginationError(ValueError):
+    """Raised for an invalid `limit` or `cursor` query parameter."""
+
+
+def encode_cursor(task, ordering):
+    """Builds the opaque cursor that points just past `task`."""
+    values = [getattr(task, field) for field, _ in ordering]
+    raw = json.dumps(values, cls=DjangoJSONEncoder).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor, ordering):
+    """Returns the sort key values stored in a cursor."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise PaginationError("Invalid cursor")
+
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise PaginationError("Invalid cursor")
+
+    fields = [Task._meta.get_field(field) for field, _ in ordering]
+    if not all(_is_cursor_value(field, value) for field, value in zip(fields, values)):
+        raise PaginationError("Invalid cursor")
+
+    try:
+        return [field.to_python(value) for field, value in zip(fields, values)]
+    except ValidationError:
+        raise PaginationError("Invalid cursor")
+
+
+def _is_cursor_value(field, value):
+    """
+    True when `value` has the JSON type encode_cursor writes for `field`.
+    to_python alone lets None through (which the keyset filter turns into a
+    server error) and accepts true/false as 1/0.
+    """
+    if value is None or isinstance(value, bool):
+        return False
+    if isinstance(field, IntegerField):
+        return isinstance(value, int)
+    if isinstance(field, FloatField):
+        return isinstance(value, (int, float)) and math.isfinite(value)
+    if isinstance(field, DateField):
+        return isinstance(value, str)
+    return False
+
+
+def keyset_filter(ordering, values):
+    """
+    Q object selecting the rows that sort after `values`, e.g. for
+    (due_date ASC, id ASC): due_date > d OR (due_date = d AND id > i).
+    """
+    condition = Q()
+    equal_so_far = Q()
+    for (field, descending), value in zip(ordering, values):
+        lookup = "lt" if descending else "gt"
+        condition |= equal_so_far & Q(**{f"{field}__{lookup}": value})
+        equal_so_far &= Q(**{field: value})
+
+    if len(ordering) > 1:
+        # Redundant bound on the leading column. Without it the OR above
+        # leaves the database no index range to start from, and it scans
+        # every row before the cursor.
+        field, descending = ordering[0]
+        lookup = "lte" if descending else "gte"
+        condition &= Q(**{f"{field}__{lookup}": values[0]})
+    return condition
+
+
+def page_queryset(request, queryset, ordering):
+    """
+    Applies `ordering` and the request's `cursor` to the queryset.
+
+    Returns (queryset, limit). Without a `limit` parameter the page holds
+    DEFAULT_PAGE_SIZE tasks, so no request loads a user's whole task list.
+    The caller fetches queryset[:limit + 1] and hands the rows to split_page.
+    """
+    queryset = queryset.order_by(*[f"-{field}" if descending else field for field, descending in ordering])
+
+    limit = request.GET.get("limit")
+    cursor = request.GET.get("cursor")
+    if limit is None:
+        limit = DEFAULT_PAGE_SIZE
+    else:
+        try:
+            limit = int(limit)
+        except (ValueError, TypeError):
+            raise PaginationError("Limit must be a valid integer")
+        if limit < 1 or limit > MAX_PAGE_SIZE:
+            raise PaginationError(f"Limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    if cursor:
+        queryset = queryset.filter(keyset_filter(ordering, decode_cursor(cursor, ordering)))
+    return queryset, limit
+
+
+def split_page(rows, limit, ordering):
+    """
+    Takes up to limit + 1 rows of a page_queryset result and returns
+    (tasks, next_cursor). The extra row only tells whether another page exists.
+    """
+    if len(rows) <= limit:
+        return rows, None
+
+    tasks = rows[:limit]
+    return tasks, encode_cursor(tasks[-1], ordering)
+
+
+def paginate(request, queryset, ordering):
+    """
+    Applies `ordering` and returns one keyset page of the queryset.
+
+    Returns (tasks, next_cursor); next_cursor is None on the last page.
+    """
+    queryset, limit = page_queryset(request, queryset, ordering)
+
+    # Fetch one extra row to learn whether another page exists
+    return split_page(list(queryset[:limit + 1]), limit, ordering)
@@ -0,0 +1,191 @@
+from collections import namedtuple
+from datetime import date
+
+from django.db import connection, transaction
+
+from .models import Task
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; batch_scores falls back to pure Python
+    np = None
+
+# Only the columns the scores are computed from
+SCORE_INPUT_FIELDS = ["id", "due_date", "importance", "estimated_hours"]
+
+# Tasks rescored per query by refresh_stale_scores
+SCORE_REFRESH_CHUNK_SIZE = 2000
+
+ScoreInput = namedtuple("ScoreInput", ["due_date", "importance", "estimated_hours"])
+
+
+# -----------------------------------
+# Helper: Priority Score
+# -----------------------------------
+def calculate_priority_score(task, today=None):
+    today = today or date.today()
+    days_until_due = (task.due_date - today).days
+    if days_until_due <= 0:
+        days_until_due = 1
+
+    ps = task.importance * (1 / days_until_due) * (1 / task.estimated_hours)
+    return round(ps, 3)
+
+
+# -----------------------------------
+# Helper: Smart Priority Score
+# -----------------------------------
+def calculate_smart_score(task, today=None):
+    today = today or date.today()
+    days_until_due = (task.due_date - today).days
+    if days_until_due <= 0:
+        days_until_due = 1
+
+    W_U = 0.5
+    W_I = 0.3
+    W_E = 0.2
+
+    urgency_factor = 1 / days_until_due
+    importance_factor = task.importance / 10
+    effort_factor = 1 / task.estimated_hours
+
+    smart = (urgency_factor * W_U) + (importance_factor * W_I) + (effort_factor * W_E)
+    return round(smart, 3)
+
+
+# -----------------------------------
+# Helper: Score and save many tasks
+# -----------------------------------
+def batch_scores(due_dates, importances, estimated_hours, today=None):
+    """
+    Vectorised form of calculate_priority_score and calculate_smart_score.
+    Takes parallel sequences of due dates, importance and estimated hours
+    and returns (priority scores, smart scores) as two lists of floats that
+    are identical to what the scalar functions return for each task.
+    Uses NumPy when it is installed and plain Python otherwise.
+    """
+    today = today or date.today()
+    if np is None or not len(due_dates):
+        inputs = [ScoreInput(*values) for values in zip(due_dates, importances, estimated_hours)]
+        return (
+            [calculate_priority_score(task, today) for task in inputs],
+            [calculate_smart_score(task, today) for task in inputs],
+        )
+
+    # Converting via ordinals is far quicker than building a datetime64 array
+    ordinal = today.toordinal()
+    days_until_due = np.fromiter((d.toordinal() - ordinal for d in due_dates), dtype=np.int64, count=len(due_dates))
+    days_until_due[days_until_due <= 0] = 1
+    importance = np.asarray(importances, dtype=np.int64)
+    hours = np.asarray(estimated_hours, dtype=np.int64)
+
+    # Same operations in the same order as the scalar functions, so every
+    # intermediate float is bit-for-bit the same
+    urgency_factor = 1 / days_until_due
+    effort_factor = 1 / hours
+    ps = importance * urgency_factor * effort_factor
+    smart = (urgency_factor * 0.5) + ((importance / 10) * 0.3) + (effort_factor * 0.2)
+
+    return _round3(ps), _round3(smart)
+
+
+def _round3(values):
+    """
+    Rounds to 3 places exactly like the built-in round(). np.round scales by
+    1000 first, which can tip values lying within a rounding error of a
+    half-way point the other way, so those few are rounded by Python.
+    """
+    rounded = np.round(values, 3)
+    scaled = values * 1000
+    near_half = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_half):
+        rounded[i] = round(float(values[i]), 3)
+    return rounded.tolist()
+
+
+def score_rows(rows, today=None):
+    """
+    Scores rows from values_list(*SCORE_INPUT_FIELDS, named=True).
+    Returns a list of (priorityScore, smartPriorityScore) pairs.
+    """
+    priority, smart = batch_scores(
+        [row.due_date for row in rows],
+        [row.importance for row in rows],
+        [row.estimated_hours for row in rows],
+        today,
+    )
+    return list(zip(priority, smart))
+
+
+def save_scores(rows, scores, today):
+    """
+    Writes scores back with one parameterised UPDATE by primary key,
+    executed for all rows at once. Much faster than bulk_update, whose
+    CASE expressions grow with the batch size.
+
+    Each UPDATE only applies while the task still has the due date,
+    importance and hours it was scored from. A task edited after the rows
+    were read was already rescored by that edit, and keeps those scores.
+    """
+    quote = connection.ops.quote_name
+    table = quote(Task._meta.db_table)
+    score_columns = [
+        quote(Task._meta.get_field(name).column)
+        for name in ("priorityScore", "smartPriorityScore", "scores_as_of")
+    ]
+    key_columns = [quote(Task._meta.get_field(name).column) for name in SCORE_INPUT_FIELDS]
+    sql = (
+        f"UPDATE {table} SET {', '.join(f'{column} = %s' for column in score_columns)} "
+        f"WHERE {' AND '.join(f'{column} = %s' for column in key_columns)}"
+    )
+
+    as_of = connection.ops.adapt_datefield_value(today)
+    params = [
+        (
+            priority, smart, as_of,
+            row.id, connection.ops.adapt_datefield_value(row.due_date), row.importance, row.estimated_hours,
+        )
+        for row, (priority, smart) in zip(rows, scores)
+    ]
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+# -----------------------------------
+# Helper: Refresh stale scores
+# -----------------------------------
+def refresh_stale_scores(user, today=None, chunk_size=SCORE_REFRESH_CHUNK_SIZE):
+    """
+    Both scores depend on today's date, so a stored score is only valid for
+    the day in `scores_as_of`. Recomputes the user's incomplete tasks whose
+    scores were computed on an earlier day and writes them back, at most
+    `chunk_size` at a time. Costs a single query when everything is already
+    current. Returns the number of tasks updated.
+    """
+    stale = Task.objects.filter(user=user, completed=False)
+    return sum(rescore_stale(stale, today or date.today(), chunk_size))
+
+
+def rescore_stale(tasks, today, chunk_size=SCORE_REFRESH_CHUNK_SIZE):
+    """
+    Recomputes the scores of the tasks in the queryset not yet scored for
+    `today`, reading and writing `chunk_size` rows at a time so memory stays
+    flat however many there are. Each chunk commits on its own, so progress
+    survives an interruption. Yields the number of rows in each chunk.
+    """
+    stale = (
+        tasks
+        .exclude(scores_as_of=today)
+        .order_by("id")
+        .values_list(*SCORE_INPUT_FIELDS, named=True)
+    )
+
+    last_id = 0
+    while True:
+        # Keyset over id keeps every chunk an index range scan
+        rows = list(stale.filter(id__gt=last_id)[:chunk_size])
+        if not rows:
+            return
+        save_scores(rows, score_rows(rows, today), today)
+        last_id = rows[-1].id
+        yield len(rows)
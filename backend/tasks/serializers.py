@@ -0,0 +1,87 @@
+from collections import defaultdict
+
+from django.db.models import QuerySet
+
+from .models import Task
+from .timing import timed
+
+
+def load_dependency_ids(tasks):
+    """
+    Returns {task_id: [dependency ids]} for the given tasks using a single
+    query on the Task.dependencies through-table.
+    """
+    through = Task.dependencies.through
+
+    if isinstance(tasks, QuerySet) and not tasks.query.is_sliced:
+        # Reuse the queryset's filter as a subquery so the query does not
+        # grow with the number of tasks.
+        edges = through.objects.filter(from_task_id__in=tasks.values("id"))
+    else:
+        edges = through.objects.filter(from_task_id__in=[t.id for t in tasks])
+
+    dependency_ids = defaultdict(list)
+    for from_id, to_id in edges.values_list("from_task_id", "to_task_id"):
+        dependency_ids[from_id].append(to_id)
+    return dependency_ids
+
+
+def serialize_task(task, dependency_ids=None):
+    """Converts a task to the JSON shape returned by the task endpoints."""
+    if dependency_ids is None:
+        dependency_ids = list(task.dependencies.values_list("id", flat=True))
+    return build_task_dicts([task], {task.id: dependency_ids})[0]
+
+
+def serialize_tasks(tasks):
+    """
+    Serializes a queryset (or list) of tasks.
+    Costs two queries however many tasks there are: one for the tasks and
+    one for all of their dependencies.
+    """
+    if not isinstance(tasks, QuerySet):
+        tasks = list(tasks)
+    dependency_ids = load_dependency_ids(tasks)
+    # Evaluate a queryset here, so its SELECT is not timed as serialization
+    return build_task_dicts(list(tasks), dependency_ids)
+
+
+async def aload_dependency_ids(tasks):
+    """Async form of load_dependency_ids for a list of tasks (one query)."""
+    edges = Task.dependencies.through.objects.filter(from_task_id__in=[t.id for t in tasks])
+
+    dependency_ids = defaultdict(list)
+    async for from_id, to_id in edges.values_list("from_task_id", "to_task_id"):
+        dependency_ids[from_id].append(to_id)
+    return dependency_ids
+
+
+async def aserialize_tasks(tasks):
+    """Async form of serialize_tasks for a list of tasks."""
+    return build_task_dicts(tasks, await aload_dependency_ids(tasks))
+
+
+@timed("serialize")
+def build_task_dicts(tasks, dependency_ids):
+    """
+    Builds the response dicts for already loaded tasks, given
+    {task_id: [dependency ids]}. Only this step is timed as "serialize";
+    the queries that load the tasks are counted under "db".
+    """
+    return [
+        {
+            "id": task.id,
+            "number": task.number,
+            "title": task.title,
+            "due_date": str(task.due_date),
+            "estimated_hours": task.estimated_hours,
+            "importance": task.importance,
+            "dependencies": dependency_ids.get(task.id, []),
+            "priorityScore": task.priorityScore,
+            "smartPriorityScore": task.smartPriorityScore,
+            "completed": task.completed,
+            "circularTask": task.circularTask,
+            "version": task.version,
+        }
+        for task in tasks
+    ]
@@ -0,0 +1,51 @@
+"""
+SMS backends for due-date reminders, chosen with settings.SMS_BACKEND in
+the style of Django's EMAIL_BACKEND. A backend instance keeps its client
+open, so one instance can send any number of messages.
+"""
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULT_SMS_BACKEND = "tasks.sms.TwilioBackend"
+
+# Messages "sent" by LocMemBackend, like django.core.mail.outbox
+outbox = []
+
+
+class TwilioBackend:
+    """Sends through Twilio with one Client (and one HTTP session) per backend instance."""
+
+    def __init__(self):
+        self._client = None
+
+    def is_configured(self):
+        # These settings are required for Twilio to work
+        return all([settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, settings.TWILIO_FROM_NUMBER])
+
+    def send(self, to, body):
+        if self._client is None:
+            from twilio.rest import Client
+
+            self._client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+        self._client.messages.create(body=body, from_=settings.TWILIO_FROM_NUMBER, to=to)
+
+    def close(self):
+        self._client = None
+
+
+class LocMemBackend:
+    """Keeps messages in `outbox` instead of sending them; for tests and local runs."""
+
+    def is_configured(self):
+        return True
+
+    def send(self, to, body):
+        outbox.append({"to": to, "body": body})
+
+    def close(self):
+        pass
+
+
+def get_sms_backend():
+    """Returns a new instance of the configured SMS backend."""
+    return import_string(getattr(settings, "SMS_BACKEND", DEFAULT_SMS_BACKEND))()
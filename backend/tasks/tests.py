@@ -1,3 +1,1414 @@
-from django.test import TestCase
+import base64
+import csv
+import importlib.util
+import io
+import json
+import os
+import random
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
+import django
+from asgiref.sync import sync_to_async
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from Auth.models import User
+
+from .graph import (
+    cyclic_task_ids,
+    plan_execution,
+    refresh_circular_flags,
+    set_dependencies,
+    strongly_connected_components,
+    update_circular_flags,
+)
+from . import scoring, sms, timing
+from .db import apply_sqlite_pragmas, sqlite_pragmas
+from .export import EXPORT_FORMATS, iter_task_dicts
+from .models import NotificationOutbox, ReminderDigest, Task
+from .pagination import BY_DUE_DATE, DEFAULT_PAGE_SIZE, keyset_filter
+from .scoring import ScoreInput, batch_scores, calculate_priority_score, calculate_smart_score
+from .serializers import serialize_tasks
+from .tests_support import FakeSMTPServer
+from .utils import (
+    claim_pending_notifications,
+    dispatch_pending_notifications,
+    enqueue_due_notifications,
+    enqueue_notifications,
+    send_due_digests,
+)
+
+
+def create_tasks(user, count, start=1):
+    """Creates `count` tasks for the user, each depending on the previous one."""
+    tasks = []
+    for number in range(start, start + count):
+        task = Task.objects.create(
+            user=user,
+            number=number,
+            title=f"Task {number}",
+            due_date=date.today() + timedelta(days=number % 7),
+            estimated_hours=1 + number % 5,
+            importance=1 + number % 10,
+            priorityScore=10.0,
+        )
+        if tasks:
+            task.dependencies.add(tasks[-1])
+        tasks.append(task)
+    return tasks
+
+
+class TaskAPITestCase(TestCase):
+    """Starts every test with an empty cache so cached list responses never leak between tests."""
+
+    def setUp(self):
+        cache.clear()
+
+
+class SignedInTestCase(TaskAPITestCase):
+    """Signs the test client in as a fresh user, self.user, before every test."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(email="user@example.com", password="secret", name="User")
+        self.client.force_login(self.user)
+
+
+# Measures the work of building a list, so responses must not come from the cache
+@override_settings(TASK_LIST_CACHE_TIMEOUT=0)
+class TaskListQueryCountTests(SignedInTestCase):
+    list_urls = [
+        "/api/tasks/",
+        "/api/tasks/completed/",
+        "/api/tasks/pending/",
+        "/api/tasks/circular/",
+        "/api/tasks/high-priority/",
+        "/api/tasks/by-date/",
+        "/api/tasks/with-dependencies/",
+        "/api/tasks/without-dependencies/",
+    ]
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.json()
+
+    def test_query_count_does_not_grow_with_task_count(self):
+        # Enough tasks that no list is empty; an empty page skips the
+        # dependency query
+        create_tasks(self.user, 15)
+        small = {url: self.count_queries(url)[0] for url in self.list_urls}
+
+        create_tasks(self.user, 40, start=16)
+        for url in self.list_urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url)[0], small[url])
+
+    def test_dependencies_are_serialized(self):
+        first, second = create_tasks(self.user, 2)
+
+        _, data = self.count_queries("/api/tasks/")
+
+        by_id = {t["id"]: t for t in data}
+        self.assertEqual(by_id[first.id]["dependencies"], [])
+        self.assertEqual(by_id[second.id]["dependencies"], [first.id])
+
+    def test_dependency_filters(self):
+        first, second = create_tasks(self.user, 2)
+
+        _, with_deps = self.count_queries("/api/tasks/with-dependencies/")
+        _, without_deps = self.count_queries("/api/tasks/without-dependencies/")
+
+        self.assertEqual([t["id"] for t in with_deps], [second.id])
+        self.assertEqual([t["id"] for t in without_deps], [first.id])
+
+
+class TaskListPaginationTests(SignedInTestCase):
+    def setUp(self):
+        super().setUp()
+        # Repeated due dates and scores so pages split inside groups of ties
+        create_tasks(self.user, 23)
+
+    def walk(self, url, limit):
+        ids, cursor = [], None
+        while True:
+            params = {"limit": limit}
+            if cursor:
+                params["cursor"] = cursor
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            self.assertLessEqual(len(page), limit)
+            ids.extend(t["id"] for t in page)
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                return ids
+
+    def test_pages_match_unpaginated_order(self):
+        for url in ["/api/tasks/", "/api/tasks/by-date/", "/api/tasks/high-priority/", "/api/tasks/with-dependencies/"]:
+            with self.subTest(url=url):
+                expected = [t["id"] for t in self.client.get(url).json()]
+                self.assertEqual(self.walk(url, 5), expected)
+
+    @override_settings(TASK_LIST_CACHE_TIMEOUT=0)
+    def test_page_query_count_is_independent_of_depth(self):
+        first = self.client.get("/api/tasks/by-date/", {"limit": 5})
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get("/api/tasks/by-date/", {"limit": 5, "cursor": first.headers["X-Next-Cursor"]})
+        with CaptureQueriesContext(connection) as first_ctx:
+            self.client.get("/api/tasks/by-date/", {"limit": 5})
+        self.assertEqual(len(ctx.captured_queries), len(first_ctx.captured_queries))
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get("/api/tasks/", {"limit": "abc"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/tasks/", {"limit": 0}).status_code, 400)
+        self.assertEqual(self.client.get("/api/tasks/", {"cursor": "not-a-cursor"}).status_code, 400)
+
+    def test_cursor_with_wrong_value_types_is_rejected(self):
+        def cursor(values):
+            return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+        for url, values in [
+            ("/api/tasks/", [None]),
+            ("/api/tasks/", [True]),
+            ("/api/tasks/", ["12"]),
+            ("/api/tasks/by-date/", [None, None]),
+            ("/api/tasks/by-date/", ["2030-01-01", False]),
+            ("/api/tasks/high-priority/", [True, 5]),
+            ("/api/tasks/high-priority/", ["high", 5]),
+        ]:
+            with self.subTest(url=url, values=values):
+                response = self.client.get(url, {"cursor": cursor(values)})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()["error"], "Invalid cursor")
+
+    def test_default_page_size_applies_without_limit(self):
+        create_tasks(self.user, DEFAULT_PAGE_SIZE, start=100)
+
+        for url in ["/api/tasks/", "/api/async/tasks/"]:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(len(response.json()), DEFAULT_PAGE_SIZE)
+                self.assertIn("X-Next-Cursor", response.headers)
+
+
+class CycleDetectionTests(SignedInTestCase):
+    def test_long_chain_does_not_recurse(self):
+        chain = {n: [n + 1] for n in range(20000)}
+        self.assertEqual(len(strongly_connected_components(chain)), 20001)
+        self.assertEqual(cyclic_task_ids(chain), set())
+
+        chain[20000] = [0]
+        self.assertEqual(cyclic_task_ids(chain), set(range(20001)))
+
+    def test_self_loop_and_separate_cycles(self):
+        graph = {1: [1], 2: [3], 3: [2], 4: [2], 5: []}
+        self.assertEqual(cyclic_task_ids(graph), {1, 2, 3})
+
+    def update_dependencies(self, task, dependencies):
+        response = self.client.patch(
+            f"/api/tasks/update/{task.id}/",
+            {"dependencies": dependencies},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()["task"]
+
+    def test_whole_cycle_is_flagged_and_cleared(self):
+        first, second, third = create_tasks(self.user, 3)
+
+        # third -> second -> first -> third
+        self.assertTrue(self.update_dependencies(first, [third.id])["circularTask"])
+        self.assertEqual(
+            set(Task.objects.filter(circularTask=True).values_list("id", flat=True)),
+            {first.id, second.id, third.id},
+        )
+
+        self.assertFalse(self.update_dependencies(first, [])["circularTask"])
+        self.assertFalse(Task.objects.filter(circularTask=True).exists())
+
+    def test_incremental_matches_full_recomputation(self):
+        rng = random.Random(7)
+        tasks = create_tasks(self.user, 30)
+        ids = [t.id for t in tasks]
+
+        for _ in range(150):
+            task = Task.objects.get(id=rng.choice(ids))
+            current = set(task.dependencies.values_list("id", flat=True))
+            if current and rng.random() < 0.4:
+                dep_id = rng.choice(sorted(current))
+                task.dependencies.remove(dep_id)
+                added, removed = set(), {dep_id}
+            else:
+                dep_id = rng.choice([i for i in ids if i != task.id])
+                task.dependencies.add(dep_id)
+                added, removed = {dep_id}, set()
+
+            circular = update_circular_flags(self.user, task, added=added, removed=removed)
+            flagged = set(Task.objects.filter(circularTask=True).values_list("id", flat=True))
+
+            cyclic = refresh_circular_flags(self.user)
+            self.assertEqual(flagged, cyclic)
+            self.assertEqual(circular, task.id in cyclic)
+
+    @override_settings(TASK_CYCLE_SEARCH_LIMIT=2)
+    def test_bounded_search_falls_back_to_full_pass(self):
+        tasks = create_tasks(self.user, 10)
+        self.assertTrue(self.update_dependencies(tasks[0], [tasks[-1].id])["circularTask"])
+        self.assertEqual(Task.objects.filter(circularTask=True).count(), 10)
+
+    def test_long_chain_costs_a_bounded_number_of_queries(self):
+        Task.objects.bulk_create([
+            Task(user=self.user, number=n, title=f"Task {n}", due_date=date.today(), estimated_hours=1, importance=5)
+            for n in range(1, 2001)
+        ])
+        ids = list(Task.objects.filter(user=self.user).order_by("number").values_list("id", flat=True))
+        through = Task.dependencies.through
+        through.objects.bulk_create([through(from_task_id=a, to_task_id=b) for a, b in zip(ids, ids[1:])])
+
+        # The last task of the chain closes it by depending on the first
+        last = Task.objects.get(id=ids[-1])
+        last.dependencies.add(ids[0])
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertTrue(update_circular_flags(self.user, last, added={ids[0]}))
+
+        self.assertLess(len(ctx.captured_queries), 40)
+        self.assertEqual(Task.objects.filter(circularTask=True).count(), 2000)
+
+
+class ScoreFreshnessTests(SignedInTestCase):
+    def test_stale_scores_are_recomputed_before_filtering(self):
+        # Scored two days ago, when the task was still three days out
+        task = Task.objects.create(
+            user=self.user, number=1, title="Report", due_date=date.today() + timedelta(days=1),
+            estimated_hours=1, importance=9, priorityScore=3.0, smartPriorityScore=0.5,
+            scores_as_of=date.today() - timedelta(days=2),
+        )
+
+        data = self.client.get("/api/tasks/high-priority/", {"min": 5}).json()
+
+        self.assertEqual([t["id"] for t in data], [task.id])
+        self.assertEqual(data[0]["priorityScore"], 9.0)
+        task.refresh_from_db()
+        self.assertEqual(task.scores_as_of, date.today())
+
+    def test_completed_tasks_are_not_high_priority(self):
+        # Frozen score from when the task was due the next day
+        Task.objects.create(
+            user=self.user, number=1, title="Done", due_date=date.today() - timedelta(days=5),
+            estimated_hours=1, importance=9, priorityScore=9.0, completed=True,
+            scores_as_of=date.today() - timedelta(days=6),
+        )
+
+        self.assertEqual(self.client.get("/api/tasks/high-priority/", {"min": 5}).json(), [])
+        self.assertEqual(self.client.get("/api/async/tasks/high-priority/", {"min": 5}).json(), [])
+
+    def test_refresh_works_in_chunks(self):
+        create_tasks(self.user, 25)
+        Task.objects.update(scores_as_of=date.today() - timedelta(days=1))
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(scoring.refresh_stale_scores(self.user, chunk_size=10), 25)
+
+        reads = [q for q in ctx.captured_queries if q["sql"].startswith("SELECT")]
+        self.assertEqual(len(reads), 4)  # 10 + 10 + 5, then an empty chunk
+        self.assertTrue(all("LIMIT 10" in q["sql"] for q in reads))
+        self.assertFalse(Task.objects.exclude(scores_as_of=date.today()).exists())
+
+    def test_refresh_keeps_scores_of_a_task_edited_meanwhile(self):
+        task, other = create_tasks(self.user, 2)
+        Task.objects.update(scores_as_of=date.today() - timedelta(days=1))
+        score_rows = scoring.score_rows
+
+        def edit_then_score(rows, today=None):
+            # Another request edits and rescores the task after the refresh read it
+            task.importance = 10
+            task.priorityScore = calculate_priority_score(task)
+            task.scores_as_of = date.today()
+            task.save()
+            return score_rows(rows, today)
+
+        with mock.patch("tasks.scoring.score_rows", edit_then_score):
+            scoring.refresh_stale_scores(self.user)
+
+        task.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(task.importance, 10)
+        self.assertEqual(task.priorityScore, calculate_priority_score(task))
+        self.assertEqual(other.scores_as_of, date.today())
+        self.assertEqual(other.priorityScore, calculate_priority_score(other))
+
+    def test_recompute_command_scores_stale_tasks_once(self):
+        create_tasks(self.user, 5)
+        out = StringIO()
+
+        call_command("recompute_scores", stdout=out)
+        self.assertIn("Rescored 5 tasks", out.getvalue())
+        for task in Task.objects.all():
+            self.assertEqual(task.scores_as_of, date.today())
+            self.assertEqual(task.priorityScore, calculate_priority_score(task))
+            self.assertEqual(task.smartPriorityScore, calculate_smart_score(task))
+
+        # A second run finds nothing left to do
+        call_command("recompute_scores", stdout=out)
+        self.assertIn("Rescored 0 tasks", out.getvalue())
+
+
+class BatchScoringTests(TestCase):
+    def setUp(self):
+        rng = random.Random(11)
+        self.today = date(2026, 1, 15)
+        # Includes overdue and due-today tasks to exercise the days <= 0 clamp
+        self.due_dates = [self.today + timedelta(days=rng.randint(-30, 400)) for _ in range(5000)]
+        self.importances = [rng.randint(1, 10) for _ in range(5000)]
+        self.hours = [rng.randint(1, 200) for _ in range(5000)]
+
+    def expected(self):
+        inputs = [ScoreInput(*values) for values in zip(self.due_dates, self.importances, self.hours)]
+        return (
+            [calculate_priority_score(task, self.today) for task in inputs],
+            [calculate_smart_score(task, self.today) for task in inputs],
+        )
+
+    @skipIf(scoring.np is None, "NumPy is not installed")
+    def test_numpy_matches_scalar_functions(self):
+        result = batch_scores(self.due_dates, self.importances, self.hours, self.today)
+        self.assertEqual(result, self.expected())
+
+    def test_pure_python_matches_scalar_functions(self):
+        with mock.patch.object(scoring, "np", None):
+            result = batch_scores(self.due_dates, self.importances, self.hours, self.today)
+        self.assertEqual(result, self.expected())
+
+    def test_empty_input(self):
+        self.assertEqual(batch_scores([], [], [], self.today), ([], []))
+
+
+class PlanTests(TaskAPITestCase):
+    def make(self, task_id, score):
+        return Task(id=task_id, number=task_id, title=f"Task {task_id}", due_date=date.today(),
+                    estimated_hours=1, importance=5, smartPriorityScore=score)
+
+    def test_plan_orders_by_readiness_then_score(self):
+        tasks = [self.make(i, score) for i, score in [(1, 0.9), (2, 0.1), (3, 0.5), (4, 0.8), (5, 0.8), (6, 1.0), (7, 0.7)]]
+        # 1 waits on 2; 4 and 5 form a cycle; 6 waits on the cycle; 7 waits on a completed task (99)
+        graph = {1: [2], 4: [5], 5: [4], 6: [4], 7: [99]}
+
+        plan = plan_execution(tasks, graph, top_k=2)
+
+        self.assertEqual([t.id for t in plan["order"]], [7, 3, 2, 1])
+        self.assertEqual([t.id for t in plan["ready"]], [7, 3])
+        self.assertEqual([t.id for t in plan["circular"]], [4, 5])
+        self.assertEqual([t.id for t in plan["blocked"]], [6])
+
+    def test_plan_endpoint(self):
+        user = User.objects.create_user(email="user@example.com", password="secret", name="User")
+        self.client.force_login(user)
+        first, second = create_tasks(user, 2)
+
+        response = self.client.get("/api/tasks/plan/", {"top": 5})
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["order"], [first.id, second.id])
+        self.assertEqual([t["id"] for t in data["ready"]], [first.id])
+        self.assertEqual(data["circular"], [])
+        self.assertEqual(self.client.get("/api/tasks/plan/", {"top": 0}).status_code, 400)
+
+
+@skipUnless(connection.vendor == "sqlite", "Query plans are checked on SQLite")
+class TaskIndexQueryPlanTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="user@example.com", password="secret", name="User")
+        create_tasks(self.user, 20)
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, plan)
+
+    def test_list_endpoints_use_composite_indexes(self):
+        tasks = Task.objects.filter(user=self.user)
+        self.assertUsesIndex(tasks.order_by("due_date", "id")[:50], "tasks_user_due_idx")
+        self.assertUsesIndex(
+            tasks.filter(priorityScore__gte=5).order_by("-priorityScore", "-id")[:50],
+            "tasks_user_priority_idx",
+        )
+
+    def test_boolean_filters_use_partial_indexes(self):
+        tasks = Task.objects.filter(user=self.user)
+        self.assertUsesIndex(tasks.filter(completed=False).order_by("-id")[:50], "tasks_pending_idx")
+        self.assertUsesIndex(tasks.filter(completed=True).order_by("-id")[:50], "tasks_completed_idx")
+        self.assertUsesIndex(tasks.filter(completed=False, due_date=date.today()), "tasks_pending_due_idx")
+        self.assertUsesIndex(tasks.filter(circularTask=True).order_by("-id")[:50], "tasks_circular_idx")
+        self.assertUsesIndex(
+            Task.objects.filter(completed=False, id__gt=0).order_by("id")[:50],
+            "tasks_pending_id_idx",
+        )
+
+    def test_keyset_page_starts_from_an_index_range(self):
+        page = (
+            Task.objects.filter(user=self.user)
+            .filter(keyset_filter(BY_DUE_DATE, [date.today(), 1]))
+            .order_by("due_date", "id")[:50]
+        )
+        plan = page.explain()
+        self.assertIn("tasks_user_due_idx (user_id=? AND due_date>?)", plan, plan)
+
+
+class TaskListCacheTests(SignedInTestCase):
+    def setUp(self):
+        super().setUp()
+        create_tasks(self.user, 3)
+
+    def test_repeated_list_is_served_from_cache(self):
+        first = self.client.get("/api/tasks/pending/")
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.get("/api/tasks/pending/")
+
+        self.assertEqual(second.content, first.content)
+        self.assertFalse([q for q in ctx.captured_queries if '"tasks_task"' in q["sql"]])
+
+    def test_writes_invalidate_cached_lists(self):
+        before = self.client.get("/api/tasks/").json()
+
+        response = self.client.post(
+            "/api/tasks/",
+            {"number": 10, "title": "New", "due_date": str(date.today()), "estimated_hours": 1, "importance": 5},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        after = self.client.get("/api/tasks/").json()
+        self.assertEqual(len(after), len(before) + 1)
+
+        self.client.post(f"/api/tasks/toggle/{after[0]['id']}/")
+        self.assertTrue(self.client.get("/api/tasks/").json()[0]["completed"])
+
+    def test_matching_etag_returns_not_modified(self):
+        etag = self.client.get("/api/tasks/by-date/")["ETag"]
+
+        response = self.client.get("/api/tasks/by-date/", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+
+    def test_not_modified_does_not_touch_task_table(self):
+        first = self.client.get("/api/tasks/high-priority/")
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/tasks/high-priority/", HTTP_IF_NONE_MATCH=first["ETag"])
+
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse([q for q in ctx.captured_queries if '"tasks_task"' in q["sql"]])
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get("/api/tasks/")["Last-Modified"]
+        self.assertEqual(self.client.get("/api/tasks/", HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+    def test_etag_changes_after_write(self):
+        etag = self.client.get("/api/tasks/")["ETag"]
+        task = Task.objects.filter(user=self.user).first()
+
+        self.client.post(f"/api/tasks/toggle/{task.id}/")
+
+        response = self.client.get("/api/tasks/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_etag_is_per_user(self):
+        etag = self.client.get("/api/tasks/")["ETag"]
+        other = User.objects.create_user(email="other@example.com", password="secret", name="Other")
+        self.client.force_login(other)
+
+        self.assertEqual(self.client.get("/api/tasks/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class BulkImportTests(SignedInTestCase):
+    def item(self, number, **fields):
+        return {
+            "number": number,
+            "title": f"Task {number}",
+            "due_date": (date.today() + timedelta(days=number % 7)).isoformat(),
+            "estimated_hours": 2,
+            "importance": 5,
+            **fields,
+        }
+
+    def post(self, items):
+        return self.client.post("/api/tasks/bulk/", items, content_type="application/json")
+
+    def test_import_resolves_batch_and_existing_dependencies(self):
+        existing = create_tasks(self.user, 1, start=100)[0]
+        items = [
+            self.item(1, dependency_numbers=[2]),
+            self.item(2, dependencies=[existing.id]),
+            # 3 and 4 form a cycle within the batch
+            self.item(3, dependency_numbers=[4, 100]),
+            self.item(4, dependency_numbers=[3]),
+        ]
+
+        response = self.post(items)
+
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertEqual(data["created"], 4)
+        by_number = {t["number"]: t for t in data["tasks"]}
+        self.assertEqual(by_number[2]["dependencies"], [existing.id])
+        self.assertEqual(by_number[1]["dependencies"], [by_number[2]["id"]])
+        self.assertEqual(sorted(by_number[3]["dependencies"]), sorted([by_number[4]["id"], existing.id]))
+        self.assertEqual({n for n, t in by_number.items() if t["circularTask"]}, {3, 4})
+        self.assertEqual(
+            set(Task.objects.filter(user=self.user, circularTask=True).values_list("number", flat=True)), {3, 4}
+        )
+        task = Task.objects.get(user=self.user, number=1)
+        self.assertEqual(task.priorityScore, calculate_priority_score(task))
+        self.assertEqual(task.scores_as_of, date.today())
+
+    def test_invalid_items_are_all_reported_and_nothing_is_created(self):
+        create_tasks(self.user, 1, start=100)
+        items = [
+            self.item(1),
+            self.item(100),
+            self.item(2, importance=11),
+            self.item(3, dependency_numbers=[999]),
+            self.item(1),
+            self.item(4, dependency_numbers=[4]),
+        ]
+
+        response = self.post({"tasks": items})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [(e["index"], e["error"]) for e in response.json()["errors"]],
+            [
+                (1, "Task number already exists for this user"),
+                (2, "Importance must be between 1 and 10"),
+                (3, "Dependency number 999 does not exist"),
+                (4, "Task number 1 appears more than once in the batch"),
+                (5, "A task cannot depend on itself"),
+            ],
+        )
+        self.assertEqual(Task.objects.filter(user=self.user).count(), 1)
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        def count(start, size):
+            items = [self.item(n, dependency_numbers=[n - 1] if n > start else []) for n in range(start, start + size)]
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.post(items).status_code, 201)
+            return len(ctx.captured_queries)
+
+        small = count(1, 5)
+        # Only the number of INSERT batches grows, never a query per task
+        self.assertLess(count(1000, 200), small + 10)
+
+
+class TaskExportTests(SignedInTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tasks = create_tasks(self.user, 5)
+
+    def read(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode("utf-8")
+
+    def test_ndjson_export_matches_task_list(self):
+        body = self.read(self.client.get("/api/tasks/export/"))
+
+        exported = [json.loads(line) for line in body.splitlines()]
+        listed = sorted(self.client.get("/api/tasks/").json(), key=lambda t: t["id"])
+        self.assertEqual(exported, listed)
+
+    def test_csv_export(self):
+        body = self.read(self.client.get("/api/tasks/export/", {"format": "csv"}))
+
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual([int(row["id"]) for row in rows], [t.id for t in self.tasks])
+        self.assertEqual(rows[1]["dependencies"], str(self.tasks[0].id))
+        self.assertEqual(self.client.get("/api/tasks/export/", {"format": "xml"}).status_code, 400)
+
+    def test_dependencies_are_loaded_per_chunk(self):
+        with CaptureQueriesContext(connection) as ctx:
+            exported = list(iter_task_dicts(self.user, chunk_size=2))
+
+        self.assertEqual([t["dependencies"] for t in exported], [[]] + [[t.id] for t in self.tasks[:-1]])
+        # One query for the tasks plus one for the dependencies of each of the 3 chunks
+        self.assertEqual(len(ctx.captured_queries), 4)
+
+    def test_export_command(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            call_command("export_tasks", output_dir=output_dir, stdout=StringIO())
+
+            with open(os.path.join(output_dir, f"tasks-{self.user.id}.ndjson"), encoding="utf-8") as f:
+                self.assertEqual([json.loads(line)["id"] for line in f], [t.id for t in self.tasks])
+
+    def test_export_refreshes_scores_in_chunks(self):
+        Task.objects.update(scores_as_of=date.today() - timedelta(days=1))
+
+        with tempfile.TemporaryDirectory() as output_dir, CaptureQueriesContext(connection) as ctx:
+            call_command("export_tasks", output_dir=output_dir, chunk_size=2, stdout=StringIO())
+
+        rescore_reads = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("SELECT") and '"scores_as_of" =' in q["sql"]]
+        self.assertEqual(len(rescore_reads), 4)  # 2 + 2 + 1, then an empty chunk
+        self.assertTrue(all("LIMIT 2" in sql for sql in rescore_reads))
+        self.assertFalse(Task.objects.exclude(scores_as_of=date.today()).exists())
+
+
+class DependencyUpdateTests(SignedInTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tasks = create_tasks(self.user, 12)
+        self.task = self.tasks[-1]
+
+    def patch(self, dependencies):
+        return self.client.patch(
+            f"/api/tasks/update/{self.task.id}/",
+            {"dependencies": dependencies},
+            content_type="application/json",
+        )
+
+    def dependency_ids(self):
+        return set(self.task.dependencies.values_list("id", flat=True))
+
+    def test_dependencies_are_applied_as_a_diff(self):
+        new_ids = {t.id for t in self.tasks[:5]}
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.patch(sorted(new_ids)).status_code, 200)
+
+        self.assertEqual(self.dependency_ids(), new_ids)
+        sql = [q["sql"] for q in ctx.captured_queries]
+        # Only the dropped edge is deleted; the edge set is never cleared
+        deletes = [q for q in sql if q.startswith("DELETE")]
+        self.assertEqual(len(deletes), 1)
+        self.assertIn('"to_task_id" IN', deletes[0])
+        # All dependencies are looked up in one query
+        lookups = [q for q in sql if q.startswith("SELECT") and 'FROM "tasks_task" ' in q and '"id" IN' in q]
+        self.assertEqual(len(lookups), 1)
+
+    def test_invalid_dependency_leaves_edges_untouched(self):
+        other = User.objects.create_user(email="other@example.com", password="secret", name="Other")
+        foreign = create_tasks(other, 1)[0]
+        before = self.dependency_ids()
+
+        for dependencies in ([self.tasks[0].id, foreign.id], [self.tasks[0].id, 99999], [self.task.id], ["x"]):
+            self.assertEqual(self.patch(dependencies).status_code, 400)
+            self.assertEqual(self.dependency_ids(), before)
+
+    def test_create_validates_dependencies_before_writing(self):
+        response = self.client.post(
+            "/api/tasks/",
+            {"number": 100, "title": "New", "due_date": "2030-01-01", "estimated_hours": 1,
+             "importance": 5, "dependencies": [self.tasks[0].id, 99999]},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error"], "Dependency 99999 does not exist or is invalid")
+        self.assertFalse(Task.objects.filter(user=self.user, number=100).exists())
+
+
+class TaskUpdateTests(SignedInTestCase):
+    def setUp(self):
+        super().setUp()
+        self.first, self.task = create_tasks(self.user, 2)
+
+    def patch(self, data):
+        return self.client.patch(f"/api/tasks/update/{self.task.id}/", data, content_type="application/json")
+
+    def test_update_is_a_single_write_of_changed_columns(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.patch({"title": "Renamed", "importance": 9, "version": 1})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["task"]["version"], 2)
+        writes = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith('UPDATE "tasks_task"')]
+        self.assertEqual(len(writes), 1)
+        self.assertNotIn('"due_date"', writes[0])
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.title, self.task.importance, self.task.version), ("Renamed", 9, 2))
+        self.assertEqual(self.task.priorityScore, calculate_priority_score(self.task))
+
+    def test_stale_version_is_rejected(self):
+        self.assertEqual(self.patch({"title": "From tab A", "version": 1}).status_code, 200)
+
+        response = self.patch({"title": "From tab B", "dependencies": [], "version": 1})
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["task"]["title"], "From tab A")
+        self.assertEqual(list(self.task.dependencies.values_list("id", flat=True)), [self.first.id])
+
+    def test_concurrent_edit_rolls_back_dependency_changes(self):
+        def set_dependencies_then_race(task, dependency_ids):
+            result = set_dependencies(task, dependency_ids)
+            # Another request saves its edit between our read and our write
+            Task.objects.filter(id=task.id).update(title="Other edit", version=F("version") + 1)
+            return result
+
+        with mock.patch("tasks.views.set_dependencies", side_effect=set_dependencies_then_race):
+            response = self.patch({"dependencies": [], "version": 1})
+
+        self.assertEqual(response.status_code, 409)
+        # The dependency change was rolled back with the failed write
+        self.assertEqual(list(self.task.dependencies.values_list("id", flat=True)), [self.first.id])
+
+
+class CompletionTests(SignedInTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tasks = create_tasks(self.user, 4)
+        self.task = self.tasks[0]
+
+    def toggle(self, data=None):
+        if data is None:
+            return self.client.post(f"/api/tasks/toggle/{self.task.id}/")
+        return self.client.post(f"/api/tasks/toggle/{self.task.id}/", data, content_type="application/json")
+
+    def test_toggle_flips_in_a_single_update(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.toggle()
+
+        self.assertTrue(response.json()["completed"])
+        writes = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith('UPDATE "tasks_task"')]
+        self.assertEqual(len(writes), 1)
+        self.assertIn('NOT "tasks_task"."completed"', writes[0])
+        self.assertFalse(self.toggle().json()["completed"])
+
+    def test_explicit_target_is_idempotent(self):
+        self.assertTrue(self.toggle({"completed": True}).json()["completed"])
+        self.assertTrue(self.toggle({"completed": True}).json()["completed"])
+        self.task.refresh_from_db()
+        self.assertTrue(self.task.completed)
+
+    def test_toggle_other_users_task(self):
+        other = User.objects.create_user(email="other@example.com", password="secret", name="Other")
+        self.client.force_login(other)
+        self.assertEqual(self.toggle().status_code, 404)
+
+    def test_bulk_set_completed(self):
+        other = User.objects.create_user(email="other@example.com", password="secret", name="Other")
+        foreign = create_tasks(other, 1)[0]
+        self.toggle()
+        ids = [t.id for t in self.tasks[:3]] + [foreign.id]
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post("/api/tasks/bulk/complete/", {"ids": ids}, content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        # The first task was already completed and the foreign task is not ours
+        self.assertEqual(response.json()["updated"], 2)
+        self.assertEqual(len([q for q in ctx.captured_queries if q["sql"].startswith('UPDATE "tasks_task"')]), 1)
+        self.assertEqual(
+            list(Task.objects.filter(completed=True).order_by("id").values_list("id", flat=True)),
+            [t.id for t in self.tasks[:3]],
+        )
+        self.assertEqual(
+            self.client.post("/api/tasks/bulk/complete/", {"ids": "x"}, content_type="application/json").status_code, 400
+        )
+
+    def test_bulk_set_completed_rejects_non_integer_ids(self):
+        task_id = self.tasks[0].id
+        for ids in ([True], [task_id, False], [str(task_id)], [task_id + 0.5], [None]):
+            for prefix in ("/api/tasks/", "/api/async/tasks/"):
+                with self.subTest(ids=ids, prefix=prefix):
+                    response = self.client.post(f"{prefix}bulk/complete/", {"ids": ids}, content_type="application/json")
+                    self.assertEqual(response.status_code, 400)
+                    self.assertEqual(response.json()["error"], "Ids must be integers")
+        self.assertFalse(Task.objects.filter(completed=True).exists())
+
+
+class BulkDeleteTests(SignedInTestCase):
+    def setUp(self):
+        super().setUp()
+        # Each task depends on the previous one: 1 <- 2 <- 3 <- 4
+        self.tasks = create_tasks(self.user, 4)
+
+    def delete(self, tasks, **data):
+        return self.client.post(
+            "/api/tasks/bulk/delete/", {"ids": [t.id for t in tasks], **data}, content_type="application/json"
+        )
+
+    def remaining(self):
+        return set(Task.objects.filter(user=self.user).values_list("number", flat=True))
+
+    def test_set_closed_under_dependents_is_deleted(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.delete(self.tasks[2:])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["deleted"], [t.id for t in self.tasks[2:]])
+        self.assertEqual(self.remaining(), {1, 2})
+        reverse_lookups = [q for q in ctx.captured_queries if q["sql"].startswith("SELECT") and '"to_task_id" IN' in q["sql"]]
+        self.assertEqual(len(reverse_lookups), 1)
+
+    def test_outside_dependents_block_the_whole_set(self):
+        response = self.delete([self.tasks[0], self.tasks[2]])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json()["error"],
+            "Cannot delete task #1. Other tasks depend on it: 2 Cannot delete task #3. Other tasks depend on it: 4",
+        )
+        self.assertEqual(self.remaining(), {1, 2, 3, 4})
+
+    def test_cascade_deletes_the_dependent_subtree(self):
+        response = self.delete([self.tasks[1]], cascade=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.remaining(), {1})
+
+    def test_unknown_or_foreign_ids_are_rejected(self):
+        other = User.objects.create_user(email="other@example.com", password="secret", name="Other")
+        foreign = create_tasks(other, 1)[0]
+
+        self.assertEqual(self.delete([self.tasks[3], foreign]).status_code, 400)
+        self.assertEqual(self.remaining(), {1, 2, 3, 4})
+
+    def test_single_delete_keeps_its_message(self):
+        response = self.client.delete(f"/api/tasks/delete/{self.tasks[0].id}/")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error"], "Cannot delete task #1. Other tasks depend on it: 2")
+        self.assertEqual(self.client.delete(f"/api/tasks/delete/{self.tasks[3].id}/").status_code, 200)
+
+
+@override_settings(TASK_TIMING_ENABLED=True)
+class RequestTimingTests(SignedInTestCase):
+    def setUp(self):
+        super().setUp()
+        timing.reset()
+        create_tasks(self.user, 3)
+
+    def test_server_timing_header(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/tasks/")
+
+        header = response["Server-Timing"]
+        self.assertIn(f'desc="{len(ctx.captured_queries)} queries"', header)
+        for metric in ("db;dur=", "serialize;dur=", "notify;dur=", "total;dur="):
+            self.assertIn(metric, header)
+
+    def test_metrics_endpoint_is_staff_only(self):
+        self.client.get("/api/tasks/")
+        self.client.get("/api/tasks/")
+        self.assertEqual(self.client.get("/api/tasks/metrics/").status_code, 403)
+
+        staff = User.objects.create_user(email="admin@example.com", password="secret", name="Admin", is_staff=True)
+        self.client.force_login(staff)
+        routes = self.client.get("/api/tasks/metrics/").json()["routes"]
+
+        self.assertEqual(routes["list-create-tasks"]["total_ms"]["count"], 2)
+        self.assertEqual(sum(routes["list-create-tasks"]["queries"]["buckets"].values()), 2)
+
+    async def test_async_views_are_timed(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get("/api/async/tasks/")
+
+        # The query hooks must sit on the thread that runs the ORM calls
+        self.assertRegex(response["Server-Timing"], r'desc="[1-9][0-9]* queries"')
+        self.assertEqual(timing.snapshot()["async-list-create-tasks"]["total_ms"]["count"], 1)
+
+    def test_serialize_excludes_query_time(self):
+        def slow_query(execute, sql, params, many, context):
+            time.sleep(0.05)
+            return execute(sql, params, many, context)
+
+        timings, token = timing.start_request()
+        try:
+            with connection.execute_wrapper(timings.record_query), connection.execute_wrapper(slow_query):
+                data = serialize_tasks(Task.objects.filter(user=self.user))
+        finally:
+            timing.end_request(token)
+
+        self.assertEqual(len(data), 3)
+        self.assertEqual(timings.queries, 2)
+        self.assertGreaterEqual(timings.durations["db"], 0.1)
+        self.assertLess(timings.durations["serialize"], 0.05)
+
+    @override_settings(TASK_TIMING_ENABLED=False)
+    def test_disabled(self):
+        self.assertNotIn("Server-Timing", self.client.get("/api/tasks/"))
+        self.assertEqual(timing.snapshot(), {})
+
+
+class AsyncTaskViewTests(SignedInTestCase):
+    list_paths = [
+        "",
+        "completed/",
+        "pending/",
+        "circular/",
+        "high-priority/",
+        "by-date/",
+        "with-dependencies/",
+        "without-dependencies/",
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.tasks = create_tasks(self.user, 6)
+
+    async def test_lists_match_sync_views(self):
+        await self.async_client.aforce_login(self.user)
+        for path in self.list_paths:
+            for params in ({}, {"limit": 2}):
+                sync_response = await sync_to_async(self.client.get)(f"/api/tasks/{path}", params)
+                async_response = await self.async_client.get(f"/api/async/tasks/{path}", params)
+
+                self.assertEqual(async_response.status_code, 200, path)
+                self.assertEqual(async_response.json(), sync_response.json(), path)
+                self.assertEqual(async_response.get("X-Next-Cursor"), sync_response.get("X-Next-Cursor"), path)
+
+    async def test_conditional_get(self):
+        await self.async_client.aforce_login(self.user)
+        etag = (await self.async_client.get("/api/async/tasks/"))["ETag"]
+
+        response = await self.async_client.get("/api/async/tasks/", headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 304)
+
+    async def test_create_toggle_and_delete(self):
+        await self.async_client.aforce_login(self.user)
+        last = self.tasks[-1]
+
+        response = await self.async_client.post(
+            "/api/async/tasks/",
+            {"number": 100, "title": "Async", "due_date": "2030-01-01", "estimated_hours": 2,
+             "importance": 5, "dependencies": [last.id]},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        created = response.json()["task"]
+        self.assertEqual(created["dependencies"], [last.id])
+
+        response = await self.async_client.post(f"/api/async/tasks/toggle/{created['id']}/")
+        self.assertTrue(response.json()["completed"])
+
+        response = await self.async_client.delete(f"/api/async/tasks/delete/{last.id}/")
+        self.assertEqual(response.status_code, 400)
+        response = await self.async_client.delete(f"/api/async/tasks/delete/{created['id']}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(await Task.objects.filter(id=created["id"]).aexists())
+
+    async def test_update_matches_sync_view(self):
+        await self.async_client.aforce_login(self.user)
+        first, second = self.tasks[0], self.tasks[1]
+
+        response = await self.async_client.patch(
+            f"/api/async/tasks/update/{first.id}/",
+            {"title": "Renamed", "dependencies": [second.id], "version": 1},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        task = response.json()["task"]
+        self.assertEqual((task["title"], task["dependencies"], task["version"]), ("Renamed", [second.id], 2))
+        self.assertTrue(task["circularTask"])
+
+        sync_task = (await sync_to_async(self.client.get)("/api/tasks/")).json()
+        self.assertIn(task, sync_task)
+
+        # The same stale version is rejected with the current task
+        response = await self.async_client.patch(
+            f"/api/async/tasks/update/{first.id}/", {"title": "Stale", "version": 1}, content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["task"]["title"], "Renamed")
+
+    async def test_bulk_endpoints(self):
+        await self.async_client.aforce_login(self.user)
+
+        response = await self.async_client.post(
+            "/api/async/tasks/bulk/",
+            [{"number": 100 + i, "title": f"Bulk {i}", "due_date": "2030-01-01", "estimated_hours": 1, "importance": 5}
+             for i in range(3)],
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        ids = [t["id"] for t in response.json()["tasks"]]
+
+        response = await self.async_client.post(
+            "/api/async/tasks/bulk/complete/", {"ids": ids}, content_type="application/json",
+        )
+        self.assertEqual(response.json()["updated"], 3)
+        self.assertEqual(await Task.objects.filter(id__in=ids, completed=True).acount(), 3)
+
+        response = await self.async_client.post(
+            "/api/async/tasks/bulk/delete/", {"ids": [self.tasks[0].id]}, content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        response = await self.async_client.post(
+            "/api/async/tasks/bulk/delete/", {"ids": ids}, content_type="application/json",
+        )
+        self.assertEqual(response.json()["deleted"], sorted(ids))
+
+    async def test_plan_and_export_match_sync_views(self):
+        await self.async_client.aforce_login(self.user)
+
+        sync_plan = await sync_to_async(self.client.get)("/api/tasks/plan/", {"top": 3})
+        async_plan = await self.async_client.get("/api/async/tasks/plan/", {"top": 3})
+        self.assertEqual(async_plan.json(), sync_plan.json())
+
+        for export_format in EXPORT_FORMATS:
+            sync_export = await sync_to_async(self.client.get)("/api/tasks/export/", {"format": export_format})
+            async_export = await self.async_client.get("/api/async/tasks/export/", {"format": export_format})
+            body = b"".join([chunk async for chunk in async_export.streaming_content])
+            self.assertEqual(body, await sync_to_async(sync_export.getvalue)(), export_format)
+
+    async def test_requires_authentication(self):
+        response = await self.async_client.get("/api/async/tasks/")
+        self.assertEqual(response.status_code, 401)
+
+
+class SQLiteProfileTests(TestCase):
+    def contend(self, profile, begin, threads=8, writes=100):
+        """
+        Runs `threads` writers against one SQLite file, each doing
+        read-then-write transactions like update_task. Returns
+        (lock errors, committed writes).
+        """
+        pragmas = sqlite_pragmas(profile)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "contention.sqlite3")
+            setup = sqlite3.connect(path)
+            apply_sqlite_pragmas(setup, pragmas)
+            setup.execute("CREATE TABLE task (id INTEGER PRIMARY KEY, completed BOOL, version INT)")
+            setup.executemany("INSERT INTO task VALUES (?, 0, 1)", [(i,) for i in range(50)])
+            setup.commit()
+            setup.close()
+
+            errors, committed = [], []
+
+            def writer(offset):
+                conn = sqlite3.connect(path, isolation_level=None)
+                apply_sqlite_pragmas(conn, pragmas)
+                for i in range(writes):
+                    task_id = (offset * 7 + i) % 50
+                    try:
+                        conn.execute(begin)
+                        conn.execute("SELECT * FROM task WHERE id = ?", (task_id,)).fetchall()
+                        conn.execute("UPDATE task SET completed = NOT completed, version = version + 1 WHERE id = ?", (task_id,))
+                        conn.execute("COMMIT")
+                        committed.append(task_id)
+                    except sqlite3.OperationalError:
+                        if conn.in_transaction:
+                            conn.execute("ROLLBACK")
+                        errors.append(task_id)
+                conn.close()
+
+            workers = [threading.Thread(target=writer, args=(n,)) for n in range(threads)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        return len(errors), len(committed)
+
+    def test_production_profile_removes_lock_errors(self):
+        errors, committed = self.contend("production", "BEGIN IMMEDIATE")
+
+        self.assertEqual(errors, 0)
+        self.assertEqual(committed, 8 * 100)
+
+    def test_pragmas_are_applied(self):
+        with tempfile.TemporaryDirectory() as directory:
+            conn = sqlite3.connect(os.path.join(directory, "profile.sqlite3"))
+            apply_sqlite_pragmas(conn, sqlite_pragmas("production"))
+
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+            self.assertEqual(conn.execute("PRAGMA busy_timeout").fetchone()[0], 5000)
+            self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)  # NORMAL
+            conn.close()
+
+        with self.assertRaises(ImproperlyConfigured):
+            sqlite_pragmas("fast")
+
+    @override_settings(DATABASE_PROFILE="production")
+    def test_new_django_connections_get_the_profile(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # A second connection to a file database; opening it fires connection_created
+            settings_dict = {**connections["default"].settings_dict, "NAME": os.path.join(directory, "profile.sqlite3")}
+            wrapper = connections["default"].__class__(settings_dict, alias="profile")
+            try:
+                with wrapper.cursor() as cursor:
+                    cursor.execute("PRAGMA journal_mode")
+                    self.assertEqual(cursor.fetchone()[0], "wal")
+                    cursor.execute("PRAGMA busy_timeout")
+                    self.assertEqual(cursor.fetchone()[0], 5000)
+            finally:
+                wrapper.close()
+
+    def test_production_settings(self):
+        path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "backend", "settings.py")
+        spec = importlib.util.spec_from_file_location("production_settings", path)
+        module = importlib.util.module_from_spec(spec)
+        with mock.patch.dict(os.environ, {"DATABASE_PROFILE": "production"}):
+            spec.loader.exec_module(module)
+
+        database = module.DATABASES["default"]
+        self.assertEqual(database["CONN_MAX_AGE"], 600)
+        self.assertTrue(database["CONN_HEALTH_CHECKS"])
+        if django.VERSION >= (5, 1):
+            self.assertEqual(database["OPTIONS"]["transaction_mode"], "IMMEDIATE")
+
+
+@override_settings(
+    EMAIL_HOST_USER="reminders@example.com",
+    EMAIL_HOST_PASSWORD="secret",
+    SMS_BACKEND="tasks.sms.LocMemBackend",
+)
+class NotificationOutboxTests(TaskAPITestCase):
+    def setUp(self):
+        super().setUp()
+        sms.outbox.clear()
+        self.user = User.objects.create_user(email="notify@example.com", password="secret", name="Notify", phone="9876543210")
+        self.client.force_login(self.user)
+        self.task = Task.objects.create(
+            user=self.user, number=1, title="Due soon", due_date=date.today() + timedelta(days=1),
+            estimated_hours=1, importance=5,
+        )
+
+    def dispatch(self, **kwargs):
+        with mock.patch("builtins.print"):
+            return dispatch_pending_notifications(**kwargs)
+
+    def test_repeated_list_requests_queue_each_reminder_once(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get("/api/tasks/").status_code, 200)
+            cache.clear()
+
+        self.assertEqual(NotificationOutbox.objects.filter(task=self.task).count(), 2)
+
+    def test_completed_and_rescheduled_tasks_are_skipped(self):
+        other = Task.objects.create(
+            user=self.user, number=2, title="Moved", due_date=self.task.due_date, estimated_hours=1, importance=5,
+        )
+        enqueue_notifications([self.task, other])
+        Task.objects.filter(id=self.task.id).update(completed=True)
+        Task.objects.filter(id=other.id).update(due_date=F("due_date") + timedelta(days=3))
+
+        counts = self.dispatch()
+
+        self.assertEqual(counts, {"sent": 0, "retrying": 0, "failed": 0, "skipped": 4})
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(len(sms.outbox), 0)
+
+    def test_missing_phone_is_skipped_without_retrying(self):
+        User.objects.filter(id=self.user.id).update(phone=None)
+        enqueue_notifications([self.task])
+
+        counts = self.dispatch()
+
+        self.assertEqual((counts["sent"], counts["skipped"], counts["retrying"]), (1, 1, 0))
+        entry = NotificationOutbox.objects.get(channel=NotificationOutbox.CHANNEL_SMS)
+        self.assertEqual(entry.status, NotificationOutbox.STATUS_SKIPPED)
+        self.assertEqual(entry.attempts, 1)
+        self.assertIn("phone number", entry.last_error)
+
+    def test_failed_send_backs_off_then_fails(self):
+        enqueue_notifications([self.task])
+        NotificationOutbox.objects.filter(channel=NotificationOutbox.CHANNEL_SMS).delete()
+
+        with mock.patch("django.core.mail.EmailMessage.send", side_effect=OSError("connection reset")):
+            self.assertEqual(self.dispatch(max_attempts=2)["retrying"], 1)
+            # Not due again until the backoff ends
+            self.assertEqual(sum(self.dispatch(max_attempts=2).values()), 0)
+
+            entry = NotificationOutbox.objects.get()
+            self.assertGreater(entry.next_attempt_at, timezone.now())
+            self.assertIn("connection reset", entry.last_error)
+
+            NotificationOutbox.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(self.dispatch(max_attempts=2)["failed"], 1)
+
+        entry.refresh_from_db()
+        self.assertEqual((entry.status, entry.attempts), (NotificationOutbox.STATUS_FAILED, 2))
+
+    def test_claimed_reminders_are_not_sent_twice(self):
+        enqueue_notifications([self.task])
+
+        # A second worker polling while the first holds the batch gets nothing
+        first = claim_pending_notifications()
+        self.assertEqual(len(first), 2)
+        self.assertEqual(claim_pending_notifications(), [])
+        self.assertEqual(sum(self.dispatch().values()), 0)
+
+        # Once the lease runs out, the rows are picked up again
+        NotificationOutbox.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.dispatch()["sent"], 2)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(len(sms.outbox), 1)
+
+
+class NotificationConnectionReuseTests(TaskAPITestCase):
+    def setUp(self):
+        super().setUp()
+        sms.outbox.clear()
+        self.server = FakeSMTPServer().start()
+        self.addCleanup(self.server.stop)
+
+        self.settings_override = override_settings(**self.server.settings())
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        self.user = User.objects.create_user(email="notify@example.com", password="secret", name="Notify", phone="9876543210")
+
+    def test_batch_uses_one_smtp_connection(self):
+        tasks = create_tasks(self.user, 50)
+        enqueue_notifications(tasks)
+
+        with mock.patch("builtins.print"):
+            counts = dispatch_pending_notifications(batch_size=200)
+
+        self.assertEqual(counts["sent"], 100)
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(len(self.server.messages), 50)
+        self.assertEqual(len(sms.outbox), 50)
+        self.assertEqual(sms.outbox[0]["to"], "+919876543210")
+        self.assertFalse(NotificationOutbox.objects.filter(status=NotificationOutbox.STATUS_PENDING).exists())
+
+    def test_benchmark_measures_throughput(self):
+        out = StringIO()
+        call_command("benchmark_notifications", messages=20, latency=0.002, stdout=out)
+
+        results = {
+            match["label"]: (int(match["messages"]), float(match["rate"]), int(match["connections"]))
+            for match in re.finditer(
+                r"(?P<label>per message|batched): (?P<messages>\d+) emails in [\d.]+s, "
+                r"(?P<rate>[\d.]+) msg/s, (?P<connections>\d+) SMTP connections",
+                out.getvalue(),
+            )
+        }
+        self.assertEqual(results["per message"][0], 20)
+        self.assertEqual(results["per message"][2], 20)
+        self.assertEqual(results["batched"][0], 20)
+        self.assertEqual(results["batched"][2], 1)
+        self.assertGreater(results["batched"][1], results["per message"][1])
+        # Rolled back
+        self.assertFalse(User.objects.filter(email="notification-benchmark@example.com").exists())
+
+    def test_broken_connection_is_reopened(self):
+        tasks = create_tasks(self.user, 3)
+        enqueue_notifications(tasks)
+        NotificationOutbox.objects.filter(channel=NotificationOutbox.CHANNEL_SMS).delete()
+
+        with mock.patch("builtins.print"), mock.patch(
+            "django.core.mail.EmailMessage.send", side_effect=[OSError("connection reset"), 1, 1]
+        ):
+            counts = dispatch_pending_notifications()
+
+        self.assertEqual(counts, {"sent": 2, "retrying": 1, "failed": 0, "skipped": 0})
+        # The failed send closed the first connection; the rest share a new one
+        self.assertEqual(self.server.connections, 2)
+
+
+@override_settings(
+    NOTIFICATION_MODE="digest",
+    EMAIL_HOST_USER="reminders@example.com",
+    EMAIL_HOST_PASSWORD="secret",
+    SMS_BACKEND="tasks.sms.LocMemBackend",
+)
+class ReminderDigestTests(TaskAPITestCase):
+    def setUp(self):
+        super().setUp()
+        sms.outbox.clear()
+        self.tomorrow = date.today() + timedelta(days=1)
+        self.busy = User.objects.create_user(email="busy@example.com", password="secret", name="Busy", phone="9000000001")
+        self.quiet = User.objects.create_user(email="quiet@example.com", password="secret", name="Quiet", phone="9000000002")
+
+    def add_tasks(self, user, count, due_date, completed=False, start=1):
+        Task.objects.bulk_create([
+            Task(user=user, number=n, title=f"Task {n}", due_date=due_date, estimated_hours=1, importance=5, completed=completed)
+            for n in range(start, start + count)
+        ])
+
+    def send(self):
+        with mock.patch("builtins.print"):
+            return send_due_digests()
+
+    def test_one_email_and_sms_per_user(self):
+        self.add_tasks(self.busy, 30, self.tomorrow)
+        self.add_tasks(self.busy, 5, self.tomorrow + timedelta(days=1), start=31)
+        self.add_tasks(self.busy, 2, self.tomorrow, completed=True, start=36)
+        self.add_tasks(self.quiet, 2, self.tomorrow)
+
+        with CaptureQueriesContext(connection) as ctx:
+            counts = self.send()
+
+        self.assertEqual(counts["sent"], 4)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(len(sms.outbox), 2)
+        busy_email = next(m for m in mail.outbox if m.to == ["busy@example.com"])
+        self.assertIn("30 tasks due tomorrow", busy_email.subject)
+        self.assertEqual(busy_email.body.count("\n- #"), 30)
+        self.assertIn("and 25 more", next(m["body"] for m in sms.outbox if m["to"] == "+919000000001"))
+
+        # Task selection, digest insert and digest read, plus one save per digest
+        self.assertEqual(len(ctx.captured_queries), 3 + 4)
+        self.assertEqual(ReminderDigest.objects.get(user=self.busy, channel="email").task_count, 30)
+
+    def test_digest_is_sent_once_per_day(self):
+        self.add_tasks(self.busy, 3, self.tomorrow)
+        self.send()
+        counts = self.send()
+
+        self.assertEqual(counts["sent"], 0)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(len(sms.outbox), 1)
+
+    def test_failed_digest_is_retried(self):
+        self.add_tasks(self.busy, 3, self.tomorrow)
+        with mock.patch("django.core.mail.EmailMessage.send", side_effect=OSError("connection reset")):
+            counts = self.send()
+        self.assertEqual((counts["sent"], counts["retrying"]), (1, 1))
+
+        counts = self.send()
+
+        self.assertEqual(counts["sent"], 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(len(sms.outbox), 1)
+
+    def test_digest_mode_queues_no_per_task_reminders(self):
+        self.add_tasks(self.busy, 3, self.tomorrow)
+        self.client.force_login(self.busy)
+
+        enqueue_due_notifications(self.busy)
+        response = self.client.post("/api/tasks/", {
+            "number": 10, "title": "New", "due_date": str(self.tomorrow), "estimated_hours": 1, "importance": 5,
+        }, content_type="application/json")
+
+        self.assertEqual(response.status_code, 201)
+
+        response = self.client.post("/api/tasks/bulk/", [
+            {"number": n, "title": f"Bulk {n}", "due_date": str(self.tomorrow), "estimated_hours": 1, "importance": 5}
+            for n in (20, 21)
+        ], content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    def test_unconfigured_channel_is_skipped(self):
+        self.add_tasks(self.busy, 3, self.tomorrow)
+        with override_settings(EMAIL_HOST_PASSWORD=None):
+            counts = self.send()
+        self.assertEqual((counts["sent"], counts["skipped"]), (1, 1))
+
+        # A skipped digest is final for the day
+        self.assertEqual(self.send()["sent"], 0)
+        self.assertEqual(len(mail.outbox), 0)
+
+    @override_settings(NOTIFICATION_MODE="per_task")
+    def test_command_requires_digest_mode(self):
+        with self.assertRaises(CommandError):
+            call_command("send_reminder_digests", stdout=StringIO())
@@ -0,0 +1,83 @@
+"""
+An in-process fake SMTP server, so email delivery can be tested and timed
+offline. Used by the tests and by the benchmark_notifications command.
+"""
+import socketserver
+import threading
+import time
+
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    """
+    Minimal SMTP server on a free local port that counts connections and
+    messages. `latency` seconds are slept before every reply, to stand in
+    for the round trips to a real mail provider.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency=0.0):
+        super().__init__(("127.0.0.1", 0), FakeSMTPHandler)
+        self.latency = latency
+        self.connections = 0
+        self.messages = []
+        self.lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def settings(self):
+        """Settings that send email to this server and SMS to tasks.sms.LocMemBackend."""
+        return {
+            "EMAIL_BACKEND": "django.core.mail.backends.smtp.EmailBackend",
+            "EMAIL_HOST": "127.0.0.1",
+            "EMAIL_PORT": self.server_address[1],
+            "EMAIL_USE_TLS": False,
+            "EMAIL_USE_SSL": False,
+            "EMAIL_HOST_USER": "reminders@example.com",
+            "EMAIL_HOST_PASSWORD": "secret",
+            "DEFAULT_FROM_EMAIL": "reminders@example.com",
+            "SMS_BACKEND": "tasks.sms.LocMemBackend",
+        }
+
+
+class FakeSMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        with self.server.lock:
+            self.server.connections += 1
+        self.reply("220 localhost fake SMTP")
+        while True:
+            line = self.rfile.readline().decode().strip()
+            if not line:
+                return
+            command = line.split(" ", 1)[0].upper()
+            if command == "EHLO":
+                self.reply("250-localhost")
+                self.reply("250 AUTH PLAIN")
+            elif command == "AUTH":
+                self.reply("235 Authentication successful")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                body = []
+                while (data := self.rfile.readline().decode()).rstrip("\r\n") != ".":
+                    body.append(data)
+                with self.server.lock:
+                    self.server.messages.append("".join(body))
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                # HELO, MAIL, RCPT, RSET, NOOP
+                self.reply("250 OK")
@@ -0,0 +1,159 @@
+import inspect
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from functools import wraps
+
+# Upper bounds of the histogram buckets; larger values land in "+Inf"
+DURATION_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Timed sections reported besides the database and the total
+SECTIONS = ("serialize", "notify")
+
+# Timings of the request being handled, set by RequestTimingMiddleware.
+# None when timing is disabled, which makes @timed a plain call.
+_current = ContextVar("task_request_timings", default=None)
+
+
+class RequestTimings:
+    """Query count and time per section collected while one request is handled."""
+
+    def __init__(self):
+        self.queries = 0
+        self.durations = defaultdict(float)
+        self._active = set()
+
+    def record_query(self, execute, sql, params, many, context):
+        """connection.execute_wrapper hook counting and timing every query."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.durations["db"] += time.perf_counter() - started
+
+    def server_timing(self, total):
+        """Value of the Server-Timing header, durations in milliseconds."""
+        metrics = [f'db;dur={self.durations["db"] * 1000:.1f};desc="{self.queries} queries"']
+        metrics += [f"{name};dur={self.durations[name] * 1000:.1f}" for name in SECTIONS]
+        metrics.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+def timed(section):
+    """
+    Adds the time spent in the decorated function to `section` of the
+    current request's timings. Nested calls for the same section (e.g.
+    serialize_task inside serialize_tasks) are only counted once.
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                timings = _current.get()
+                if timings is None or section in timings._active:
+                    return await func(*args, **kwargs)
+
+                timings._active.add(section)
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    timings.durations[section] += time.perf_counter() - started
+                    timings._active.discard(section)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            timings = _current.get()
+            if timings is None or section in timings._active:
+                return func(*args, **kwargs)
+
+            timings._active.add(section)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timings.durations[section] += time.perf_counter() - started
+                timings._active.discard(section)
+        return wrapper
+    return decorator
+
+
+def start_request():
+    """Starts collecting timings for the current request. Returns a token for end_request."""
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+class Histogram:
+    """Fixed-bucket histogram with a running count and sum."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        labels = [f"le_{bound}" for bound in self.buckets] + ["+Inf"]
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "mean": round(self.sum / self.count, 3) if self.count else None,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+# {route: {metric: Histogram}} for this process, guarded by _lock
+_histograms = {}
+_lock = threading.Lock()
+
+
+def _new_route_histograms():
+    histograms = {"queries": Histogram(QUERY_COUNT_BUCKETS), "total_ms": Histogram(DURATION_BUCKETS_MS)}
+    for section in ("db", *SECTIONS):
+        histograms[f"{section}_ms"] = Histogram(DURATION_BUCKETS_MS)
+    return histograms
+
+
+def record(route, timings, total):
+    """Adds one request's timings to the histograms of its route."""
+    with _lock:
+        histograms = _histograms.get(route)
+        if histograms is None:
+            histograms = _histograms[route] = _new_route_histograms()
+        histograms["queries"].observe(timings.queries)
+        histograms["total_ms"].observe(total * 1000)
+        for section in ("db", *SECTIONS):
+            histograms[f"{section}_ms"].observe(timings.durations[section] * 1000)
+
+
+def snapshot():
+    """Returns {route: {metric: histogram dict}} for every route seen so far."""
+    with _lock:
+        return {
+            route: {metric: histogram.snapshot() for metric, histogram in histograms.items()}
+            for route, histograms in sorted(_histograms.items())
+        }
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
@@ -1,8 +1,11 @@
 from django.urls import path
-from .views import tasks_view, delete_task, toggle_completed, completed_tasks, circular_tasks, pending_tasks, high_priority_tasks, tasks_by_date, tasks_with_dependencies, tasks_without_dependencies, update_task
+from .views import tasks_view, delete_task, toggle_completed, completed_tasks, circular_tasks, pending_tasks, high_priority_tasks, tasks_by_date, tasks_with_dependencies, tasks_without_dependencies, update_task, plan_tasks, bulk_create_tasks, export_tasks, bulk_set_completed, bulk_delete_tasks, timing_metrics
 
 urlpatterns = [
     path("", tasks_view, name="list-create-tasks"),
+    path("bulk/", bulk_create_tasks, name="bulk-create-tasks"),
+    path("bulk/complete/", bulk_set_completed, name="bulk-set-completed"),
+    path("bulk/delete/", bulk_delete_tasks, name="bulk-delete-tasks"),
     path("update/<int:task_id>/", update_task, name="update-task"),
     path("delete/<int:task_id>/", delete_task, name="delete-task"),
     path("toggle/<int:task_id>/", toggle_completed, name="toggle-completed"),
@@ -14,4 +17,7 @@ urlpatterns = [
     path("by-date/", tasks_by_date, name="tasks-by-date"),
     path("with-dependencies/", tasks_with_dependencies, name="tasks-with-dependencies"),
     path("without-dependencies/", tasks_without_dependencies, name="tasks-without-dependencies"),
+    path("plan/", plan_tasks, name="plan-tasks"),
+    path("export/", export_tasks, name="export-tasks"),
+    path("metrics/", timing_metrics, name="timing-metrics"),
 ]
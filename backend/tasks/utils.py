@@ -1,59 +1,174 @@
 import os
+import uuid
 from datetime import date, timedelta
-from django.core.mail import send_mail
-from twilio.rest import Client
-from twilio.base.exceptions import TwilioRestException
+from itertools import groupby
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Q
+from django.utils import timezone
 from django.conf import settings
 
-def send_sms_notification(task):
-    """Sends an SMS notification using Twilio."""
-    if not task.user.phone:
-        print(f"User {task.user.email} does not have a phone number.")
-        return
+from .models import NotificationOutbox, ReminderDigest, Task
+from .sms import get_sms_backend
+from .timing import timed
+
+# Digest SMS list at most this many titles, then "and N more"
+SMS_DIGEST_MAX_TITLES = 5
+
+# Seconds before a failed reminder is retried; doubles with every attempt
+DEFAULT_RETRY_DELAY_SECONDS = 60
+
+# Seconds a dispatch worker holds the reminders it claimed
+DEFAULT_CLAIM_LEASE_SECONDS = 300
 
-    try:
-        # These settings are required for Twilio to work
-        if not all([settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, settings.TWILIO_FROM_NUMBER]):
-            print("Twilio settings are not fully configured. Skipping SMS.")
-            return
 
-        client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+def digest_mode():
+    """True when reminders go out as one daily digest per user instead of one per task."""
+    return getattr(settings, "NOTIFICATION_MODE", "per_task") == "digest"
+
+
+def _skipped(reason):
+    print(reason)
+    return NotificationOutbox.STATUS_SKIPPED, reason
+
+
+class NotificationSender:
+    """
+    Sends reminders over one SMTP connection and one SMS backend client,
+    opened on first use and reused for every message until close(), so a
+    batch pays for a single SMTP/TLS handshake instead of one per message.
+    Use it as a context manager around a batch.
+
+    Every send returns (status, detail). The status is
+    NotificationOutbox.STATUS_SENT, STATUS_SKIPPED when the message can never
+    go out (no phone number, email or SMS not configured) or STATUS_FAILED
+    when the attempt failed and may be retried. The detail says why.
+    """
+
+    def __init__(self):
+        self._email_connection = None
+        self._sms_backend = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def send_sms(self, task):
+        """Sends an SMS reminder for the task."""
         message_body = f'Task Due Reminder: Your task "{task.title}" is due tomorrow.'
+        return self._send_sms(task.user, message_body, f"task '{task.title}'")
+
+    def send_email(self, task):
+        """Sends an email reminder for the task."""
+        subject = "Task Due Reminder"
+        message = f'Your task "{task.title}" is due tomorrow.'
+        return self._send_email(task.user, subject, message, f"task '{task.title}'")
+
+    def send_sms_digest(self, user, tasks):
+        """Sends one SMS listing all the given tasks."""
+        return self._send_sms(user, render_sms_digest(tasks), f"digest of {len(tasks)} tasks")
+
+    def send_email_digest(self, user, tasks):
+        """Sends one email listing all the given tasks."""
+        subject, message = render_email_digest(tasks)
+        return self._send_email(user, subject, message, f"digest of {len(tasks)} tasks")
+
+    def _send_sms(self, user, message_body, about):
+        if not user.phone:
+            return _skipped(f"User {user.email} does not have a phone number.")
+
+        if self._sms_backend is None:
+            self._sms_backend = get_sms_backend()
+        if not self._sms_backend.is_configured():
+            return _skipped("SMS settings are not fully configured. Skipping SMS.")
+
+        try:
+            self._sms_backend.send(f"+91{user.phone}", message_body)
+            print(f"SMS sent to {user.phone} for {about}.")
+            return NotificationOutbox.STATUS_SENT, ""
+        except Exception as e:
+            print(f"Error sending SMS for {about}: {e}")
+            return NotificationOutbox.STATUS_FAILED, f"Error sending SMS: {e}"
+
+    def _send_email(self, user, subject, message, about):
+        if not all([settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD]):
+            return _skipped("Email settings (EMAIL_HOST_USER, EMAIL_HOST_PASSWORD) are not configured. Skipping email.")
+
+        try:
+            if self._email_connection is None:
+                self._email_connection = get_connection(fail_silently=False)
+                self._email_connection.open()
+            EmailMessage(
+                subject,
+                message,
+                settings.DEFAULT_FROM_EMAIL,
+                [user.email],
+                connection=self._email_connection,
+            ).send()
+            print(f"Email sent to {user.email} for {about}.")
+            return NotificationOutbox.STATUS_SENT, ""
+        except Exception as e:
+            # Catch any exception during email sending (e.g., SMTP connection error)
+            # and print it, but don't crash the worker. The connection may be
+            # broken, so the next message opens a fresh one.
+            print(f"Error sending email for {about}: {e}")
+            self._close_email_connection()
+            return NotificationOutbox.STATUS_FAILED, f"Error sending email: {e}"
+
+    def close(self):
+        self._close_email_connection()
+        if self._sms_backend is not None:
+            self._sms_backend.close()
+            self._sms_backend = None
+
+    def _close_email_connection(self):
+        if self._email_connection is not None:
+            try:
+                self._email_connection.close()
+            except Exception:
+                pass
+            self._email_connection = None
+
+
+def send_sms_notification(task):
+    """Sends a single SMS reminder. Returns True if the message was sent."""
+    with NotificationSender() as sender:
+        return sender.send_sms(task)[0] == NotificationOutbox.STATUS_SENT
 
-        client.messages.create(body=message_body, from_=settings.TWILIO_FROM_NUMBER, to=f"+91{task.user.phone}")
-        print(f"SMS sent to {task.user.phone} for task '{task.title}'.")
-    except Exception as e:
-        print(f"Error sending SMS for task '{task.title}': {e}")
 
 def send_email_notification(task):
-    """Sends an email notification using Django's email backend."""
-    subject = "Task Due Reminder"
-    message = f'Your task "{task.title}" is due tomorrow.'    
+    """Sends a single email reminder. Returns True if the message was sent."""
+    with NotificationSender() as sender:
+        return sender.send_email(task)[0] == NotificationOutbox.STATUS_SENT
+
 
-    if not all([settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD]):
-        print("Email settings (EMAIL_HOST_USER, EMAIL_HOST_PASSWORD) are not configured. Skipping email.")
+def enqueue_notifications(tasks):
+    """
+    Adds an email and an SMS reminder to the outbox for each task.
+    Reminders already queued for the same (task, channel, due_date) are ignored.
+    In digest mode nothing is queued; `send_reminder_digests` covers the tasks.
+    """
+    if digest_mode():
         return
 
-    try:
-        send_mail(
-            subject,
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            [task.user.email],
-            fail_silently=False,
-        )
-        print(f"Email sent to {task.user.email} for task '{task.title}'.")
-    except Exception as e:
-        # Catch any exception during email sending (e.g., SMTP connection error)
-        # and print it, but don't crash the request.
-        print(f"Error sending email for task '{task.title}': {e}")
+    rows = [
+        NotificationOutbox(task_id=task.id, channel=channel, due_date=task.due_date)
+        for task in tasks
+        for channel in (NotificationOutbox.CHANNEL_EMAIL, NotificationOutbox.CHANNEL_SMS)
+    ]
+    if rows:
+        NotificationOutbox.objects.bulk_create(rows, ignore_conflicts=True)
 
 
+@timed("notify")
 def check_and_send_due_notifications(task):
     """
-    Checks if a task is due tomorrow and sends notifications if it is.
+    Checks if a task is due tomorrow and queues its reminders if it is.
+    The reminders are delivered by the `dispatch_notifications` worker.
+    In digest mode nothing is queued; `send_reminder_digests` covers the task.
     """
-    if not task.due_date:
+    if not task.due_date or digest_mode():
         return
 
     # Ensure we are comparing date objects
@@ -64,6 +179,187 @@ def check_and_send_due_notifications(task):
     difference = (due_date - today).days
 
     if difference == 1:
-        print(f"Task '{task.title}' is due tomorrow. Sending notifications.")
-        send_email_notification(task)
-        send_sms_notification(task)
+        print(f"Task '{task.title}' is due tomorrow. Queueing notifications.")
+        enqueue_notifications([task])
+
+
+@timed("notify")
+def enqueue_due_notifications(user):
+    """
+    Queues reminders for all of the user's incomplete tasks due tomorrow
+    with a single query instead of checking every task.
+    In digest mode nothing is queued; `send_reminder_digests` covers the tasks.
+    """
+    if digest_mode():
+        return
+
+    tomorrow = date.today() + timedelta(days=1)
+    tasks = Task.objects.filter(user=user, completed=False, due_date=tomorrow).only("id", "due_date")
+    enqueue_notifications(tasks)
+
+
+def render_email_digest(tasks):
+    """Returns (subject, message) of the digest email for a user's tasks due tomorrow."""
+    subject = f"Task Due Reminder: {len(tasks)} task{'s' if len(tasks) != 1 else ''} due tomorrow"
+    lines = [f'- #{task.number} "{task.title}"' for task in tasks]
+    message = "These tasks are due tomorrow:\n\n" + "\n".join(lines)
+    return subject, message
+
+
+def render_sms_digest(tasks):
+    """Returns the digest SMS for a user's tasks due tomorrow, kept short by listing a few titles."""
+    titles = ", ".join(f'"{task.title}"' for task in tasks[:SMS_DIGEST_MAX_TITLES])
+    if len(tasks) > SMS_DIGEST_MAX_TITLES:
+        titles += f" and {len(tasks) - SMS_DIGEST_MAX_TITLES} more"
+    return f"Task Due Reminder: {len(tasks)} task{'s' if len(tasks) != 1 else ''} due tomorrow: {titles}."
+
+
+def send_due_digests(max_attempts=5):
+    """
+    Sends each user one email and one SMS listing all of their incomplete
+    tasks due tomorrow. Tasks for every user come from a single query, and
+    each (user, channel, day) digest is recorded in ReminderDigest, so
+    running this again the same day only retries digests that failed.
+    Returns a dict with the number of sent, retrying, failed and skipped digests.
+    """
+    counts = {"sent": 0, "retrying": 0, "failed": 0, "skipped": 0}
+    tomorrow = date.today() + timedelta(days=1)
+
+    tasks = (
+        Task.objects
+        .filter(completed=False, due_date=tomorrow)
+        .select_related("user")
+        .only("id", "number", "title", "user__id", "user__email", "user__phone")
+        .order_by("user_id", "number")
+    )
+    tasks_by_user = {user_id: list(group) for user_id, group in groupby(tasks, key=lambda task: task.user_id)}
+    if not tasks_by_user:
+        return counts
+
+    channels = (NotificationOutbox.CHANNEL_EMAIL, NotificationOutbox.CHANNEL_SMS)
+    ReminderDigest.objects.bulk_create(
+        [
+            ReminderDigest(user_id=user_id, channel=channel, due_date=tomorrow, task_count=len(user_tasks))
+            for user_id, user_tasks in tasks_by_user.items()
+            for channel in channels
+        ],
+        ignore_conflicts=True,
+    )
+    digests = ReminderDigest.objects.filter(
+        due_date=tomorrow, status=NotificationOutbox.STATUS_PENDING, user_id__in=tasks_by_user,
+    ).order_by("user_id", "channel")
+
+    # One SMTP connection and one SMS client serve every digest
+    with NotificationSender() as sender:
+        for digest in digests:
+            user_tasks = tasks_by_user[digest.user_id]
+            user = user_tasks[0].user
+            if digest.channel == NotificationOutbox.CHANNEL_EMAIL:
+                outcome = sender.send_email_digest(user, user_tasks)
+            else:
+                outcome = sender.send_sms_digest(user, user_tasks)
+            _record_attempt(digest, outcome, max_attempts, counts)
+
+    return counts
+
+
+def claim_pending_notifications(batch_size=100, lease_seconds=DEFAULT_CLAIM_LEASE_SECONDS):
+    """
+    Claims up to `batch_size` pending reminders that are due for an attempt
+    and returns them with their tasks and users loaded.
+
+    The claim is a single conditional UPDATE that stamps the rows with a
+    token and pushes next_attempt_at out by the lease, so a row can only be
+    claimed by one worker at a time. Rows of a worker that died mid-batch
+    become available again once the lease runs out.
+    """
+    now = timezone.now()
+    due = NotificationOutbox.objects.filter(
+        Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now),
+        status=NotificationOutbox.STATUS_PENDING,
+    )
+    candidate_ids = list(due.order_by("id").values_list("id", flat=True)[:batch_size])
+    if not candidate_ids:
+        return []
+
+    token = uuid.uuid4().hex
+    # Re-checking the conditions in the UPDATE leaves out rows another worker claimed first
+    due.filter(id__in=candidate_ids).update(
+        claimed_by=token,
+        next_attempt_at=now + timedelta(seconds=lease_seconds),
+    )
+    return list(
+        NotificationOutbox.objects
+        .filter(claimed_by=token, status=NotificationOutbox.STATUS_PENDING)
+        .select_related("task", "task__user")
+        .order_by("id")
+    )
+
+
+def dispatch_pending_notifications(batch_size=100, max_attempts=5, retry_delay=DEFAULT_RETRY_DELAY_SECONDS):
+    """
+    Claims and sends one batch of pending outbox reminders. A failed attempt
+    is retried after retry_delay seconds, doubling with every further attempt.
+    Returns a dict with the number of sent, retrying, failed and skipped reminders.
+    """
+    counts = {"sent": 0, "retrying": 0, "failed": 0, "skipped": 0}
+
+    entries = claim_pending_notifications(batch_size)
+
+    # One SMTP connection and one SMS client serve the whole batch
+    with NotificationSender() as sender:
+        for entry in entries:
+            _dispatch_entry(sender, entry, max_attempts, retry_delay, counts)
+
+    return counts
+
+
+def _dispatch_entry(sender, entry, max_attempts, retry_delay, counts):
+    """Sends one outbox reminder and records the outcome on the entry."""
+    task = entry.task
+
+    # The task may have been completed or rescheduled since it was queued
+    if task.completed or task.due_date != entry.due_date:
+        entry.status = NotificationOutbox.STATUS_SKIPPED
+        entry.save(update_fields=["status"])
+        counts["skipped"] += 1
+        return
+
+    if entry.channel == NotificationOutbox.CHANNEL_EMAIL:
+        outcome = sender.send_email(task)
+    else:
+        outcome = sender.send_sms(task)
+
+    _record_attempt(entry, outcome, max_attempts, counts, retry_delay=retry_delay)
+
+
+def _record_attempt(row, outcome, max_attempts, counts, retry_delay=None):
+    """
+    Saves the (status, detail) outcome of one delivery attempt on an outbox
+    or digest row. With a retry_delay, a row left pending gets a backed-off
+    next_attempt_at.
+    """
+    status, detail = outcome
+    row.attempts += 1
+    row.last_error = detail
+    if status == NotificationOutbox.STATUS_SENT:
+        row.status = NotificationOutbox.STATUS_SENT
+        row.sent_at = timezone.now()
+        counts["sent"] += 1
+    elif status == NotificationOutbox.STATUS_SKIPPED:
+        # Retrying cannot help until the user or the settings change
+        row.status = NotificationOutbox.STATUS_SKIPPED
+        counts["skipped"] += 1
+    elif row.attempts >= max_attempts:
+        row.status = NotificationOutbox.STATUS_FAILED
+        counts["failed"] += 1
+    else:
+        # Left pending so a later run retries it
+        counts["retrying"] += 1
+
+    update_fields = ["status", "attempts", "sent_at", "last_error"]
+    if retry_delay is not None and row.status == NotificationOutbox.STATUS_PENDING:
+        # Back off exponentially: retry_delay, then twice that, and so on
+        row.next_attempt_at = timezone.now() + timedelta(seconds=retry_delay * 2 ** (row.attempts - 1))
+        update_fields.append("next_attempt_at")
+    row.save(update_fields=update_fields)
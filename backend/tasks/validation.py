@@ -0,0 +1,127 @@
+from datetime import datetime
+
+from .models import Task
+
+
+class TaskValidationError(ValueError):
+    """Raised with a user-facing message when submitted task data is invalid."""
+
+
+class TaskVersionConflict(Exception):
+    """Raised when an edit is based on an outdated version of the task."""
+
+
+def clean_task_data(data, partial=False):
+    """
+    Validates and converts the task fields in a request payload.
+
+    Returns a dict holding the cleaned value of every field present in
+    `data` (title stripped, due_date parsed, numbers as ints). With
+    partial=False all fields are required, as when creating a task; with
+    partial=True only the fields present are checked, as when updating one.
+    Dependencies are only checked to be a list here.
+    """
+    if not isinstance(data, dict):
+        raise TaskValidationError("Task data must be an object")
+
+    cleaned = {}
+
+    # Validate required fields
+    if not partial:
+        if data.get("number") is None:
+            raise TaskValidationError("Task number is required")
+        title = data.get("title")
+        if title is None or not str(title).strip():
+            raise TaskValidationError("Title is required")
+        if data.get("due_date") is None:
+            raise TaskValidationError("Due date is required")
+        if data.get("estimated_hours") is None:
+            raise TaskValidationError("Estimated hours is required")
+        if data.get("importance") is None:
+            raise TaskValidationError("Importance is required")
+
+    # Validate and convert data types
+    if data.get("number") is not None:
+        try:
+            number = int(data["number"])
+        except (ValueError, TypeError):
+            raise TaskValidationError("Task number must be a valid integer")
+        if number <= 0:
+            raise TaskValidationError("Task number must be a positive integer")
+        cleaned["number"] = number
+
+    if data.get("title") is not None:
+        title = str(data["title"]).strip()
+        if not title:
+            raise TaskValidationError("Title cannot be empty")
+        cleaned["title"] = title
+
+    if data.get("estimated_hours") is not None:
+        try:
+            estimated_hours = int(data["estimated_hours"])
+        except (ValueError, TypeError):
+            raise TaskValidationError("Estimated hours must be a valid integer")
+        if estimated_hours <= 0:
+            raise TaskValidationError("Estimated hours must be a positive integer")
+        cleaned["estimated_hours"] = estimated_hours
+
+    if data.get("importance") is not None:
+        try:
+            importance = int(data["importance"])
+        except (ValueError, TypeError):
+            raise TaskValidationError("Importance must be a valid integer between 1 and 10")
+        if importance < 1 or importance > 10:
+            raise TaskValidationError("Importance must be between 1 and 10")
+        cleaned["importance"] = importance
+
+    if data.get("due_date") is not None:
+        try:
+            # Try parsing as ISO format (YYYY-MM-DD)
+            cleaned["due_date"] = datetime.strptime(data["due_date"], "%Y-%m-%d").date()
+        except (ValueError, TypeError):
+            raise TaskValidationError("Invalid date format. Use YYYY-MM-DD")
+
+    if data.get("version") is not None:
+        try:
+            version = int(data["version"])
+        except (ValueError, TypeError):
+            raise TaskValidationError("Version must be a valid integer")
+        if version <= 0:
+            raise TaskValidationError("Version must be a positive integer")
+        cleaned["version"] = version
+
+    if "dependencies" in data and data["dependencies"] is not None:
+        if not isinstance(data["dependencies"], list):
+            raise TaskValidationError("Dependencies must be a list")
+        cleaned["dependencies"] = data["dependencies"]
+    elif not partial:
+        cleaned["dependencies"] = []
+
+    return cleaned
+
+
+def clean_dependency_ids(user, dependencies, task_id=None):
+    """
+    Converts submitted dependency ids to a set of ints and checks with one
+    `id__in` query that each one is a task of the user. `task_id` is the
+    task being edited, which may not depend on itself.
+    """
+    dependency_ids = set()
+    for dep_id in dependencies:
+        try:
+            dep_id = int(dep_id)
+        except (ValueError, TypeError):
+            raise TaskValidationError(f"Dependency {dep_id} does not exist or is invalid")
+        # Prevent self-dependency
+        if task_id is not None and dep_id == task_id:
+            raise TaskValidationError("Task cannot depend on itself")
+        dependency_ids.add(dep_id)
+
+    if not dependency_ids:
+        return dependency_ids
+
+    found = set(Task.objects.filter(user=user, id__in=dependency_ids).values_list("id", flat=True))
+    missing = [dep_id for dep_id in dependencies if int(dep_id) not in found]
+    if missing:
+        raise TaskValidationError(f"Dependency {missing[0]} does not exist or is invalid")
+    return dependency_ids
@@ -1,77 +1,202 @@
 import json
-from django.http import JsonResponse
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import BooleanField, Exists, ExpressionWrapper, F, OuterRef, Q, Value
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from datetime import date, datetime
+from datetime import date
 
+from . import timing
+from .bulk import BulkImportError, TaskDeletionError, clean_bulk_ids, delete_tasks, import_tasks
+from .cache import bump_list_version, cached_task_list
+from .export import DEFAULT_EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_lines
+from .graph import load_dependency_graph, plan_execution, set_dependencies, update_circular_flags
 from .models import Task
+from .pagination import BY_DUE_DATE, BY_PRIORITY, NEWEST_FIRST, PaginationError, paginate
+from .scoring import calculate_priority_score, calculate_smart_score, refresh_stale_scores
+from .serializers import serialize_task, serialize_tasks
+from .validation import TaskValidationError, TaskVersionConflict, clean_dependency_ids, clean_task_data
 
-# Import the notification utility function
+# Import the notification utility functions
 # Assuming utils.py is in the same 'tasks' app directory
-from .utils import check_and_send_due_notifications
+from .utils import check_and_send_due_notifications, enqueue_due_notifications
 
 
 # -----------------------------------
-# Helper: Circular dependency check
+# Helper: Dependency filter
 # -----------------------------------
-def has_circular_dependency(task, visited=None, start_id=None):
-    if visited is None:
-        visited = set()
-        start_id = task.id
+def has_dependencies():
+    """EXISTS subquery that is true when a task has at least one dependency."""
+    return Exists(
+        Task.dependencies.through.objects.filter(from_task_id=OuterRef("pk"))
+    )
 
-    # If we've seen this task before
-    if task.id in visited:
-        # If we're back at the starting task, we have a cycle
-        return task.id == start_id
-        # Otherwise, we've seen this path before, no new cycle
 
-    visited.add(task.id)
+# -----------------------------------
+# Helper: Edit conflict response
+# -----------------------------------
+def version_conflict_response(task):
+    """409 response carrying the current task, so the client can merge and retry."""
+    return JsonResponse({
+        "error": "Task was modified by another request. Reload it and try again.",
+        "task": serialize_task(task),
+    }, status=409)
+
+
+# -----------------------------------
+# Helper: Paginated list response
+# -----------------------------------
+def task_list_response(request, tasks, ordering, serializer=serialize_tasks):
+    """
+    Serializes one keyset page of `tasks` (see pagination.paginate).
+    The cursor for the next page, if any, is sent in the X-Next-Cursor header.
+    """
+    # Scores depend on today's date, so bring them up to date before they
+    # are filtered, sorted or returned
+    refresh_stale_scores(request.user)
 
-    # Check all dependencies
-    for dep in task.dependencies.all():
-        if has_circular_dependency(dep, visited, start_id):
-            return True
+    try:
+        tasks, next_cursor = paginate(request, tasks, ordering)
+    except PaginationError as e:
+        return JsonResponse({"error": str(e)}, status=400)
 
-    return False
+    response = JsonResponse(serializer(tasks), safe=False)
+    if next_cursor:
+        response["X-Next-Cursor"] = next_cursor
+    return response
 
 
 # -----------------------------------
-# Helper: Priority Score
+# Helper: Execution plan
 # -----------------------------------
-def calculate_priority_score(task):
-    today = date.today()
-    days_until_due = (task.due_date - today).days
-    if days_until_due <= 0:
-        days_until_due = 1
+def build_plan(user, top_k):
+    """Body of the plan endpoint: plan_execution over the user's pending tasks."""
+    # The plan is ordered by smartPriorityScore, so it has to be current
+    refresh_stale_scores(user)
+
+    # One query for the pending tasks and one for the whole edge list
+    tasks = list(Task.objects.filter(user=user, completed=False))
+    graph = load_dependency_graph(user)
 
-    ps = task.importance * (1 / days_until_due) * (1 / task.estimated_hours)
-    return round(ps, 3)
+    plan = plan_execution(tasks, graph, top_k=top_k)
+
+    return {
+        "order": [t.id for t in plan["order"]],
+        "ready": [serialize_task(t, graph.get(t.id, [])) for t in plan["ready"]],
+        "circular": [t.id for t in plan["circular"]],
+        "blocked": [t.id for t in plan["blocked"]],
+    }
 
 
 # -----------------------------------
-# Helper: Smart Priority Score
+# Helper: Create task
 # -----------------------------------
-def calculate_smart_score(task):
-    today = date.today()
-    days_until_due = (task.due_date - today).days
-    if days_until_due <= 0:
-        days_until_due = 1
+def create_task(user, cleaned, dependency_ids):
+    """
+    Creates a task from clean_task_data output and validated dependency ids.
+    The task, its dependency rows, the circular flags and the scores are
+    written in one transaction, so a failure leaves nothing behind.
+    """
+    with transaction.atomic():
+        task = Task.objects.create(
+            user=user,
+            number=cleaned["number"],
+            title=cleaned["title"],
+            due_date=cleaned["due_date"],
+            estimated_hours=cleaned["estimated_hours"],
+            importance=cleaned["importance"],
+        )
+        added_ids, _ = set_dependencies(task, dependency_ids)
+
+        # Handle circular dependency: only the new edges are examined, and
+        # any other task on the same cycle is flagged too
+        task.circularTask = update_circular_flags(user, task, added=added_ids)
 
-    W_U = 0.5
-    W_I = 0.3
-    W_E = 0.2
+        # Compute scores
+        try:
+            task.priorityScore = calculate_priority_score(task)
+            task.smartPriorityScore = calculate_smart_score(task)
+            task.scores_as_of = date.today()
+        except Exception as e:
+            # If score calculation fails, set defaults
+            task.priorityScore = 0.0
+            task.smartPriorityScore = 0.0
 
-    urgency_factor = 1 / days_until_due
-    importance_factor = task.importance / 10
-    effort_factor = 1 / task.estimated_hours
+        task.save()
+    return task
 
-    smart = (urgency_factor * W_U) + (importance_factor * W_I) + (effort_factor * W_E)
-    return round(smart, 3)
+
+# -----------------------------------
+# Helper: Save task update
+# -----------------------------------
+def save_task_update(user, task, cleaned, dependency_ids=None):
+    """
+    Applies validated changes (clean_task_data output without "version") to
+    a task read at `task.version`. The dependency diff, the circular flags,
+    the scores and one conditional write of the changed columns happen in
+    one transaction. Raises TaskVersionConflict if someone else edited the
+    task since it was read; IntegrityError on a duplicate number.
+    """
+    for field, value in cleaned.items():
+        setattr(task, field, value)
+
+    with transaction.atomic():
+        # Apply only the difference, so the edge set is never left half-written
+        added_ids, removed_ids = set(), set()
+        if dependency_ids is not None:
+            added_ids, removed_ids = set_dependencies(task, dependency_ids)
+
+        # Recalculate circular dependency around the edges that changed
+        task.circularTask = update_circular_flags(user, task, added=added_ids, removed=removed_ids)
+
+        # Recompute scores
+        try:
+            task.priorityScore = calculate_priority_score(task)
+            task.smartPriorityScore = calculate_smart_score(task)
+            task.scores_as_of = date.today()
+        except Exception as e:
+            # If score calculation fails, keep existing scores
+            pass
+
+        # One write of the changed columns, applied only if nobody else
+        # edited the task since it was read
+        fields = [*cleaned, "circularTask", "priorityScore", "smartPriorityScore", "scores_as_of"]
+        updated = Task.objects.filter(id=task.id, version=task.version).update(
+            version=F("version") + 1,
+            **{field: getattr(task, field) for field in fields},
+        )
+        if not updated:
+            raise TaskVersionConflict()
+        task.version += 1
+    return task
+
+
+# -----------------------------------
+# Helper: Set completed
+# -----------------------------------
+def set_completed(user, task_id, target=None):
+    """
+    Sets the task's completed flag to `target`, or flips it when target is
+    None. Returns the new value, or None if the user has no such task.
+    """
+    with transaction.atomic():
+        # A single UPDATE ... SET completed = NOT completed, so concurrent
+        # toggles can never read the same old value
+        new_value = Q(completed=False) if target is None else Value(target)
+        updated = Task.objects.filter(id=task_id, user=user).update(
+            completed=ExpressionWrapper(new_value, output_field=BooleanField())
+        )
+        if not updated:
+            return None
+        # Our UPDATE holds the row until commit, so this reads its result
+        return Task.objects.filter(id=task_id).values_list("completed", flat=True).get()
 
 
 # -----------------------------------
 # Add or List tasks
 # -----------------------------------
 @csrf_exempt
+@cached_task_list
 def tasks_view(request):
     if not request.user.is_authenticated:
         return JsonResponse({"error": "Authentication required"}, status=401)
@@ -81,28 +206,15 @@ def tasks_view(request):
     # ---------------------- GET (List Tasks) ----------------------
     if request.method == "GET":
         try:
-            tasks = Task.objects.filter(user=user).order_by("-id")
+            tasks = Task.objects.filter(user=user)
 
             # --- NOTIFICATION CHECK ---
-            # Iterate over incomplete tasks to check for due dates
-            for task in tasks.filter(completed=False):
-                check_and_send_due_notifications(task)
+            # Queue reminders for tasks due tomorrow; the dispatch_notifications
+            # worker sends them outside the request.
+            enqueue_due_notifications(user)
             # --- END NOTIFICATION CHECK ---
 
-            data = [{
-                "id": t.id,
-                "number": t.number,
-                "title": t.title,
-                "due_date": str(t.due_date),
-                "estimated_hours": t.estimated_hours,
-                "importance": t.importance,
-                "dependencies": list(t.dependencies.values_list("id", flat=True)),
-                "priorityScore": t.priorityScore,
-                "smartPriorityScore": t.smartPriorityScore,
-                "completed": t.completed,
-                "circularTask": t.circularTask,
-            } for t in tasks]
-            return JsonResponse(data, safe=False)
+            return task_list_response(request, tasks, NEWEST_FIRST)
         except Exception as e:
             return JsonResponse({"error": f"Failed to retrieve tasks: {str(e)}"}, status=500)
 
@@ -113,124 +225,60 @@ def tasks_view(request):
         except json.JSONDecodeError:
             return JsonResponse({"error": "Invalid JSON data"}, status=400)
 
-        # Extract and validate required fields
-        number = data.get("number")
-        title = data.get("title")
-        due_date_str = data.get("due_date")
-        estimated_hours = data.get("estimated_hours")
-        importance = data.get("importance")
-        dependencies = data.get("dependencies", [])
-
-        # Validate required fields
-        if number is None:
-            return JsonResponse({"error": "Task number is required"}, status=400)
-        if title is None or not title.strip():
-            return JsonResponse({"error": "Title is required"}, status=400)
-        if due_date_str is None:
-            return JsonResponse({"error": "Due date is required"}, status=400)
-        if estimated_hours is None:
-            return JsonResponse({"error": "Estimated hours is required"}, status=400)
-        if importance is None:
-            return JsonResponse({"error": "Importance is required"}, status=400)
-
-        # Validate and convert data types
-        try:
-            number = int(number)
-            if number <= 0:
-                return JsonResponse({"error": "Task number must be a positive integer"}, status=400)
-        except (ValueError, TypeError):
-            return JsonResponse({"error": "Task number must be a valid integer"}, status=400)
-
-        try:
-            estimated_hours = int(estimated_hours)
-            if estimated_hours <= 0:
-                return JsonResponse({"error": "Estimated hours must be a positive integer"}, status=400)
-        except (ValueError, TypeError):
-            return JsonResponse({"error": "Estimated hours must be a valid integer"}, status=400)
-
-        try:
-            importance = int(importance)
-            if importance < 1 or importance > 10:
-                return JsonResponse({"error": "Importance must be between 1 and 10"}, status=400)
-        except (ValueError, TypeError):
-            return JsonResponse({"error": "Importance must be a valid integer between 1 and 10"}, status=400)
-
-        # Parse due date
         try:
-            # Try parsing as ISO format (YYYY-MM-DD)
-            due_date = datetime.strptime(due_date_str, "%Y-%m-%d").date()
-        except (ValueError, TypeError):
-            return JsonResponse({"error": "Invalid date format. Use YYYY-MM-DD"}, status=400)
-
-        # Validate dependencies is a list
-        if not isinstance(dependencies, list):
-            return JsonResponse({"error": "Dependencies must be a list"}, status=400)
+            cleaned = clean_task_data(data)
+            dependency_ids = clean_dependency_ids(user, cleaned["dependencies"])
+        except TaskValidationError as e:
+            return JsonResponse({"error": str(e)}, status=400)
 
         # Task number must be unique per user
-        if Task.objects.filter(user=user, number=number).exists():
+        if Task.objects.filter(user=user, number=cleaned["number"]).exists():
             return JsonResponse({"error": "Task number already exists for this user"}, status=400)
 
-        # Create task (without dependencies first)
         try:
-            task = Task.objects.create(
-                user=user,
-                number=number,
-                title=title.strip(),
-                due_date=due_date,
-                estimated_hours=estimated_hours,
-                importance=importance,
-            )
+            task = create_task(user, cleaned, dependency_ids)
         except Exception as e:
             return JsonResponse({"error": f"Failed to create task: {str(e)}"}, status=400)
 
-        # Add dependencies
-        for dep_id in dependencies:
-            try:
-                dep_id = int(dep_id)
-                dep_task = Task.objects.get(id=dep_id, user=user)
-                task.dependencies.add(dep_task)
-            except (Task.DoesNotExist, ValueError, TypeError):
-                task.delete()
-                return JsonResponse({"error": f"Dependency {dep_id} does not exist or is invalid"}, status=400)
-
-        # Handle circular dependency (only check if task has dependencies)
-        if task.dependencies.exists():
-            task.circularTask = has_circular_dependency(task)
-        else:
-            task.circularTask = False
-
-        # Compute scores
-        try:
-            task.priorityScore = calculate_priority_score(task)
-            task.smartPriorityScore = calculate_smart_score(task)
-        except Exception as e:
-            # If score calculation fails, set defaults
-            task.priorityScore = 0.0
-            task.smartPriorityScore = 0.0
-
-        task.save()
-
         # --- NOTIFICATION CHECK ---
         check_and_send_due_notifications(task)
 
+        # Cached list responses no longer match
+        bump_list_version(user.id)
+
         return JsonResponse({
             "message": "Task created successfully",
             "id": task.id,
-            "task": {
-                "id": task.id,
-                "number": task.number,
-                "title": task.title,
-                "due_date": str(task.due_date),
-                "estimated_hours": task.estimated_hours,
-                "importance": task.importance,
-                "dependencies": list(task.dependencies.values_list("id", flat=True)),
-                "priorityScore": task.priorityScore,
-                "smartPriorityScore": task.smartPriorityScore,
-                "completed": task.completed,
-                "circularTask": task.circularTask,
-            }
+            "task": serialize_task(task),
         }, status=201)
 
+@csrf_exempt
+def bulk_create_tasks(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+
+    if request.method != "POST":
+        return JsonResponse({"error": "POST method required"}, status=400)
+
+    try:
+        data = json.loads(request.body.decode("utf-8"))
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON data"}, status=400)
+
+    # Accept either a bare list or {"tasks": [...]}
+    items = data.get("tasks") if isinstance(data, dict) else data
+
+    try:
+        tasks = import_tasks(request.user, items)
+    except BulkImportError as e:
+        return JsonResponse({"error": str(e), "errors": e.errors}, status=400)
+
+    return JsonResponse({
+        "message": f"{len(tasks)} tasks created successfully",
+        "created": len(tasks),
+        "tasks": serialize_tasks(tasks),
+    }, status=201)
+
 @csrf_exempt
 def update_task(request, task_id):
     if not request.user.is_authenticated:
@@ -253,117 +301,42 @@ def update_task(request, task_id):
     except json.JSONDecodeError:
         return JsonResponse({"error": "Invalid JSON data"}, status=400)
 
-    # Extract fields (all optional for update)
-    title = data.get("title")
-    due_date_str = data.get("due_date")
-    estimated_hours = data.get("estimated_hours")
-    importance = data.get("importance")
-    dependencies = data.get("dependencies")
-    number = data.get("number")
-
-    # Update fields if provided
-    if title is not None:
-        if not title.strip():
-            return JsonResponse({"error": "Title cannot be empty"}, status=400)
-        task.title = title.strip()
-
-    if due_date_str is not None:
-        try:
-            due_date = datetime.strptime(due_date_str, "%Y-%m-%d").date()
-            task.due_date = due_date
-        except (ValueError, TypeError):
-            return JsonResponse({"error": "Invalid date format. Use YYYY-MM-DD"}, status=400)
-
-    if estimated_hours is not None:
-        try:
-            estimated_hours = int(estimated_hours)
-            if estimated_hours <= 0:
-                return JsonResponse({"error": "Estimated hours must be a positive integer"}, status=400)
-            task.estimated_hours = estimated_hours
-        except (ValueError, TypeError):
-            return JsonResponse({"error": "Estimated hours must be a valid integer"}, status=400)
-
-    if importance is not None:
-        try:
-            importance = int(importance)
-            if importance < 1 or importance > 10:
-                return JsonResponse({"error": "Importance must be between 1 and 10"}, status=400)
-            task.importance = importance
-        except (ValueError, TypeError):
-            return JsonResponse({"error": "Importance must be a valid integer between 1 and 10"}, status=400)
-
-    # Handle task number update (must be unique per user)
-    if number is not None:
-        try:
-            number = int(number)
-            if number <= 0:
-                return JsonResponse({"error": "Task number must be a positive integer"}, status=400)
-            # Check if number already exists for another task
-            if Task.objects.filter(user=user, number=number).exclude(id=task.id).exists():
-                return JsonResponse({"error": "Task number already exists for this user"}, status=400)
-            task.number = number
-        except (ValueError, TypeError):
-            return JsonResponse({"error": "Task number must be a valid integer"}, status=400)
-
-    # Update dependencies if provided
-    if dependencies is not None:
-        if not isinstance(dependencies, list):
-            return JsonResponse({"error": "Dependencies must be a list"}, status=400)
-        
-        # Clear existing dependencies
-        task.dependencies.clear()
-        
-        # Add new dependencies
-        for dep_id in dependencies:
-            try:
-                dep_id = int(dep_id)
-                # Prevent self-dependency
-                if dep_id == task.id:
-                    return JsonResponse({"error": "Task cannot depend on itself"}, status=400)
-                dep_task = Task.objects.get(id=dep_id, user=user)
-                task.dependencies.add(dep_task)
-            except (Task.DoesNotExist, ValueError, TypeError):
-                return JsonResponse({"error": f"Dependency {dep_id} does not exist or is invalid"}, status=400)
-
+    # Parse and validate everything before writing anything (all fields are optional)
     try:
-        task.save()
-    except Exception as e:
-        return JsonResponse({"error": f"Failed to update task: {str(e)}"}, status=400)
-
-    # Recalculate circular dependency
-    if task.dependencies.exists():
-        task.circularTask = has_circular_dependency(task)
-    else:
-        task.circularTask = False
+        cleaned = clean_task_data(data, partial=True)
+        dependency_ids = None
+        if "dependencies" in cleaned:
+            dependency_ids = clean_dependency_ids(user, cleaned.pop("dependencies"), task_id=task.id)
+    except TaskValidationError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    # Clients send the version they edited; a stale one means another edit came first
+    expected_version = cleaned.pop("version", task.version)
+    if expected_version != task.version:
+        return version_conflict_response(task)
+
+    # Task number must be unique per user
+    if "number" in cleaned and Task.objects.filter(user=user, number=cleaned["number"]).exclude(id=task.id).exists():
+        return JsonResponse({"error": "Task number already exists for this user"}, status=400)
 
-    # Recompute scores
     try:
-        task.priorityScore = calculate_priority_score(task)
-        task.smartPriorityScore = calculate_smart_score(task)
+        save_task_update(user, task, cleaned, dependency_ids)
+    except TaskVersionConflict:
+        return version_conflict_response(Task.objects.get(id=task.id))
+    except IntegrityError:
+        return JsonResponse({"error": "Task number already exists for this user"}, status=400)
     except Exception as e:
-        # If score calculation fails, keep existing scores
-        pass
-
-    task.save()
+        return JsonResponse({"error": f"Failed to update task: {str(e)}"}, status=400)
 
     # --- NOTIFICATION CHECK ---
     check_and_send_due_notifications(task)
 
+    # Cached list responses no longer match
+    bump_list_version(user.id)
+
     return JsonResponse({
         "message": "Task updated successfully",
-        "task": {
-            "id": task.id,
-            "number": task.number,
-            "title": task.title,
-            "due_date": str(task.due_date),
-            "estimated_hours": task.estimated_hours,
-            "importance": task.importance,
-            "dependencies": list(task.dependencies.values_list("id", flat=True)),
-            "priorityScore": task.priorityScore,
-            "smartPriorityScore": task.smartPriorityScore,
-            "completed": task.completed,
-            "circularTask": task.circularTask,
-        }
+        "task": serialize_task(task),
     })
 
 @csrf_exempt
@@ -383,22 +356,50 @@ def delete_task(request, task_id):
     except Exception as e:
         return JsonResponse({"error": f"Failed to retrieve task: {str(e)}"}, status=500)
 
-    # Check if other tasks depend on this
     try:
-        dependent_tasks = Task.objects.filter(dependencies=task, user=user)
-        if dependent_tasks.exists():
-            dep_numbers = [str(t.number) for t in dependent_tasks]
-            return JsonResponse({
-                "error": f"Cannot delete task #{task.number}. Other tasks depend on it: {', '.join(dep_numbers)}"
-            }, status=400)
+        delete_tasks(user, [task.id])
+        return JsonResponse({"message": "Task deleted successfully"})
+    except TaskDeletionError as e:
+        # Other tasks depend on this one
+        return JsonResponse({"error": str(e)}, status=400)
     except Exception as e:
-        return JsonResponse({"error": f"Failed to check dependencies: {str(e)}"}, status=500)
+        return JsonResponse({"error": f"Failed to delete task: {str(e)}"}, status=500)
+
+
+@csrf_exempt
+def bulk_delete_tasks(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+
+    user = request.user
+
+    if request.method != "POST" and request.method != "DELETE":
+        return JsonResponse({"error": "POST or DELETE method required"}, status=400)
 
     try:
-        task.delete()
-        return JsonResponse({"message": "Task deleted successfully"})
+        data = json.loads(request.body.decode("utf-8"))
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON data"}, status=400)
+
+    try:
+        ids = clean_bulk_ids(data, "deleted")
+    except TaskValidationError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    cascade = data.get("cascade", False)
+    if not isinstance(cascade, bool):
+        return JsonResponse({"error": "Cascade must be true or false"}, status=400)
+
+    try:
+        deleted = delete_tasks(user, ids, cascade=cascade)
+        return JsonResponse({
+            "message": f"{len(deleted)} tasks deleted successfully",
+            "deleted": sorted(deleted),
+        })
+    except TaskDeletionError as e:
+        return JsonResponse({"error": str(e)}, status=400)
     except Exception as e:
-        return JsonResponse({"error": f"Failed to delete task: {str(e)}"}, status=500)
+        return JsonResponse({"error": f"Failed to delete tasks: {str(e)}"}, status=500)
 
 
 @csrf_exempt
@@ -411,26 +412,75 @@ def toggle_completed(request, task_id):
     if request.method != "POST":
         return JsonResponse({"error": "POST method required"}, status=400)
 
+    # An explicit {"completed": true/false} makes the request idempotent,
+    # so a double click cannot undo itself; without it the flag is flipped
+    target = None
+    if request.content_type == "application/json" and request.body:
+        try:
+            data = json.loads(request.body.decode("utf-8"))
+        except json.JSONDecodeError:
+            return JsonResponse({"error": "Invalid JSON data"}, status=400)
+        target = data.get("completed") if isinstance(data, dict) else None
+        if target is not None and not isinstance(target, bool):
+            return JsonResponse({"error": "Completed must be true or false"}, status=400)
+
     try:
-        task = Task.objects.get(id=task_id, user=user)
-    except Task.DoesNotExist:
-        return JsonResponse({"error": "Task not found"}, status=404)
+        completed = set_completed(user, task_id, target)
+        if completed is None:
+            return JsonResponse({"error": "Task not found"}, status=404)
+
+        bump_list_version(user.id)
+
+        return JsonResponse({
+            "completed": completed,
+            "message": f"Task marked as {'completed' if completed else 'incomplete'}"
+        })
     except Exception as e:
-        return JsonResponse({"error": f"Failed to retrieve task: {str(e)}"}, status=500)
+        return JsonResponse({"error": f"Failed to update task: {str(e)}"}, status=500)
+
+
+@csrf_exempt
+def bulk_set_completed(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+
+    user = request.user
+
+    if request.method != "POST":
+        return JsonResponse({"error": "POST method required"}, status=400)
 
     try:
-        task.completed = not task.completed
-        task.save()
-        
+        data = json.loads(request.body.decode("utf-8"))
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON data"}, status=400)
+
+    try:
+        ids = clean_bulk_ids(data, "updated")
+    except TaskValidationError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    completed = data.get("completed", True)
+    if not isinstance(completed, bool):
+        return JsonResponse({"error": "Completed must be true or false"}, status=400)
+
+    try:
+        # One statement for the whole selection; rows already in the target
+        # state are left alone, so `updated` counts real changes
+        updated = Task.objects.filter(user=user, id__in=ids).exclude(completed=completed).update(completed=completed)
+        if updated:
+            bump_list_version(user.id)
+
         return JsonResponse({
-            "completed": task.completed,
-            "message": f"Task marked as {'completed' if task.completed else 'incomplete'}"
+            "updated": updated,
+            "completed": completed,
+            "message": f"{updated} tasks marked as {'completed' if completed else 'incomplete'}",
         })
     except Exception as e:
-        return JsonResponse({"error": f"Failed to update task: {str(e)}"}, status=500)
+        return JsonResponse({"error": f"Failed to update tasks: {str(e)}"}, status=500)
 
 
 @csrf_exempt
+@cached_task_list
 def completed_tasks(request):
     if not request.user.is_authenticated:
         return JsonResponse({"error": "Authentication required"}, status=401)
@@ -441,28 +491,15 @@ def completed_tasks(request):
         return JsonResponse({"error": "GET method required"}, status=400)
 
     try:
-        tasks = Task.objects.filter(user=user, completed=True).order_by("-id")
-
-        data = [{
-            "id": t.id,
-            "number": t.number,
-            "title": t.title,
-            "due_date": str(t.due_date),
-            "estimated_hours": t.estimated_hours,
-            "importance": t.importance,
-            "dependencies": list(t.dependencies.values_list("id", flat=True)),
-            "priorityScore": t.priorityScore,
-            "smartPriorityScore": t.smartPriorityScore,
-            "completed": t.completed,
-            "circularTask": t.circularTask,
-        } for t in tasks]
-
-        return JsonResponse(data, safe=False)
+        tasks = Task.objects.filter(user=user, completed=True)
+
+        return task_list_response(request, tasks, NEWEST_FIRST)
     except Exception as e:
         return JsonResponse({"error": f"Failed to retrieve completed tasks: {str(e)}"}, status=500)
 
 
 @csrf_exempt
+@cached_task_list
 def circular_tasks(request):
     if not request.user.is_authenticated:
         return JsonResponse({"error": "Authentication required"}, status=401)
@@ -473,28 +510,15 @@ def circular_tasks(request):
         return JsonResponse({"error": "GET method required"}, status=400)
 
     try:
-        tasks = Task.objects.filter(user=user, circularTask=True).order_by("-id")
-
-        data = [{
-            "id": t.id,
-            "number": t.number,
-            "title": t.title,
-            "due_date": str(t.due_date),
-            "estimated_hours": t.estimated_hours,
-            "importance": t.importance,
-            "dependencies": list(t.dependencies.values_list("id", flat=True)),
-            "priorityScore": t.priorityScore,
-            "smartPriorityScore": t.smartPriorityScore,
-            "completed": t.completed,
-            "circularTask": t.circularTask
-        } for t in tasks]
-
-        return JsonResponse(data, safe=False)
+        tasks = Task.objects.filter(user=user, circularTask=True)
+
+        return task_list_response(request, tasks, NEWEST_FIRST)
     except Exception as e:
         return JsonResponse({"error": f"Failed to retrieve circular tasks: {str(e)}"}, status=500)
 
 
 @csrf_exempt
+@cached_task_list
 def pending_tasks(request):
     if not request.user.is_authenticated:
         return JsonResponse({"error": "Authentication required"}, status=401)
@@ -505,28 +529,15 @@ def pending_tasks(request):
         return JsonResponse({"error": "GET method required"}, status=400)
 
     try:
-        tasks = Task.objects.filter(user=user, completed=False).order_by("-id")
-
-        data = [{
-            "id": t.id,
-            "number": t.number,
-            "title": t.title,
-            "due_date": str(t.due_date),
-            "estimated_hours": t.estimated_hours,
-            "importance": t.importance,
-            "dependencies": list(t.dependencies.values_list("id", flat=True)),
-            "priorityScore": t.priorityScore,
-            "smartPriorityScore": t.smartPriorityScore,
-            "completed": t.completed,
-            "circularTask": t.circularTask,
-        } for t in tasks]
-
-        return JsonResponse(data, safe=False)
+        tasks = Task.objects.filter(user=user, completed=False)
+
+        return task_list_response(request, tasks, NEWEST_FIRST)
     except Exception as e:
         return JsonResponse({"error": f"Failed to retrieve pending tasks: {str(e)}"}, status=500)
 
 
 @csrf_exempt
+@cached_task_list
 def high_priority_tasks(request):
     if not request.user.is_authenticated:
         return JsonResponse({"error": "Authentication required"}, status=401)
@@ -542,28 +553,16 @@ def high_priority_tasks(request):
         threshold = 5.0
 
     try:
-        tasks = Task.objects.filter(user=user, priorityScore__gte=threshold).order_by("-priorityScore")
-
-        data = [{
-            "id": t.id,
-            "number": t.number,
-            "title": t.title,
-            "due_date": str(t.due_date),
-            "estimated_hours": t.estimated_hours,
-            "importance": t.importance,
-            "dependencies": list(t.dependencies.values_list("id", flat=True)),
-            "priorityScore": t.priorityScore,
-            "smartPriorityScore": t.smartPriorityScore,
-            "completed": t.completed,
-            "circularTask": t.circularTask
-        } for t in tasks]
-
-        return JsonResponse(data, safe=False)
+        # Only pending tasks have their scores kept current for today
+        tasks = Task.objects.filter(user=user, completed=False, priorityScore__gte=threshold)
+
+        return task_list_response(request, tasks, BY_PRIORITY)
     except Exception as e:
         return JsonResponse({"error": f"Failed to retrieve high priority tasks: {str(e)}"}, status=500)
 
 
 @csrf_exempt
+@cached_task_list
 def tasks_by_date(request):
     if not request.user.is_authenticated:
         return JsonResponse({"error": "Authentication required"}, status=401)
@@ -574,28 +573,15 @@ def tasks_by_date(request):
         return JsonResponse({"error": "GET method required"}, status=400)
 
     try:
-        tasks = Task.objects.filter(user=user).order_by("due_date")
-
-        data = [{
-            "id": t.id,
-            "number": t.number,
-            "title": t.title,
-            "due_date": str(t.due_date),
-            "estimated_hours": t.estimated_hours,
-            "importance": t.importance,
-            "dependencies": list(t.dependencies.values_list("id", flat=True)),
-            "priorityScore": t.priorityScore,
-            "smartPriorityScore": t.smartPriorityScore,
-            "completed": t.completed,
-            "circularTask": t.circularTask
-        } for t in tasks]
-
-        return JsonResponse(data, safe=False)
+        tasks = Task.objects.filter(user=user)
+
+        return task_list_response(request, tasks, BY_DUE_DATE)
     except Exception as e:
         return JsonResponse({"error": f"Failed to retrieve tasks by date: {str(e)}"}, status=500)
 
 
 @csrf_exempt
+@cached_task_list
 def tasks_without_dependencies(request):
     if not request.user.is_authenticated:
         return JsonResponse({"error": "Authentication required"}, status=401)
@@ -606,30 +592,20 @@ def tasks_without_dependencies(request):
         return JsonResponse({"error": "GET method required"}, status=400)
 
     try:
-        tasks = Task.objects.filter(user=user)
-
-        tasks = [t for t in tasks if not t.dependencies.exists()]
-
-        data = [{
-            "id": t.id,
-            "number": t.number,
-            "title": t.title,
-            "due_date": str(t.due_date),
-            "estimated_hours": t.estimated_hours,
-            "importance": t.importance,
-            "dependencies": [],
-            "priorityScore": t.priorityScore,
-            "smartPriorityScore": t.smartPriorityScore,
-            "completed": t.completed,
-            "circularTask": t.circularTask
-        } for t in tasks]
-
-        return JsonResponse(data, safe=False)
+        # Filtered in SQL with a NOT EXISTS on the dependency through-table
+        tasks = Task.objects.filter(user=user).filter(~has_dependencies())
+
+        # Nothing to look up: these tasks have no dependencies by definition
+        return task_list_response(
+            request, tasks, NEWEST_FIRST,
+            serializer=lambda page: [serialize_task(t, []) for t in page],
+        )
     except Exception as e:
         return JsonResponse({"error": f"Failed to retrieve tasks without dependencies: {str(e)}"}, status=500)
 
 
 @csrf_exempt
+@cached_task_list
 def tasks_with_dependencies(request):
     if not request.user.is_authenticated:
         return JsonResponse({"error": "Authentication required"}, status=401)
@@ -640,25 +616,79 @@ def tasks_with_dependencies(request):
         return JsonResponse({"error": "GET method required"}, status=400)
 
     try:
-        tasks = Task.objects.filter(user=user)
+        # Filter tasks that have at least 1 dependency with an EXISTS subquery
+        tasks = Task.objects.filter(user=user).filter(has_dependencies())
 
-        # Filter tasks that have at least 1 dependency
-        tasks = [t for t in tasks if t.dependencies.exists()]
-
-        data = [{
-            "id": t.id,
-            "number": t.number,
-            "title": t.title,
-            "due_date": str(t.due_date),
-            "estimated_hours": t.estimated_hours,
-            "importance": t.importance,
-            "dependencies": list(t.dependencies.values_list("id", flat=True)),
-            "priorityScore": t.priorityScore,
-            "smartPriorityScore": t.smartPriorityScore,
-            "completed": t.completed,
-            "circularTask": t.circularTask
-        } for t in tasks]
-
-        return JsonResponse(data, safe=False)
+        return task_list_response(request, tasks, NEWEST_FIRST)
     except Exception as e:
         return JsonResponse({"error": f"Failed to retrieve tasks with dependencies: {str(e)}"}, status=500)
+
+
+@csrf_exempt
+@cached_task_list
+def plan_tasks(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+
+    user = request.user
+
+    if request.method != "GET":
+        return JsonResponse({"error": "GET method required"}, status=400)
+
+    try:
+        top_k = int(request.GET.get("top", 10))
+        if top_k < 1 or top_k > 100:
+            return JsonResponse({"error": "Top must be between 1 and 100"}, status=400)
+    except (ValueError, TypeError):
+        return JsonResponse({"error": "Top must be a valid integer"}, status=400)
+
+    try:
+        return JsonResponse(build_plan(user, top_k))
+    except Exception as e:
+        return JsonResponse({"error": f"Failed to plan tasks: {str(e)}"}, status=500)
+
+
+@csrf_exempt
+def export_tasks(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+
+    user = request.user
+
+    if request.method != "GET":
+        return JsonResponse({"error": "GET method required"}, status=400)
+
+    export_format = request.GET.get("format", "ndjson")
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({"error": f"Format must be one of: {', '.join(EXPORT_FORMATS)}"}, status=400)
+
+    # Rescored a chunk at a time as well, so stale scores never load every task
+    refresh_stale_scores(user, chunk_size=DEFAULT_EXPORT_CHUNK_SIZE)
+
+    # Streamed chunk by chunk, so the full export is never held in memory
+    content_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    response = StreamingHttpResponse(export_lines(user, export_format), content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="tasks.{export_format}"'
+    return response
+
+
+@csrf_exempt
+def timing_metrics(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+
+    if not request.user.is_staff:
+        return JsonResponse({"error": "Admin access required"}, status=403)
+
+    # Histograms of this server process (see RequestTimingMiddleware)
+    if request.method == "GET":
+        return JsonResponse({
+            "enabled": getattr(settings, "TASK_TIMING_ENABLED", False),
+            "routes": timing.snapshot(),
+        })
+
+    if request.method == "DELETE":
+        timing.reset()
+        return JsonResponse({"message": "Timing metrics reset"})
+
+    return JsonResponse({"error": "GET or DELETE method required"}, status=400)
@@ -1,5 +1,5 @@
 // authApi.js
-import { axiosInstance } from "../lib/axios";
+import { axiosInstance, setAuthToken } from "../lib/axios";
 
 // Note: axiosInstance already has baseURL="/api" so we only need "/auth"
 const BASE_URL = "/auth";
@@ -22,6 +22,7 @@ export const signup = async (data) => {
  */
 export const login = async (data) => {
   const response = await axiosInstance.post(`${BASE_URL}/login/`, data);
+  setAuthToken(response.data.token);
   return response.data;
 };
 
@@ -30,6 +31,7 @@ export const login = async (data) => {
  */
 export const logout = async () => {
   const response = await axiosInstance.post(`${BASE_URL}/logout/`);
+  setAuthToken(null);
   return response.data;
 };
 
@@ -38,6 +40,10 @@ export const logout = async () => {
  */
 export const getCurrentUser = async () => {
   const response = await axiosInstance.get(`${BASE_URL}/me/`);
+  // A session-authenticated call gets a fresh token, e.g. after a reload
+  if (response.data.token) {
+    setAuthToken(response.data.token);
+  }
   return response.data.user;
 };
 
@@ -2,37 +2,43 @@ import { axiosInstance } from "../lib/axios";
 
 const BASE_URL = "/tasks";
 
+// Largest page the list endpoints return (MAX_PAGE_SIZE in tasks/pagination.py)
+const PAGE_SIZE = 500;
+
 /**
- * Get all tasks
+ * Fetch every page of a list endpoint, following the X-Next-Cursor header
  */
-export const getAllTasks = async () => {
-  const response = await axiosInstance.get(BASE_URL);
-  return response.data;
+const getAllPages = async (url) => {
+  const tasks = [];
+  let cursor = null;
+  do {
+    const params = cursor ? { limit: PAGE_SIZE, cursor } : { limit: PAGE_SIZE };
+    const response = await axiosInstance.get(url, { params });
+    tasks.push(...response.data);
+    cursor = response.headers["x-next-cursor"];
+  } while (cursor);
+  return tasks;
 };
 
+/**
+ * Get all tasks
+ */
+export const getAllTasks = () => getAllPages(`${BASE_URL}/`);
+
 /**
  * Get incomplete tasks (pending tasks)
  */
-export const getIncompleteTasks = async () => {
-  const response = await axiosInstance.get(`${BASE_URL}/pending/`);
-  return response.data;
-};
+export const getIncompleteTasks = () => getAllPages(`${BASE_URL}/pending/`);
 
 /**
  * Get completed tasks
  */
-export const getCompletedTasks = async () => {
-  const response = await axiosInstance.get(`${BASE_URL}/completed/`);
-  return response.data;
-};
+export const getCompletedTasks = () => getAllPages(`${BASE_URL}/completed/`);
 
 /**
  * Get circular tasks
  */
-export const getCircularTasks = async () => {
-  const response = await axiosInstance.get(`${BASE_URL}/circular/`);
-  return response.data;
-};
+export const getCircularTasks = () => getAllPages(`${BASE_URL}/circular/`);
 
 /**
  * Create a new task
@@ -50,6 +56,14 @@ export const deleteTask = async (taskId) => {
   return response.data;
 };
 
+/**
+ * Delete several tasks at once; with cascade, tasks depending on them go too
+ */
+export const deleteTasks = async (taskIds, cascade = false) => {
+  const response = await axiosInstance.post(`${BASE_URL}/bulk/delete/`, { ids: taskIds, cascade });
+  return response.data;
+};
+
 /**
  * Mark task as completed/incomplete
  */
@@ -58,12 +72,19 @@ export const toggleTaskCompleted = async (taskId) => {
   return response.data;
 };
 
+/**
+ * Mark several tasks as completed/incomplete in one request
+ */
+export const setTasksCompleted = async (taskIds, completed = true) => {
+  const response = await axiosInstance.post(`${BASE_URL}/bulk/complete/`, { ids: taskIds, completed });
+  return response.data;
+};
+
 /**
  * Get a single task by ID
  */
 export const getTaskById = async (taskId) => {
-  const response = await axiosInstance.get(`${BASE_URL}/`);
-  const tasks = response.data;
+  const tasks = await getAllTasks();
   const task = tasks.find(t => t.id === taskId);
   if (!task) {
     throw new Error("Task not found");
@@ -4,3 +4,21 @@ export const axiosInstance = axios.create({
   baseURL: import.meta.env.MODE === "development" ? "http://localhost:8000/api" : "/api",
   withCredentials: true,
 });
+
+// Stateless API token, issued at login (and by /auth/me/ after a reload)
+// when the backend enables token auth. Sending it lets the backend skip
+// the session lookup on every request. It is kept in memory only, out of
+// reach of any script that can read localStorage; the session cookie
+// still authenticates until a new token arrives.
+let authToken = null;
+
+export const setAuthToken = (token) => {
+  authToken = token || null;
+};
+
+axiosInstance.interceptors.request.use((config) => {
+  if (authToken) {
+    config.headers.Authorization = `Bearer ${authToken}`;
+  }
+  return config;
+});
@@ -17,6 +17,7 @@ const EditTaskPage = () => {
     estimated_hours: "",
     importance: "",
     dependencies: [],
+    version: null,
   });
   const [errors, setErrors] = useState({});
 
@@ -40,6 +41,7 @@ const EditTaskPage = () => {
         estimated_hours: task.estimated_hours ? String(task.estimated_hours) : "",
         importance: task.importance ? String(task.importance) : "",
         dependencies: task.dependencies || [],
+        version: task.version ?? null,
       });
     } catch (error) {
       toast.error("Failed to load task data");
@@ -149,6 +151,8 @@ const EditTaskPage = () => {
         estimated_hours: parseInt(String(formData.estimated_hours)),
         importance: parseInt(String(formData.importance)),
         dependencies: formData.dependencies,
+        // Lets the server reject the edit if the task changed in another tab
+        version: formData.version,
       });
       toast.success("Task updated successfully");
       navigate("/");